@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import FileResponse
+from app.core import profiling
+from app.core.profiling import stack_sampler, PROFILE_MAX_SECONDS
+import hmac
+import os
+
+def require_admin(request: Request):
+    """Profiling must be enabled and the request must carry PROFILING_TOKEN."""
+    if not profiling.PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled (PROFILING_ENABLED=false)")
+    if not profiling.PROFILING_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are locked (PROFILING_TOKEN is not set)")
+    token = request.headers.get(profiling.PROFILING_TOKEN_HEADER, "")
+    if not hmac.compare_digest(token.encode(), profiling.PROFILING_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail=f"Missing or wrong {profiling.PROFILING_TOKEN_HEADER} header")
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+@router.post("/profile", status_code=202)
+def start_profile(request: Request, route: str, seconds: float = 10, interval: float = 0.005):
+    # `route` is the path template, e.g. /entities/{entity_id}. Sampling is per worker process.
+    paths = {getattr(r, "path", None) for r in request.app.routes}
+    if route not in paths:
+        raise HTTPException(status_code=400, detail=f"Unknown route: {route}")
+    if not 0 < seconds <= PROFILE_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be in (0, {PROFILE_MAX_SECONDS}]")
+    if interval < 0.001:
+        raise HTTPException(status_code=400, detail="interval must be at least 0.001")
+    capture = stack_sampler.start(route, seconds, interval)
+    if capture is None:
+        raise HTTPException(status_code=409, detail="A capture is already running on this worker")
+    return capture
+
+@router.get("/profile")
+def get_profile():
+    capture = stack_sampler.stats()
+    if capture is None:
+        raise HTTPException(status_code=404, detail="No capture on this worker")
+    return capture
+
+@router.get("/profile/download")
+def download_profile():
+    capture = stack_sampler.stats()
+    if capture is None or capture["status"] != "done" or not os.path.isfile(capture["file"]):
+        raise HTTPException(status_code=404, detail="No finished capture on this worker")
+    return FileResponse(capture["file"], media_type="text/plain", filename=os.path.basename(capture["file"]))
@@ -1,25 +1,38 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Optional, Literal
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from starlette.concurrency import run_in_threadpool
 from neo4j import Driver
 from app.database import get_driver
-from app.schemas import EntityCreate, EntityUpdate, EntityResponse, FacetCreate, FacetResponse, RelationResponse, RelationCreate
+from app.schemas import EntityCreate, EntityUpdate, EntityResponse, FacetCreate, FacetResponse, RelationResponse, RelationCreate, LineageResponse
 from app.services.entity_service import EntityService
 from app.services.relation_service import RelationService
 from app.services.facet_service import FacetService
+from app.services.lineage_service import LineageService
+from app.services.idempotency_service import IDEMPOTENCY_HEADER
+from app.core.singleflight import singleflight
+from app.core.bookmarks import current_bookmark_manager
+from app.core.tenancy import current_database
+from app.facets.validators import validator_cache, validate_ndjson, RequestStreamingResponse
+from app.core.profiling import ProfiledRoute
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 @router.post("", response_model=EntityResponse)
-def create_entity(entity: EntityCreate, driver: Driver = Depends(get_driver)):
-    return EntityService.create_entity(driver, entity)
+def create_entity(
+    entity: EntityCreate,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
+    driver: Driver = Depends(get_driver)
+):
+    return EntityService.create_entity(driver, entity, idempotency_key)
 
 @router.get("", response_model=List[EntityResponse])
 def get_entities(driver: Driver = Depends(get_driver)):
     return EntityService.get_all_entities(driver)
 
 @router.get("/{entity_id}", response_model=EntityResponse)
-def get_entity(entity_id: str, driver: Driver = Depends(get_driver)):
-    db_entity = EntityService.get_entity(driver, entity_id)
+def get_entity(entity_id: str, expand: Optional[str] = None, driver: Driver = Depends(get_driver)):
+    expand_refs = "entity_refs" in (expand or "").split(",")
+    db_entity = EntityService.get_entity(driver, entity_id, expand_refs=expand_refs)
     if not db_entity:
         raise HTTPException(status_code=404, detail="Entity not found")
     return db_entity
@@ -36,9 +49,65 @@ def delete_entity(entity_id: str, driver: Driver = Depends(get_driver)):
     return EntityService.delete_entity(driver, entity_id)
 
 @router.post("/{entity_id}/facets", response_model=FacetResponse)
-def add_entity_facet(entity_id: str, facet: FacetCreate, driver: Driver = Depends(get_driver)):
-    return FacetService.add_facet(driver, entity_id, facet, target_type="Entity")
+def add_entity_facet(
+    entity_id: str,
+    facet: FacetCreate,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
+    driver: Driver = Depends(get_driver)
+):
+    return FacetService.add_facet(driver, entity_id, facet, target_type="Entity", idempotency_key=idempotency_key)
 
 @router.post("/{entity_id}/relations", response_model=RelationResponse)
-def create_relation(entity_id: str, relation: RelationCreate, driver: Driver = Depends(get_driver)):
-    return RelationService.create_relation(driver, entity_id, relation)
+def create_relation(
+    entity_id: str,
+    relation: RelationCreate,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
+    driver: Driver = Depends(get_driver)
+):
+    return RelationService.create_relation(driver, entity_id, relation, idempotency_key)
+
+@router.get("/{entity_id}/lineage", response_model=LineageResponse)
+def get_entity_lineage(
+    entity_id: str,
+    direction: Literal["up", "down"] = "down",
+    limit: Optional[int] = None,
+    max_depth: Optional[int] = None,
+    driver: Driver = Depends(get_driver)
+):
+    return LineageService.get_lineage(driver, entity_id, direction, limit, max_depth)
+
+@router.post("/{entity_id}/validate:batch")
+async def validate_batch(
+    entity_id: str,
+    request: Request,
+    inherit: bool = False,
+    allow_extra: bool = False,
+    driver: Driver = Depends(get_driver)
+):
+    # Body: one JSON object per line, validated against the entity's property facets
+    # (plus those inherited over relations flagged {"inherit": true} when inherit=true).
+    # Concurrent uploads for the same schema share one lookup without each holding a thread.
+    bookmarks = frozenset(current_bookmark_manager(driver).get_bookmarks())
+    validator = await singleflight.do_async(
+        ("validator", current_database(), entity_id, inherit, allow_extra, bookmarks),
+        lambda: run_in_threadpool(validator_cache.get, driver, entity_id, inherit, allow_extra)
+    )
+    if validator is None:
+        raise HTTPException(status_code=404, detail="Entity not found")
+    return RequestStreamingResponse(
+        validate_ndjson(validator, request.stream()),
+        media_type="application/x-ndjson",
+        headers={"X-Schema-Version": validator.version}
+    )
+
+@router.get("/{entity_id}/schema")
+def get_entity_schema(entity_id: str, inherit: bool = False, driver: Driver = Depends(get_driver)):
+    validator = validator_cache.get(driver, entity_id, inherit)
+    if validator is None:
+        raise HTTPException(status_code=404, detail="Entity not found")
+    return {
+        "entity_id": entity_id,
+        "schema_version": validator.version,
+        "fields": validator.fields,
+        "json_schema": validator.model.model_json_schema(by_alias=True)
+    }
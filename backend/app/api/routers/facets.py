@@ -1,10 +1,17 @@
+from typing import List
 from fastapi import APIRouter, Depends, HTTPException
 from neo4j import Driver
 from app.database import get_driver
-from app.schemas import FacetResponse, FacetUpdate
+from app.schemas import FacetResponse, FacetUpdate, DanglingReference
 from app.services.facet_service import FacetService
+from app.core.profiling import ProfiledRoute
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
+
+# Declared before /{facet_id} so the path isn't taken for a facet id.
+@router.get("/dangling-references", response_model=List[DanglingReference])
+def get_dangling_references(driver: Driver = Depends(get_driver)):
+    return FacetService.find_dangling_references(driver)
 
 @router.get("/{facet_id}", response_model=FacetResponse)
 def get_facet(facet_id: str, driver: Driver = Depends(get_driver)):
@@ -1,14 +1,27 @@
+from typing import Optional
 from fastapi import APIRouter, Depends
 from neo4j import Driver
-from app.database import get_driver
-from app.schemas import GraphResponse
+from app.database import get_driver, execute_read
+from app.schemas import GraphResponse, GraphLayoutResponse
 from app.services.entity_service import EntityService
+from app.services.facet_service import FacetService
+from app.services.layout_service import LayoutService
+from app.core.replica import replica
+from app.core.profiling import ProfiledRoute
 import json
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
+
+@router.get("/layout", response_model=GraphLayoutResponse)
+def get_graph_layout(driver: Driver = Depends(get_driver)):
+    return LayoutService.get_layout(driver)
 
 @router.get("", response_model=GraphResponse)
-def get_graph(driver: Driver = Depends(get_driver)):
+def get_graph(expand: Optional[str] = None, driver: Driver = Depends(get_driver)):
+    expand_refs = "entity_refs" in (expand or "").split(",")
+    if not expand_refs and replica.is_fresh():
+        return replica.get_graph()
+
     # Re-implementing graph logic here or could make a service for it.
     # Logic is nearly same as before, let's keep it here or create GraphService if complex.
     # It was in SystemBuilder.get_graph.
@@ -18,19 +31,23 @@ def get_graph(driver: Driver = Depends(get_driver)):
     
     # Let's use GraphService pattern if we want to be strict, but keeping it simple:
     
-    query = """
+    query = f"""
     MATCH (n:Entity)
     OPTIONAL MATCH (n)-[:HAS_FACET]->(f:Facet)
-    RETURN n, collect(f) as facets
+    RETURN n, collect({FacetService.projection("f", expand_refs)}) as facets
     """
-    records, _, _ = driver.execute_query(query, database_="neo4j")
+    records, _, _ = execute_read(driver, query)
     
     def parse_facets(flist):
         res = []
         for f in flist:
+            if f is None: continue
             try: conf = json.loads(f["configuration"])
             except: conf = {}
-            res.append({"id": f["id"], "type": f["type"], "configuration": conf})
+            item = {"id": f["id"], "type": f["type"], "configuration": conf}
+            if expand_refs:
+                item["target_entity"] = f.get("target_entity")
+            res.append(item)
         return res
 
     nodes = []
@@ -43,12 +60,12 @@ def get_graph(driver: Driver = Depends(get_driver)):
             "facets": parse_facets(r["facets"])
         })
         
-    rel_query = """
+    rel_query = f"""
     MATCH (s:Entity)-[:HAS_OUTGOING]->(r:RelationDefinition)-[:TARGETS]->(t:Entity)
     OPTIONAL MATCH (r)-[:HAS_FACET]->(rf:Facet)
-    RETURN s.id as sid, t.id as tid, r, collect(rf) as facets
+    RETURN s.id as sid, t.id as tid, r, collect({FacetService.projection("rf", expand_refs)}) as facets
     """
-    rel_records, _, _ = driver.execute_query(rel_query, database_="neo4j")
+    rel_records, _, _ = execute_read(driver, rel_query)
     
     edges = []
     for item in rel_records:
@@ -0,0 +1,59 @@
+from fastapi import APIRouter, Depends
+from neo4j import Driver
+from app.database import get_driver, driver_manager
+from app.core.admission import admission
+from app.core.singleflight import singleflight
+from app.jobs.runner import job_runner
+from app.core.readiness import readiness
+from app.core.tenancy import tenants
+from app.core.profiling import profiling_stats
+from app.core.replica import replica
+from fastapi.responses import JSONResponse
+
+router = APIRouter()
+
+@router.get("")
+def liveness():
+    # Process only: a Neo4j outage must not get every worker restarted.
+    return {"status": "ok"}
+
+@router.get("/ready")
+def readiness_probe(driver: Driver = Depends(get_driver)):
+    # 503 until the pool is warm, indexes exist and the in-memory indexes are loaded,
+    # and while Neo4j is unreachable.
+    stats = readiness.stats()
+    if stats["ready"]:
+        try:
+            driver.verify_connectivity()
+        except Exception as e:
+            return JSONResponse(status_code=503, content=dict(stats, ready=False, error=f"Neo4j unreachable: {str(e)}"))
+    return JSONResponse(status_code=200 if stats["ready"] else 503, content=stats)
+
+@router.get("/pool")
+def pool_metrics():
+    return driver_manager.pool_metrics()
+
+@router.get("/admission")
+def admission_metrics():
+    return admission.stats()
+
+@router.get("/coalescing")
+def coalescing_metrics():
+    return singleflight.stats()
+
+@router.get("/jobs")
+def job_runner_status():
+    return job_runner.stats()
+
+@router.get("/tenants")
+def tenant_metrics():
+    return tenants.stats()
+
+@router.get("/profiling")
+def profiling_metrics():
+    return profiling_stats.stats()
+
+@router.get("/replica")
+def replica_status():
+    # The replica of the tenant in X-Tenant-Id (default tenant without it).
+    return replica.stats()
@@ -0,0 +1,49 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+from neo4j import Driver
+from app.database import get_driver
+from app.schemas import JobCreate, JobResponse
+from app.services.job_service import JobService
+from app.jobs.handlers import JOB_EXPORT_DIR
+from app.jobs.runner import job_runner
+from app.core.profiling import ProfiledRoute
+import os
+
+router = APIRouter(route_class=ProfiledRoute)
+
+@router.post("", response_model=JobResponse, status_code=202)
+def submit_job(job: JobCreate, driver: Driver = Depends(get_driver)):
+    if job.batch_size < 1 or job.batch_size > 10000:
+        raise HTTPException(status_code=400, detail="batch_size must be between 1 and 10000")
+    created = JobService.submit(driver, job)
+    job_runner.wake()
+    return created
+
+@router.get("", response_model=List[JobResponse])
+def list_jobs(status: Optional[str] = None, limit: int = 100, driver: Driver = Depends(get_driver)):
+    return JobService.list_jobs(driver, status, limit)
+
+@router.get("/{job_id}", response_model=JobResponse)
+def get_job(job_id: str, driver: Driver = Depends(get_driver)):
+    job = JobService.get_job(driver, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.post("/{job_id}/cancel", response_model=JobResponse)
+def cancel_job(job_id: str, driver: Driver = Depends(get_driver)):
+    job = JobService.cancel(driver, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.get("/{job_id}/download")
+def download_export(job_id: str, driver: Driver = Depends(get_driver)):
+    job = JobService.get_job(driver, job_id)
+    if not job or job["type"] != "export" or job["status"] != "succeeded":
+        raise HTTPException(status_code=404, detail="No finished export for this job")
+    path = os.path.join(JOB_EXPORT_DIR, job["result"]["file"])
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Export file is not available on this worker")
+    return FileResponse(path, media_type="application/x-ndjson", filename=job["result"]["file"])
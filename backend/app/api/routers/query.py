@@ -0,0 +1,12 @@
+from fastapi import APIRouter, Depends
+from neo4j import Driver
+from app.database import get_driver
+from app.schemas import FacetQueryRequest, FacetQueryResponse
+from app.services.query_service import FacetQueryService
+from app.core.profiling import ProfiledRoute
+
+router = APIRouter(route_class=ProfiledRoute)
+
+@router.post("/facets", response_model=FacetQueryResponse)
+def query_facets(request: FacetQueryRequest, driver: Driver = Depends(get_driver)):
+    return FacetQueryService.query_facets(driver, request)
@@ -1,12 +1,14 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException
 from neo4j import Driver
 from app.database import get_driver
 from app.schemas import RelationResponse, RelationUpdate, FacetCreate, FacetResponse
 from app.services.relation_service import RelationService
 from app.services.facet_service import FacetService
+from app.services.idempotency_service import IDEMPOTENCY_HEADER
+from app.core.profiling import ProfiledRoute
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 @router.get("/{relation_id}", response_model=RelationResponse)
 def get_relation(relation_id: str, driver: Driver = Depends(get_driver)):
@@ -27,5 +29,10 @@ def delete_relation(relation_id: str, driver: Driver = Depends(get_driver)):
     return RelationService.delete_relation(driver, relation_id)
 
 @router.post("/{relation_id}/facets", response_model=FacetResponse)
-def add_relation_facet(relation_id: str, facet: FacetCreate, driver: Driver = Depends(get_driver)):
-    return FacetService.add_facet(driver, relation_id, facet, target_type="RelationDefinition")
+def add_relation_facet(
+    relation_id: str,
+    facet: FacetCreate,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
+    driver: Driver = Depends(get_driver)
+):
+    return FacetService.add_facet(driver, relation_id, facet, target_type="RelationDefinition", idempotency_key=idempotency_key)
@@ -0,0 +1,266 @@
+from collections import OrderedDict
+import asyncio
+import hashlib
+import math
+import os
+import re
+import threading
+import time
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+# Token bucket per verified API key (client address otherwise); 0 disables it.
+RATE_LIMIT_PER_SECOND = float(os.getenv("RATE_LIMIT_PER_SECOND", "0"))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "50"))
+API_KEY_HEADER = os.getenv("API_KEY_HEADER", "X-API-Key")
+# Comma-separated keys that get a bucket of their own. Any other key counts as no key.
+API_KEYS = os.getenv("API_KEYS", "")
+RATE_LIMIT_MAX_CLIENTS = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "10000"))
+
+# Cost class -> (concurrent requests per worker, queued requests, seconds in queue, tokens).
+# Together the concurrency limits (28) leave 12 of the 40 threadpool threads (and of the
+# 40 pool connections) to the routes that are never limited: health probes and /docs.
+# At 40 in total a burst would take every thread and starve the probes.
+DEFAULT_CLASSES = {
+    "export": (2, 4, 2.0, 10),
+    "list": (4, 12, 2.0, 3),
+    "read": (16, 200, 5.0, 1),
+    "write": (6, 50, 10.0, 2),
+}
+
+# (method, path pattern, class); first match wins, then GET/HEAD -> read, others -> write.
+ROUTE_CLASSES = [
+    ("GET", re.compile(r"^/graph(/layout)?/?$"), "export"),
+    ("POST", re.compile(r"^/entities/[^/]+/validate:batch$"), "export"),
+    ("GET", re.compile(r"^/entities/?$"), "list"),
+    ("GET", re.compile(r"^/facets/dangling-references$"), "list"),
+    ("POST", re.compile(r"^/query/"), "list"),
+]
+
+EXEMPT_PATHS = re.compile(r"^/($|health|docs|redoc|openapi\.json)")
+
+def _class_settings(name, defaults):
+    prefix = f"ADMISSION_{name.upper()}_"
+    concurrency, queue, timeout, cost = defaults
+    return {
+        "concurrency": int(os.getenv(prefix + "CONCURRENCY", str(concurrency))),
+        "queue": int(os.getenv(prefix + "QUEUE", str(queue))),
+        "timeout": float(os.getenv(prefix + "TIMEOUT", str(timeout))),
+        "cost": float(os.getenv(prefix + "COST", str(cost))),
+    }
+
+def classify(method: str, path: str):
+    if method == "OPTIONS" or EXEMPT_PATHS.match(path):
+        return None
+    for route_method, pattern, cost_class in ROUTE_CLASSES:
+        if method == route_method and pattern.match(path):
+            return cost_class
+    return "read" if method in ("GET", "HEAD") else "write"
+
+class Shed(Exception):
+    def __init__(self, status_code, detail, retry_after):
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+class CostClass:
+    """
+    Concurrency limit with a bounded FIFO queue. A request that finds the queue full,
+    or waits longer than `timeout`, is shed instead of tying up a worker thread.
+    """
+
+    def __init__(self, name, concurrency, queue, timeout, cost):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue = queue
+        self.timeout = timeout
+        self.cost = cost
+        self.active = 0
+        self._waiters = []
+        self.admitted = 0
+        self.queued = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.rate_limited = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+
+    async def acquire(self):
+        if self.active < self.concurrency and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return
+        if len(self._waiters) >= self.queue:
+            self.rejected_queue_full += 1
+            raise Shed(503, f"Too many pending '{self.name}' requests", self.timeout)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.timeout)
+        except asyncio.TimeoutError:
+            if not waiter.done():
+                self._waiters.remove(waiter)
+                self.rejected_timeout += 1
+                raise Shed(503, f"Timed out waiting for a '{self.name}' slot", self.timeout)
+            # The slot was handed over just as the timeout fired; keep it.
+        except asyncio.CancelledError:
+            if waiter.done():
+                self.release()
+            else:
+                self._waiters.remove(waiter)
+            raise
+        wait = time.monotonic() - start
+        self.queue_wait_total += wait
+        self.queue_wait_max = max(self.queue_wait_max, wait)
+        self.admitted += 1
+
+    def release(self):
+        # Hand the slot straight to the oldest waiter so newcomers cannot overtake it.
+        while self._waiters:
+            waiter = self._waiters.pop(0)
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self):
+        return {
+            "concurrency": self.concurrency,
+            "queue_size": self.queue,
+            "timeout": self.timeout,
+            "active": self.active,
+            "waiting": len(self._waiters),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+            "rate_limited": self.rate_limited,
+            "queue_wait_avg_ms": round(self.queue_wait_total / self.queued * 1000, 3) if self.queued else 0.0,
+            "queue_wait_max_ms": round(self.queue_wait_max * 1000, 3),
+        }
+
+def _key_digest(key: str):
+    return hashlib.sha256(key.encode()).hexdigest()
+
+class TokenBuckets:
+    """
+    Token bucket per client key, LRU-bounded to `max_clients` keys. A bucket idle long
+    enough to have refilled is the same as a new one, so idle buckets are also dropped.
+    """
+
+    def __init__(self, rate, burst, max_clients):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()  # key -> [tokens, last refill], least recently used first
+        self._lock = threading.Lock()
+        self.idle_ttl = burst / rate
+
+    def take(self, key, cost):
+        """Returns 0 when allowed, otherwise the seconds until `cost` tokens are available."""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                self._prune(now)
+                bucket = [self.burst, now]
+                self._buckets[key] = bucket
+                while len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            cost = min(cost, self.burst)
+            if bucket[0] >= cost:
+                bucket[0] -= cost
+                return 0
+            return (cost - bucket[0]) / self.rate
+
+    def _prune(self, now):
+        # The LRU order is also the order of the last refill.
+        while self._buckets:
+            key, (_, last) = next(iter(self._buckets.items()))
+            if now - last < self.idle_ttl:
+                break
+            del self._buckets[key]
+
+    def __len__(self):
+        return len(self._buckets)
+
+class AdmissionController:
+    def __init__(self):
+        self.enabled = ADMISSION_ENABLED
+        self.classes = {
+            name: CostClass(name, **_class_settings(name, defaults))
+            for name, defaults in DEFAULT_CLASSES.items()
+        }
+        self.buckets = TokenBuckets(RATE_LIMIT_PER_SECOND, RATE_LIMIT_BURST, RATE_LIMIT_MAX_CLIENTS) \
+            if RATE_LIMIT_PER_SECOND > 0 else None
+        self.api_keys = {_key_digest(k.strip()) for k in API_KEYS.split(",") if k.strip()}
+
+    def client_key(self, request: Request):
+        # An unverified key would let a client pick a fresh bucket per request.
+        key = request.headers.get(API_KEY_HEADER)
+        if key:
+            digest = _key_digest(key)
+            if digest in self.api_keys:
+                return f"key:{digest[:16]}"
+        return f"addr:{request.client.host if request.client else 'unknown'}"
+
+    async def __call__(self, request: Request, call_next):
+        name = classify(request.method, request.url.path) if self.enabled else None
+        if name is None:
+            return await call_next(request)
+        cost_class = self.classes[name]
+
+        try:
+            if self.buckets is not None:
+                retry_after = self.buckets.take(self.client_key(request), cost_class.cost)
+                if retry_after:
+                    cost_class.rate_limited += 1
+                    raise Shed(429, "Rate limit exceeded", retry_after)
+            await cost_class.acquire()
+        except Shed as e:
+            return JSONResponse(
+                status_code=e.status_code,
+                content={"detail": e.detail},
+                headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))},
+            )
+
+        try:
+            response = await call_next(request)
+        except BaseException:
+            cost_class.release()
+            raise
+
+        # Hold the slot until the body is sent: exports spend much of their time encoding.
+        body = getattr(response, "body_iterator", None)
+        if body is None:
+            cost_class.release()
+            return response
+        async def release_after_body():
+            try:
+                async for chunk in body:
+                    yield chunk
+            finally:
+                cost_class.release()
+        response.body_iterator = release_after_body()
+        return response
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "rate_limit": {
+                "per_second": RATE_LIMIT_PER_SECOND,
+                "burst": RATE_LIMIT_BURST,
+                "clients": len(self.buckets) if self.buckets is not None else 0,
+            },
+            "classes": {name: c.stats() for name, c in self.classes.items()},
+        }
+
+admission = AdmissionController()
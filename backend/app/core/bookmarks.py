@@ -0,0 +1,60 @@
+from contextvars import ContextVar
+from neo4j import GraphDatabase, Driver
+from neo4j.api import BookmarkManager
+
+BOOKMARKS_HEADER = "X-Neo4j-Bookmarks"
+
+class RequestBookmarkManager(BookmarkManager):
+    """
+    Bookmarks for one HTTP request.
+
+    Starts from the bookmarks the client sent back (read-your-writes across workers)
+    plus the worker's own bookmarks (read-your-writes within a worker). Bookmarks
+    produced by this request are kept apart so they can be returned to the client.
+    """
+
+    def __init__(self, client_bookmarks, shared: BookmarkManager):
+        self._shared = shared
+        self._own = GraphDatabase.bookmark_manager(initial_bookmarks=client_bookmarks)
+
+    def update_bookmarks(self, previous_bookmarks, new_bookmarks):
+        self._own.update_bookmarks(previous_bookmarks, new_bookmarks)
+        self._shared.update_bookmarks(previous_bookmarks, new_bookmarks)
+
+    def get_bookmarks(self):
+        return set(self._own.get_bookmarks()) | set(self._shared.get_bookmarks())
+
+    def response_bookmarks(self):
+        return sorted(self._own.get_bookmarks())
+
+class _RequestBookmarks:
+    def __init__(self, client_bookmarks):
+        self.client_bookmarks = client_bookmarks
+        self.manager = None
+
+_request_bookmarks: ContextVar = ContextVar("request_bookmarks", default=None)
+
+def parse_bookmarks_header(value):
+    if not value:
+        return []
+    return [b.strip() for b in value.split(",") if b.strip()]
+
+def begin_request(header_value):
+    holder = _RequestBookmarks(parse_bookmarks_header(header_value))
+    return holder, _request_bookmarks.set(holder)
+
+def end_request(token):
+    _request_bookmarks.reset(token)
+
+def client_bookmarks():
+    holder = _request_bookmarks.get()
+    return holder.client_bookmarks if holder is not None else []
+
+def current_bookmark_manager(driver: Driver):
+    holder = _request_bookmarks.get()
+    if holder is None:
+        # Outside a request (startup, background threads): the worker-wide manager.
+        return driver.execute_query_bookmark_manager
+    if holder.manager is None:
+        holder.manager = RequestBookmarkManager(holder.client_bookmarks, driver.execute_query_bookmark_manager)
+    return holder.manager
@@ -0,0 +1,136 @@
+from neo4j import Driver
+from app.services.changelog_service import ChangeLogService
+from app.core.tenancy import TenantLocal, use_tenant
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from contextvars import copy_context
+import threading
+import time
+import os
+
+CHANGE_FEED_POLL_INTERVAL = float(os.getenv("CHANGE_FEED_POLL_INTERVAL", "0.5"))
+
+class ChangeFeed:
+    """
+    Tails the change log on a background thread and hands new events to the
+    in-process consumers (replica, caches, indexes).
+
+    A consumer implements:
+        load(driver)           -> full (re)build from Neo4j
+        apply(driver, events)  -> incremental update, events are in seq order
+    """
+
+    def __init__(self, tenant: str = None, database: str = None):
+        self.tenant = tenant
+        self.database = database
+        self._consumers = []
+        self._driver = None
+        self._seq = 0
+        self._last_sync = 0.0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def seq(self):
+        return self._seq
+
+    @property
+    def last_sync(self):
+        """Monotonic time of the last successful poll."""
+        return self._last_sync
+
+    def subscribe(self, consumer):
+        self._consumers.append(consumer)
+        if self._driver is not None:
+            with self._lock:
+                consumer.load(self._driver)
+
+    def start(self, driver: Driver):
+        """Starts tailing the log. A feed without consumers does not start, and notify() stays a no-op."""
+        if self.running or not self._consumers:
+            return
+        self._driver = driver
+        self._stop.clear()
+        self._reload()
+        self._thread = threading.Thread(target=self._run, name="change-feed", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._thread = None
+        self._driver = None
+
+    def notify(self):
+        """Called by write paths: catch up synchronously so this worker reads its own writes."""
+        if not self.running:
+            return
+        try:
+            self.poll()
+        except Exception as e:
+            # The write itself has committed; the background thread will catch up.
+            print(f"Change feed catch-up failed: {e}")
+
+    def poll(self):
+        with self._lock:
+            while True:
+                events = ChangeLogService.fetch_since(self._driver, self._seq)
+                if not events:
+                    break
+                if events[0]["seq"] != self._seq + 1:
+                    # We fell behind the retention window; events were pruned.
+                    self._reload_locked()
+                    return
+                for consumer in self._consumers:
+                    consumer.apply(self._driver, events)
+                self._seq = events[-1]["seq"]
+            self._last_sync = time.monotonic()
+
+    def _reload(self):
+        with self._lock:
+            self._reload_locked()
+
+    def _reload_locked(self):
+        # Take the head first: anything committed during the load is replayed afterwards,
+        # and replaying an upsert/delete is idempotent.
+        head = ChangeLogService.head_seq(self._driver)
+        if len(self._consumers) > 1:
+            # Consumers are independent; loading them side by side shortens startup.
+            with ThreadPoolExecutor(max_workers=len(self._consumers)) as pool:
+                # Each load runs in a copy of this context so it queries the same tenant database.
+                for future in [pool.submit(copy_context().run, c.load, self._driver) for c in self._consumers]:
+                    future.result()
+        else:
+            for consumer in self._consumers:
+                consumer.load(self._driver)
+        self._seq = head
+        self._last_sync = time.monotonic()
+
+    def _tenant(self):
+        return use_tenant(self.tenant, self.database) if self.tenant is not None else nullcontext()
+
+    def _run(self):
+        with self._tenant():
+            self._poll_loop()
+
+    def _poll_loop(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(CHANGE_FEED_POLL_INTERVAL)
+            self._wakeup.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"Change feed poll failed: {e}")
+
+# One feed per tenant database; this name resolves to the current tenant's.
+change_feed = TenantLocal("change_feed")
@@ -0,0 +1,526 @@
+from bisect import bisect_right
+from contextvars import copy_context
+from neo4j import Driver, READ_ACCESS
+from app.database import execute_read
+from app.core.tenancy import TenantLocal, current_database
+import heapq
+import threading
+import sys
+import os
+
+# When enabled every tenant's change feed keeps the index current. When disabled, the
+# layout loads it on demand and lineage is answered by Cypher.
+DAG_INDEX_ENABLED = os.getenv("DAG_INDEX_ENABLED", "true").lower() == "true"
+# Relabel from scratch (in the background) once incremental updates have fragmented the
+# interval labels to more than this factor of their size after the last build.
+DAG_RELABEL_FACTOR = float(os.getenv("DAG_RELABEL_FACTOR", "2"))
+
+def _merge(spans):
+    # Sorted, disjoint, non-adjacent intervals covering the same numbers.
+    merged = []
+    for lo, hi in sorted(spans):
+        if merged and lo <= merged[-1][1] + 1:
+            if hi > merged[-1][1]:
+                merged[-1] = (merged[-1][0], hi)
+        else:
+            merged.append((lo, hi))
+    return merged
+
+class _Labels:
+    """
+    Interval labels of one direction (Agrawal, Borgida and Jagadish). Every entity gets a
+    post-order number over a spanning forest, and the set of entities it reaches, itself
+    included, is stored as sorted intervals of those numbers. A subtree of the forest is
+    one interval, so the label only grows where the DAG has more than one path.
+    """
+
+    def __init__(self):
+        self.num = {}    # entity id -> number
+        self.ids = []    # number -> entity id, None once the entity is removed
+        self.spans = {}  # entity id -> [(low, high), ...]
+        self.size = 0    # intervals over all entities
+
+    def build(self, order, neighbours):
+        """`order` is topological for `neighbours`: every neighbour comes after its node."""
+        self.num, self.ids, self.spans, self.size = {}, [], {}, 0
+        seen = set()
+        for root in order:
+            if root in seen:
+                continue
+            seen.add(root)
+            stack = [(root, iter(neighbours[root]))]
+            while stack:
+                n, it = stack[-1]
+                for m in it:
+                    if m not in seen:
+                        seen.add(m)
+                        stack.append((m, iter(neighbours[m])))
+                        break
+                else:
+                    stack.pop()
+                    self.num[n] = len(self.ids)
+                    self.ids.append(n)
+        self.recompute(reversed(order), neighbours)
+
+    def add(self, n):
+        self.num[n] = len(self.ids)
+        self.ids.append(n)
+        self._set(n, [(self.num[n], self.num[n])])
+
+    def forget(self, n):
+        self.ids[self.num.pop(n)] = None
+        self.size -= len(self.spans.pop(n))
+
+    def extend(self, n, spans):
+        self._set(n, _merge(self.spans[n] + spans))
+
+    def recompute(self, nodes, neighbours):
+        """Rebuilds the labels of `nodes` from their neighbours'; neighbours must be final first."""
+        for n in nodes:
+            spans = [(self.num[n], self.num[n])]
+            for m in neighbours[n]:
+                spans.extend(self.spans[m])
+            self._set(n, _merge(spans))
+
+    def _set(self, n, spans):
+        self.size += len(spans) - len(self.spans.get(n, ()))
+        self.spans[n] = spans
+
+    def contains(self, n, m):
+        x = self.num[m]
+        spans = self.spans[n]
+        i = bisect_right(spans, (x, float("inf"))) - 1
+        return i >= 0 and spans[i][1] >= x
+
+    def count(self, n):
+        return sum(hi - lo + 1 for lo, hi in self.spans[n]) - 1
+
+    def reached(self, n, limit=None):
+        """
+        Reached entities, `n` excluded. Highest numbers first: in post-order the nodes
+        right below an entity's own number are its closest ones.
+        """
+        found = []
+        own = self.num[n]
+        for lo, hi in reversed(self.spans[n]):
+            for x in range(hi, lo - 1, -1):
+                if limit is not None and len(found) >= limit:
+                    return found
+                if x != own and self.ids[x] is not None:
+                    found.append(self.ids[x])
+        return found
+
+class DagIndex:
+    """
+    In-memory copy of the relation DAG (entity ids and relation endpoints only),
+    kept current by the change feed.
+
+    Maintains the longest-path level of every entity incrementally: adding an edge
+    only touches the descendants whose level grows, removing one only the descendants
+    whose level may shrink. Every edge goes from a lower to a strictly higher level,
+    so sorting by level is a topological order.
+
+    Reachability is kept as interval labels in both directions (descendants and
+    ancestors), updated with every relation change: reaches() is a binary search,
+    lineage counts are a sum over the intervals, and lineage ids are read off them.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._load_lock = threading.Lock()  # one load at a time (feed, sync and rebuild)
+        self.loaded = False
+        # True when subscribed to a change feed, i.e. kept current without reloads.
+        self.live = False
+        self.stale = False
+        self.version = None
+        self.skipped_edges = 0
+        # Event batches applied while a load is in progress; replayed on the new copy.
+        self._pending = None
+        self._rebuilding = False
+        self._reset()
+
+    def _reset(self):
+        self.succ = {}   # entity id -> {successor id: number of relations}
+        self.pred = {}   # entity id -> {predecessor id: number of relations}
+        self.edges = {}  # relation id -> (source id, target id)
+        self.rels = {}   # entity id -> ids of incident relations
+        self.level = {}
+        self.down = _Labels()  # descendants
+        self.up = _Labels()    # ancestors
+        self._label_base = 0
+
+    # ---- change feed consumer ----
+
+    def load(self, driver: Driver):
+        """
+        Builds a fresh copy from Neo4j without holding the lock, then swaps it in. Events
+        applied meanwhile go to the current copy and are replayed on the new one.
+        """
+        with self._load_lock:
+            self._load(driver)
+
+    def _load(self, driver: Driver):
+        with self._lock:
+            self._pending = []
+        try:
+            # Head first: anything committed while loading is replayed.
+            head = self._head(driver)
+            fresh = DagIndex()
+            with driver.session(database=current_database(), default_access_mode=READ_ACCESS) as session:
+                for r in session.run("MATCH (n:Entity) RETURN n.id as id"):
+                    fresh._add_node(r["id"])
+                rel_query = """
+                MATCH (s:Entity)-[:HAS_OUTGOING]->(r:RelationDefinition)-[:TARGETS]->(t:Entity)
+                RETURN r.id as id, s.id as sid, t.id as tid
+                """
+                for r in session.run(rel_query):
+                    fresh._link(r["id"], r["sid"], r["tid"])
+            fresh._compute_levels()
+            fresh._label()
+        except BaseException:
+            with self._lock:
+                self._pending = None
+            raise
+
+        with self._lock:
+            self.succ, self.pred, self.edges = fresh.succ, fresh.pred, fresh.edges
+            self.rels, self.level = fresh.rels, fresh.level
+            self.down, self.up, self._label_base = fresh.down, fresh.up, fresh._label_base
+            self.skipped_edges = fresh.skipped_edges
+            self.loaded = True
+            self.stale = False
+            self.version = head
+            pending, self._pending = self._pending, None
+            for events, endpoints in pending:
+                self._apply_locked([e for e in events if e["seq"] > head], endpoints)
+
+    def apply(self, driver: Driver, events: list):
+        # Relation updates (rename) carry no endpoints; unknown relations are looked up.
+        missing = [
+            e["id"] for e in events
+            if e["kind"] == "Relation" and e["op"] == "upsert"
+            and e["id"] not in self.edges and not (e.get("source_id") and e.get("target_id"))
+        ]
+        endpoints = {}
+        if missing:
+            records, _, _ = execute_read(driver, """
+            MATCH (s:Entity)-[:HAS_OUTGOING]->(r:RelationDefinition)-[:TARGETS]->(t:Entity)
+            WHERE r.id IN $ids
+            RETURN r.id as id, s.id as sid, t.id as tid
+            """, ids=missing)
+            endpoints = {r["id"]: (r["sid"], r["tid"]) for r in records}
+
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((events, endpoints))
+            self._apply_locked(events, endpoints)
+            if self.stale or self.fragmented:
+                # An edge would have closed a cycle (the log and the index disagree), or
+                # the labels need compacting. Rebuild in the background; this runs on
+                # the write path.
+                self._rebuild(driver)
+
+    def _apply_locked(self, events, endpoints):
+        for e in events:
+            kind, op, obj_id = e["kind"], e["op"], e["id"]
+            if kind == "Entity":
+                if op == "upsert":
+                    self._add_node(obj_id)
+                else:
+                    self.remove_node(obj_id)
+            elif kind == "Relation":
+                if op == "delete":
+                    self.remove_edge(obj_id)
+                elif obj_id not in self.edges:
+                    sid, tid = e.get("source_id"), e.get("target_id")
+                    if not (sid and tid):
+                        sid, tid = endpoints.get(obj_id, (None, None))
+                    if sid and tid:
+                        self.add_edge(obj_id, sid, tid)
+        self.version = events[-1]["seq"] if events else self.version
+
+    def _rebuild(self, driver: Driver):
+        if self._rebuilding:
+            return
+        self._rebuilding = True
+
+        def run():
+            try:
+                self.load(driver)
+            except Exception as e:
+                print(f"DAG index rebuild failed: {e}")
+            finally:
+                self._rebuilding = False
+        # The copied context keeps the tenant database of the caller.
+        ctx = copy_context()
+        threading.Thread(target=ctx.run, args=(run,), name="dag-rebuild", daemon=True).start()
+
+    def sync(self, driver: Driver):
+        """Without a running change feed (scripts, tests, index disabled), reload whenever the log moved."""
+        from app.core.changelog import change_feed
+        if self.live and change_feed.running and self.loaded:
+            return
+        if not self.loaded or self._head(driver) != self.version:
+            self.load(driver)
+
+    def _head(self, driver: Driver):
+        from app.services.changelog_service import ChangeLogService
+        return ChangeLogService.head_seq(driver)
+
+    @property
+    def fragmented(self):
+        return self.down.size + self.up.size > DAG_RELABEL_FACTOR * self._label_base + 1024
+
+    # ---- structure ----
+
+    def _add_node(self, eid):
+        if eid in self.succ:
+            return
+        eid = sys.intern(eid)
+        self.succ[eid] = {}
+        self.pred[eid] = {}
+        self.rels[eid] = set()
+        self.level[eid] = 0
+        self.down.add(eid)
+        self.up.add(eid)
+
+    def _link(self, rid, sid, tid):
+        if rid in self.edges or sid not in self.succ or tid not in self.succ:
+            return False
+        self.edges[rid] = (sid, tid)
+        self.rels[sid].add(rid)
+        self.rels[tid].add(rid)
+        self.succ[sid][tid] = self.succ[sid].get(tid, 0) + 1
+        self.pred[tid][sid] = self.pred[tid].get(sid, 0) + 1
+        return True
+
+    def _unlink(self, rid):
+        sid, tid = self.edges.pop(rid)
+        self.rels[sid].discard(rid)
+        self.rels[tid].discard(rid)
+        self.succ[sid][tid] -= 1
+        if not self.succ[sid][tid]:
+            del self.succ[sid][tid]
+        self.pred[tid][sid] -= 1
+        if not self.pred[tid][sid]:
+            del self.pred[tid][sid]
+        return sid, tid
+
+    def _compute_levels(self):
+        # Kahn's algorithm; a node's level is final once all its predecessors are visited.
+        # Nodes left over lie on or behind a cycle: break it and start again.
+        while True:
+            indegree = {n: len(p) for n, p in self.pred.items()}
+            queue = [n for n, d in indegree.items() if d == 0]
+            for n in self.level:
+                self.level[n] = 0
+            i = 0
+            while i < len(queue):
+                n = queue[i]
+                i += 1
+                for m in self.succ[n]:
+                    self.level[m] = max(self.level[m], self.level[n] + 1)
+                    indegree[m] -= 1
+                    if indegree[m] == 0:
+                        queue.append(m)
+            if len(queue) == len(self.level):
+                return
+            self._break_cycles({n for n, d in indegree.items() if d > 0})
+
+    def _break_cycles(self, nodes):
+        # Iterative DFS over the nodes Kahn could not order; back edges close the cycles.
+        back = []
+        state = {}  # node -> 1 on the stack, 2 done
+        for root in nodes:
+            if root in state:
+                continue
+            state[root] = 1
+            stack = [(root, iter(list(self.succ[root])))]
+            while stack:
+                n, it = stack[-1]
+                for m in it:
+                    if m not in nodes:
+                        continue
+                    if state.get(m) == 1:
+                        back.append((n, m))
+                    elif m not in state:
+                        state[m] = 1
+                        stack.append((m, iter(list(self.succ[m]))))
+                        break
+                else:
+                    state[n] = 2
+                    stack.pop()
+        for n, m in back:
+            for rid in [r for r in self.rels[n] if self.edges[r] == (n, m)]:
+                self._unlink(rid)
+                self.skipped_edges += 1
+
+    def _label(self):
+        order = sorted(self.level, key=lambda n: self.level[n])
+        self.down.build(order, self.succ)
+        self.up.build(order[::-1], self.pred)
+        self._label_base = self.down.size + self.up.size
+
+    def add_edge(self, rid, sid, tid):
+        if rid in self.edges or sid not in self.succ or tid not in self.succ:
+            return
+        if sid == tid or self.down.contains(tid, sid):
+            # The edge would close a cycle. Writes reject cycles, so the log and the
+            # index disagree: skip it, and let apply() rebuild.
+            self.stale = True
+            return
+        # Everything above sid now reaches everything below tid, and the reverse.
+        self._grow(self.down, sid, tid, self.pred)
+        self._grow(self.up, tid, sid, self.succ)
+        self._link(rid, sid, tid)
+        # Push levels forward only where they grow.
+        stack = [(tid, self.level[sid] + 1)]
+        while stack:
+            n, lvl = stack.pop()
+            if self.level[n] >= lvl:
+                continue
+            self.level[n] = lvl
+            for m in self.succ[n]:
+                stack.append((m, lvl + 1))
+
+    def remove_edge(self, rid):
+        if rid not in self.edges:
+            return
+        sid, tid = self._unlink(rid)
+        self._relevel_from([tid])
+        if tid not in self.succ[sid]:
+            # The last relation between the two: labels above sid and below tid may shrink.
+            self._shrink([sid], [tid])
+
+    def remove_node(self, eid):
+        if eid not in self.succ:
+            return
+        sources, targets = list(self.pred[eid]), list(self.succ[eid])
+        for rid in list(self.rels[eid]):
+            self._unlink(rid)
+        del self.succ[eid]
+        del self.pred[eid]
+        del self.rels[eid]
+        del self.level[eid]
+        self.down.forget(eid)
+        self.up.forget(eid)
+        self._relevel_from(targets)
+        self._shrink(sources, targets)
+
+    @staticmethod
+    def _grow(labels, start, target, back):
+        # Merge the target's label into start and the nodes behind it. A node that already
+        # reaches the target holds its whole label, and so does everything behind it.
+        spans = labels.spans[target]
+        seen = {start}
+        stack = [start]
+        while stack:
+            n = stack.pop()
+            if labels.contains(n, target):
+                continue
+            labels.extend(n, spans)
+            for m in back[n]:
+                if m not in seen:
+                    seen.add(m)
+                    stack.append(m)
+
+    def _shrink(self, sources, targets):
+        # Recompute descendant labels from the sources up and ancestor labels from the
+        # targets down. A node is recomputed once its neighbours are final (level order),
+        # and its own neighbours behind it only if its label changed.
+        for labels, start, ahead, back, sign in (
+            (self.down, sources, self.succ, self.pred, -1),
+            (self.up, targets, self.pred, self.succ, 1),
+        ):
+            heap = [(sign * self.level[n], n) for n in start]
+            heapq.heapify(heap)
+            queued = set(start)
+            while heap:
+                _, n = heapq.heappop(heap)
+                queued.discard(n)
+                old = labels.spans[n]
+                labels.recompute([n], ahead)
+                if labels.spans[n] == old:
+                    continue
+                for m in back[n]:
+                    if m not in queued:
+                        queued.add(m)
+                        heapq.heappush(heap, (sign * self.level[m], m))
+
+    def _relevel_from(self, start):
+        # Levels can only shrink. Settle nodes in increasing (old) level order so every
+        # predecessor is final before a node is recomputed.
+        heap = [(self.level[n], n) for n in start if n in self.level]
+        heapq.heapify(heap)
+        queued = {n for _, n in heap}
+        while heap:
+            _, n = heapq.heappop(heap)
+            queued.discard(n)
+            new = max((self.level[p] + 1 for p in self.pred[n]), default=0)
+            if new == self.level[n]:
+                continue
+            self.level[n] = new
+            for m in self.succ[n]:
+                if m not in queued:
+                    queued.add(m)
+                    heapq.heappush(heap, (self.level[m], m))
+
+    # ---- reads ----
+
+    def snapshot(self):
+        """Consistent copy for readers that work outside the lock."""
+        with self._lock:
+            return {
+                "version": self.version,
+                "level": dict(self.level),
+                "succ": {n: list(s) for n, s in self.succ.items()},
+                "edges": dict(self.edges),
+                "ancestors": {n: self.up.count(n) for n in self.level},
+                "descendants": {n: self.down.count(n) for n in self.level},
+            }
+
+    def reaches(self, source_id, target_id):
+        with self._lock:
+            if source_id not in self.succ or target_id not in self.succ:
+                return False
+            return source_id != target_id and self.down.contains(source_id, target_id)
+
+    def lineage(self, entity_id, direction="down", limit=None, max_depth=None):
+        """
+        Ancestors ("up") or descendants ("down") of an entity, read off the interval labels.
+        With `max_depth`, walked breadth-first over the adjacency instead.
+        Returns None for an unknown entity.
+        """
+        with self._lock:
+            if entity_id not in self.succ:
+                return None
+            if max_depth is not None:
+                found = self._walk(entity_id, self.pred if direction == "up" else self.succ, max_depth)
+                return {"count": len(found), "ids": found if limit is None else found[:limit]}
+            labels = self.up if direction == "up" else self.down
+            return {"count": labels.count(entity_id), "ids": labels.reached(entity_id, limit)}
+
+    @staticmethod
+    def _walk(entity_id, neighbours, max_depth):
+        seen = {entity_id}
+        frontier = [entity_id]
+        found = []
+        depth = 0
+        while frontier and (max_depth is None or depth < max_depth):
+            nxt = []
+            for n in frontier:
+                for m in neighbours[n]:
+                    if m not in seen:
+                        seen.add(m)
+                        nxt.append(m)
+            found.extend(nxt)
+            frontier = nxt
+            depth += 1
+        return found
+
+    def topological_order(self):
+        with self._lock:
+            return sorted(self.level, key=lambda n: (self.level[n], n))
+
+# One index per tenant; this name resolves to the current tenant's.
+dag_index = TenantLocal("dag_index")
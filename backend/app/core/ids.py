@@ -0,0 +1,86 @@
+import threading
+import secrets
+import time
+import uuid
+import os
+
+# Id format of new objects. Ids are opaque strings, so schemes can be mixed and changed:
+#   uuid7  - time-ordered UUID, 36 chars (default)
+#   ulid   - time-ordered, Crockford base32, 26 chars
+#   base62 - the UUIDv7 value in base62, 22 chars
+#   uuid4  - random UUID, 36 chars (ids created before time-ordered ids)
+ID_SCHEME = os.getenv("ID_SCHEME", "uuid7").lower()
+
+BASE62 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+CROCKFORD32 = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+class _Clock:
+    """
+    Millisecond timestamp plus a counter for ids minted within the same millisecond,
+    so ids of one process are strictly increasing even if the wall clock steps back.
+    """
+
+    def __init__(self, counter_bits: int):
+        self._lock = threading.Lock()
+        self._max = (1 << counter_bits) - 1
+        self._bits = counter_bits
+        self._ms = 0
+        self._counter = 0
+
+    def next(self):
+        with self._lock:
+            ms = time.time_ns() // 1_000_000
+            if ms > self._ms:
+                self._ms = ms
+                # Random start leaves room to count up without ids of two processes lining up.
+                self._counter = secrets.randbits(self._bits - 1)
+            elif self._counter < self._max:
+                self._counter += 1
+            else:
+                self._ms += 1
+                self._counter = secrets.randbits(self._bits - 1)
+            return self._ms, self._counter
+
+_uuid7_clock = _Clock(12)
+_ulid_clock = _Clock(16)
+
+def uuid7_int():
+    # 48 bit unix ms | version 7 | 12 bit counter | variant 10 | 62 random bits
+    ms, counter = _uuid7_clock.next()
+    return (ms & (2**48 - 1)) << 80 | 0x7 << 76 | counter << 64 | 0b10 << 62 | secrets.randbits(62)
+
+def uuid7():
+    return str(uuid.UUID(int=uuid7_int()))
+
+def ulid():
+    # 48 bit unix ms | 16 bit counter | 64 random bits
+    ms, counter = _ulid_clock.next()
+    value = (ms & (2**48 - 1)) << 80 | counter << 64 | secrets.randbits(64)
+    return "".join(CROCKFORD32[(value >> shift) & 31] for shift in range(125, -1, -5))
+
+def base62(value: int, width: int = 22):
+    """Fixed width, so string order matches numeric order."""
+    digits = []
+    while value:
+        value, digit = divmod(value, 62)
+        digits.append(BASE62[digit])
+    return "".join(reversed(digits)).rjust(width, "0")
+
+def uuid7_base62():
+    return base62(uuid7_int())
+
+def uuid4():
+    return str(uuid.uuid4())
+
+SCHEMES = {
+    "uuid7": uuid7,
+    "ulid": ulid,
+    "base62": uuid7_base62,
+    "uuid4": uuid4,
+}
+
+if ID_SCHEME not in SCHEMES:
+    raise ValueError(f"Unknown ID_SCHEME {ID_SCHEME!r}, expected one of {', '.join(SCHEMES)}")
+
+def new_id():
+    return SCHEMES[ID_SCHEME]()
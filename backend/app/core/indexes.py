@@ -0,0 +1,64 @@
+from neo4j import Driver
+from app.database import execute_read, execute_write
+import re
+from app.services.facet_service import INDEXED_CONFIGURATION_KEYS, CONFIGURATION_FIELD_PREFIX
+
+# Schema statements applied at startup. All are idempotent.
+INDEX_STATEMENTS = [
+    "CREATE INDEX change_event_seq IF NOT EXISTS FOR (c:ChangeEvent) ON (c.seq)",
+    # Concurrent first writes MERGE the head; without the constraint both could create one.
+    "CREATE CONSTRAINT change_log_head_id IF NOT EXISTS FOR (h:ChangeLogHead) REQUIRE h.id IS UNIQUE",
+    # Ids are minted client-side and MERGEd on: only a constraint keeps them unique.
+    "CREATE CONSTRAINT entity_id_unique IF NOT EXISTS FOR (n:Entity) REQUIRE n.id IS UNIQUE",
+    "CREATE CONSTRAINT relation_id_unique IF NOT EXISTS FOR (r:RelationDefinition) REQUIRE r.id IS UNIQUE",
+    "CREATE CONSTRAINT facet_id_unique IF NOT EXISTS FOR (f:Facet) REQUIRE f.id IS UNIQUE",
+    "CREATE INDEX facet_type IF NOT EXISTS FOR (f:Facet) ON (f.type)",
+    "CREATE INDEX job_id IF NOT EXISTS FOR (j:Job) ON (j.id)",
+    "CREATE INDEX job_status IF NOT EXISTS FOR (j:Job) ON (j.status)",
+    "CREATE CONSTRAINT idempotency_key IF NOT EXISTS FOR (k:IdempotencyKey) REQUIRE k.key IS UNIQUE",
+    "CREATE INDEX idempotency_created_at IF NOT EXISTS FOR (k:IdempotencyKey) ON (k.created_at)",
+] + [
+    f"CREATE INDEX facet_{CONFIGURATION_FIELD_PREFIX}{key} IF NOT EXISTS "
+    f"FOR (f:Facet) ON (f.{CONFIGURATION_FIELD_PREFIX}{key})"
+    for key in INDEXED_CONFIGURATION_KEYS
+]
+
+# Constraint -> (plain index it replaces, label). The index must be dropped first: Neo4j
+# refuses a constraint on the same property while an equivalent index exists.
+REPLACED_INDEXES = {
+    "entity_id_unique": ("entity_id", "Entity"),
+    "relation_id_unique": ("relation_id", "RelationDefinition"),
+    "facet_id_unique": ("facet_id", "Facet"),
+}
+
+# A constraint shows up in SHOW INDEXES as its backing index, under the same name.
+_INDEX_NAME = re.compile(r"CREATE (?:INDEX|CONSTRAINT) (\w+)")
+
+def ensure_indexes(driver: Driver):
+    # One read on restarts; only missing indexes cost a schema write.
+    records, _, _ = execute_read(driver, "SHOW INDEXES YIELD name RETURN collect(name) as names")
+    existing = set(records[0]["names"]) if records else set()
+    for statement in INDEX_STATEMENTS:
+        name = _INDEX_NAME.match(statement).group(1)
+        if name in existing:
+            continue
+        if name in REPLACED_INDEXES and not _replace_index(driver, name, existing):
+            continue
+        execute_write(driver, statement)
+
+def _replace_index(driver: Driver, name: str, existing: set):
+    """Makes way for a uniqueness constraint. False when duplicate ids block it."""
+    index, label = REPLACED_INDEXES[name]
+    records, _, _ = execute_read(driver, f"""
+    MATCH (n:{label}) WITH n.id as id, count(*) as copies WHERE copies > 1
+    RETURN count(id) as duplicates
+    """)
+    if records[0]["duplicates"]:
+        # Keep (or create) the plain index so lookups stay fast until the data is fixed.
+        print(f"Not creating {name}: {records[0]['duplicates']} duplicate {label} ids; keeping index {index}")
+        if index not in existing:
+            execute_write(driver, f"CREATE INDEX {index} IF NOT EXISTS FOR (n:{label}) ON (n.id)")
+        return False
+    if index in existing:
+        execute_write(driver, f"DROP INDEX {index} IF EXISTS")
+    return True
@@ -0,0 +1,249 @@
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+import functools
+import inspect
+import random
+import threading
+import time
+import sys
+import os
+
+# Opt-in: with profiling off, routes are plain APIRoutes and the hooks are no-ops.
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+# Fraction of requests that get per-phase timings (Server-Timing header).
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0.01"))
+# Requests with this header set to "true" are always timed (profiling must be enabled).
+PROFILING_HEADER = os.getenv("PROFILING_HEADER", "X-Profile")
+# Collapsed-stack captures are written here.
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "300"))
+# Shared secret for the /admin endpoints, sent in PROFILING_TOKEN_HEADER. Unset: they refuse every request.
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")
+PROFILING_TOKEN_HEADER = os.getenv("PROFILING_TOKEN_HEADER", "X-Profiling-Token")
+
+# Phase -> seconds of the current request, or None when the request is not sampled.
+_timings: ContextVar = ContextVar("profiling_timings", default=None)
+
+PHASES = {
+    "db": "Neo4j queries incl. waits on coalesced reads",
+    "parse": "endpoint code outside queries (record parsing and dict building)",
+    "validate": "request parsing and dependencies and response model validation",
+    "encode": "JSON encoding of the response",
+}
+
+@contextmanager
+def timed(phase: str):
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[phase] = timings.get(phase, 0.0) + time.perf_counter() - start
+        if phase == "db":
+            timings["queries"] = timings.get("queries", 0) + 1
+
+def should_sample(request):
+    return PROFILING_ENABLED and (
+        request.headers.get(PROFILING_HEADER, "").lower() == "true" or random.random() < PROFILING_SAMPLE_RATE
+    )
+
+@contextmanager
+def sampled():
+    token = _timings.set({})
+    try:
+        yield _timings.get()
+    finally:
+        _timings.reset(token)
+
+def server_timing(timings: dict, total: float):
+    route = timings.get("route", 0.0)
+    handler = timings.get("handler", 0.0)
+    phases = {
+        "db": timings.get("db", 0.0),
+        "parse": max(handler - timings.get("db", 0.0), 0.0),
+        "validate": max(route - handler - timings.get("encode", 0.0), 0.0),
+        "encode": timings.get("encode", 0.0),
+    }
+    parts = [
+        f'{name};dur={seconds * 1000:.3f};desc="{PHASES[name]}"'
+        for name, seconds in phases.items()
+    ]
+    parts.append(f"total;dur={total * 1000:.3f}")
+    return phases, ", ".join(parts)
+
+class ProfilingStats:
+    """Mean phase timings of the sampled requests, per route."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def record(self, route: str, phases: dict, total: float, queries: int):
+        with self._lock:
+            entry = self._routes.setdefault(route, {"samples": 0, "total": 0.0, "queries": 0, "phases": Counter()})
+            entry["samples"] += 1
+            entry["total"] += total
+            entry["queries"] += queries
+            entry["phases"].update(phases)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enabled": PROFILING_ENABLED,
+                "sample_rate": PROFILING_SAMPLE_RATE,
+                "routes": {
+                    route: {
+                        "samples": e["samples"],
+                        "mean_total_ms": round(e["total"] / e["samples"] * 1000, 3),
+                        "mean_queries": round(e["queries"] / e["samples"], 2),
+                        "mean_phase_ms": {p: round(s / e["samples"] * 1000, 3) for p, s in e["phases"].items()},
+                    }
+                    for route, e in self._routes.items()
+                },
+            }
+
+profiling_stats = ProfilingStats()
+
+class StackSampler:
+    """
+    Statistical profile of one route: every `interval` seconds, the stacks of the threads
+    currently running that route's endpoint are sampled and counted. The result is written
+    in collapsed-stack format ("frame;frame;frame count" per line, root first), the input
+    of flamegraph.pl and speedscope.
+
+    Sync endpoints run on their own threadpool thread, so their samples are exact. Async
+    endpoints share the event loop thread; their samples may include other coroutines.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._active = {}  # thread id -> route path, while an endpoint runs
+        self.capture = None
+
+    @contextmanager
+    def running(self, route: str):
+        capture = self.capture
+        if capture is None or capture["status"] != "running" or capture["route"] != route:
+            yield
+            return
+        ident = threading.get_ident()
+        self._active[ident] = route
+        try:
+            yield
+        finally:
+            self._active.pop(ident, None)
+
+    def start(self, route: str, seconds: float, interval: float):
+        with self._lock:
+            if self.capture is not None and self.capture["status"] == "running":
+                return None
+            capture_id = time.strftime("%Y%m%dT%H%M%S") + f"-{os.getpid()}"
+            self.capture = {
+                "id": capture_id,
+                "route": route,
+                "seconds": seconds,
+                "interval": interval,
+                "status": "running",
+                "samples": 0,
+                "stacks": 0,
+                "file": os.path.join(PROFILE_DIR, f"{capture_id}.collapsed"),
+                "error": None,
+            }
+            capture = self.capture
+        threading.Thread(target=self._run, args=(capture,), name="stack-sampler", daemon=True).start()
+        return dict(capture)
+
+    def _run(self, capture):
+        counts = Counter()
+        me = threading.get_ident()
+        deadline = time.monotonic() + capture["seconds"]
+        try:
+            while time.monotonic() < deadline:
+                frames = sys._current_frames()
+                for ident, route in list(self._active.items()):
+                    frame = frames.get(ident)
+                    if frame is None or ident == me or route != capture["route"]:
+                        continue
+                    counts[_collapse(frame)] += 1
+                    capture["samples"] += 1
+                time.sleep(capture["interval"])
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            with open(capture["file"], "w") as f:
+                for stack, count in counts.most_common():
+                    f.write(f"{stack} {count}\n")
+            capture.update(status="done", stacks=len(counts))
+        except Exception as e:
+            capture.update(status="failed", error=str(e))
+        finally:
+            self._active.clear()
+
+    def stats(self):
+        return dict(self.capture) if self.capture is not None else None
+
+stack_sampler = StackSampler()
+
+def _frame_label(frame):
+    code = frame.f_code
+    path = code.co_filename
+    for marker in ("site-packages" + os.sep, os.sep + "backend" + os.sep):
+        if marker in path:
+            path = path.split(marker, 1)[1]
+            break
+    return f"{code.co_name} ({path})"
+
+def _collapse(frame):
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+class ProfiledJSONResponse(JSONResponse):
+    def render(self, content):
+        with timed("encode"):
+            return super().render(content)
+
+class ProfiledRoute(APIRoute):
+    """
+    Times the endpoint call ("handler") and the whole route handler ("route") of sampled
+    requests, and marks the endpoint's thread for the stack sampler. A plain APIRoute when
+    profiling is disabled.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        if PROFILING_ENABLED:
+            endpoint = _wrap_endpoint(path, endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        if not PROFILING_ENABLED:
+            return handler
+
+        async def route_handler(request):
+            with timed("route"):
+                return await handler(request)
+        return route_handler
+
+def _wrap_endpoint(path, endpoint):
+    # include_router copies routes into the app with the same route class and the full
+    # path: wrap the original endpoint again instead of stacking wrappers.
+    endpoint = getattr(endpoint, "_profiled_endpoint", endpoint)
+    # functools.wraps keeps the signature FastAPI reads the parameters from.
+    if inspect.iscoroutinefunction(endpoint):
+        async def wrapper(*args, **kwargs):
+            with stack_sampler.running(path), timed("handler"):
+                return await endpoint(*args, **kwargs)
+    else:
+        def wrapper(*args, **kwargs):
+            with stack_sampler.running(path), timed("handler"):
+                return endpoint(*args, **kwargs)
+    wrapper = functools.wraps(endpoint)(wrapper)
+    wrapper._profiled_endpoint = endpoint
+    return wrapper
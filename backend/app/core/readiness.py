@@ -0,0 +1,80 @@
+from contextlib import contextmanager
+import threading
+import time
+import os
+
+# Seconds between startup attempts while Neo4j is unreachable.
+STARTUP_RETRY_INTERVAL = float(os.getenv("STARTUP_RETRY_INTERVAL", "5"))
+
+_imported_at = time.monotonic()
+
+class Readiness:
+    """
+    Startup state of the worker, for GET /health/ready.
+
+    The lifespan runs the warm-up (driver pool, indexes, change feed load, ...) on a
+    background thread so the process answers liveness probes right away; the worker is
+    ready once every phase has completed, and stops being ready when shutdown begins.
+    """
+
+    def __init__(self):
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.phases = {}
+        self.attempts = 0
+        self.error = None
+        self.ready_after = None
+
+    @property
+    def ready(self):
+        return self._ready.is_set() and not self._stop.is_set()
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        yield
+        self.phases[name] = round((time.perf_counter() - start) * 1000, 3)
+
+    def start(self, warmup):
+        """Runs `warmup()` on a thread, retrying until it succeeds or stop() is called."""
+        self._stop.clear()
+        self._ready.clear()
+        self._thread = threading.Thread(target=self._run, args=(warmup,), name="startup", daemon=True)
+        self._thread.start()
+
+    def _run(self, warmup):
+        while not self._stop.is_set():
+            self.attempts += 1
+            try:
+                warmup()
+            except Exception as e:
+                self.error = str(e)
+                print(f"Startup attempt {self.attempts} failed: {e}")
+                self._stop.wait(STARTUP_RETRY_INTERVAL)
+                continue
+            self.error = None
+            self.ready_after = round(time.monotonic() - _imported_at, 3)
+            self._ready.set()
+            return
+
+    def wait(self, timeout=None):
+        return self._ready.wait(timeout)
+
+    def stop(self, timeout: float = 30):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def stats(self):
+        return {
+            "ready": self.ready,
+            "attempts": self.attempts,
+            "error": self.error,
+            # Seconds from app import to ready; close to process start for uvicorn workers.
+            "ready_after_seconds": self.ready_after,
+            "phases_ms": dict(self.phases),
+        }
+
+readiness = Readiness()
@@ -0,0 +1,389 @@
+from neo4j import Driver
+from neo4j import READ_ACCESS
+from app.database import execute_read
+from app.core.tenancy import TenantLocal, current_database
+from app.core.bookmarks import client_bookmarks
+import threading
+import json
+import time
+import sys
+import os
+
+REPLICA_ENABLED = os.getenv("REPLICA_ENABLED", "false").lower() in ("1", "true", "yes")
+# Reads fall back to Neo4j once the replica has not synced for this many seconds.
+REPLICA_MAX_STALENESS = float(os.getenv("REPLICA_MAX_STALENESS", "5"))
+
+def _s(value):
+    # Names, types and ids repeat a lot across millions of objects; intern them.
+    return sys.intern(value) if isinstance(value, str) else value
+
+def _parse_configuration(raw):
+    try:
+        return json.loads(raw)
+    except:
+        return {}
+
+class _Table:
+    """
+    Column store for one object kind. Every object gets an integer slot;
+    string ids are only kept in the `index` and `ids` column.
+    """
+
+    def __init__(self, *columns):
+        self.index = {}
+        self.ids = []
+        self.free = []
+        self.columns = {c: [] for c in columns}
+
+    def __len__(self):
+        return len(self.index)
+
+    def col(self, name):
+        return self.columns[name]
+
+    def slot(self, obj_id):
+        return self.index.get(obj_id)
+
+    def insert(self, obj_id):
+        slot = self.index.get(obj_id)
+        if slot is not None:
+            return slot
+        if self.free:
+            slot = self.free.pop()
+            self.ids[slot] = obj_id
+        else:
+            slot = len(self.ids)
+            self.ids.append(obj_id)
+            for values in self.columns.values():
+                values.append(None)
+        self.index[obj_id] = slot
+        return slot
+
+    def delete(self, obj_id):
+        slot = self.index.pop(obj_id, None)
+        if slot is None:
+            return None
+        self.ids[slot] = None
+        for values in self.columns.values():
+            values[slot] = None
+        self.free.append(slot)
+        return slot
+
+class _State:
+    def __init__(self):
+        self.entities = _Table("name", "description", "facets", "outgoing", "incoming")
+        self.relations = _Table("name", "description", "source", "target", "facets")
+        # owner is an entity or relation slot, owner_is_entity says which table it points into
+        self.facets = _Table("type", "configuration", "owner", "owner_is_entity")
+
+class GraphReplica:
+    """
+    Whole-model in-memory copy of the entity/relation/facet graph.
+
+    Loaded once per worker and kept fresh by the change feed. Read methods return
+    the same dict shapes as the services, so they can be served interchangeably.
+    """
+
+    def __init__(self):
+        self._state = None
+        self._lock = threading.RLock()
+        self.loaded_at = None
+
+    def is_fresh(self):
+        if not REPLICA_ENABLED or self._state is None:
+            return False
+        if client_bookmarks():
+            # The client asked for read-your-writes against a specific database state;
+            # only Neo4j can honour that.
+            return False
+        from app.core.changelog import change_feed
+        if not change_feed.running:
+            return False
+        return time.monotonic() - change_feed.last_sync <= REPLICA_MAX_STALENESS
+
+    def stats(self):
+        state = self._state
+        if state is None:
+            return {"loaded": False}
+        return {
+            "loaded": True,
+            "fresh": self.is_fresh(),
+            "entities": len(state.entities),
+            "relations": len(state.relations),
+            "facets": len(state.facets),
+        }
+
+    # ---- change feed consumer ----
+
+    def load(self, driver: Driver):
+        state = _State()
+        with driver.session(database=current_database(), default_access_mode=READ_ACCESS) as session:
+            for r in session.run("MATCH (n:Entity) RETURN n.id as id, n.name as name, n.description as description"):
+                self._put_entity(state, r["id"], r["name"], r["description"])
+
+            rel_query = """
+            MATCH (s:Entity)-[:HAS_OUTGOING]->(r:RelationDefinition)-[:TARGETS]->(t:Entity)
+            RETURN r.id as id, r.name as name, r.description as description, s.id as sid, t.id as tid
+            """
+            for r in session.run(rel_query):
+                self._put_relation(state, r["id"], r["name"], r["description"], r["sid"], r["tid"])
+
+            facet_query = """
+            MATCH (o)-[:HAS_FACET]->(f:Facet)
+            RETURN f.id as id, f.type as type, f.configuration as configuration, o.id as oid, o:Entity as on_entity
+            """
+            for r in session.run(facet_query):
+                self._put_facet(state, r["id"], r["type"], r["configuration"], r["oid"], r["on_entity"])
+
+        with self._lock:
+            self._state = state
+            self.loaded_at = time.time()
+
+    def apply(self, driver: Driver, events: list):
+        upserts = {"Entity": set(), "Relation": set(), "Facet": set()}
+        for e in events:
+            if e["op"] == "upsert":
+                upserts[e["kind"]].add(e["id"])
+
+        # Fetch current values for everything upserted in this batch in three round-trips.
+        entities = relations = facets = {}
+        if upserts["Entity"]:
+            records, _, _ = execute_read(
+                driver,
+                "MATCH (n:Entity) WHERE n.id IN $ids RETURN n.id as id, n.name as name, n.description as description",
+                ids=list(upserts["Entity"])
+            )
+            entities = {r["id"]: r for r in records}
+        if upserts["Relation"]:
+            records, _, _ = execute_read(
+                driver,
+                """
+                MATCH (s:Entity)-[:HAS_OUTGOING]->(r:RelationDefinition)-[:TARGETS]->(t:Entity)
+                WHERE r.id IN $ids
+                RETURN r.id as id, r.name as name, r.description as description, s.id as sid, t.id as tid
+                """,
+                ids=list(upserts["Relation"])
+            )
+            relations = {r["id"]: r for r in records}
+        if upserts["Facet"]:
+            records, _, _ = execute_read(
+                driver,
+                """
+                MATCH (o)-[:HAS_FACET]->(f:Facet) WHERE f.id IN $ids
+                RETURN f.id as id, f.type as type, f.configuration as configuration, o.id as oid, o:Entity as on_entity
+                """,
+                ids=list(upserts["Facet"])
+            )
+            facets = {r["id"]: r for r in records}
+
+        with self._lock:
+            state = self._state
+            if state is None:
+                return
+            for e in events:
+                kind, obj_id = e["kind"], e["id"]
+                if e["op"] == "delete":
+                    if kind == "Entity":
+                        self._drop_entity(state, obj_id)
+                    elif kind == "Relation":
+                        self._drop_relation(state, obj_id)
+                    else:
+                        self._drop_facet(state, obj_id)
+                elif kind == "Entity" and obj_id in entities:
+                    r = entities[obj_id]
+                    self._put_entity(state, r["id"], r["name"], r["description"])
+                elif kind == "Relation" and obj_id in relations:
+                    r = relations[obj_id]
+                    self._put_relation(state, r["id"], r["name"], r["description"], r["sid"], r["tid"])
+                elif kind == "Facet" and obj_id in facets:
+                    r = facets[obj_id]
+                    self._put_facet(state, r["id"], r["type"], r["configuration"], r["oid"], r["on_entity"])
+
+    # ---- mutation helpers ----
+
+    def _put_entity(self, state, eid, name, description):
+        t = state.entities
+        slot = t.insert(_s(eid))
+        t.col("name")[slot] = _s(name)
+        t.col("description")[slot] = description
+        if t.col("facets")[slot] is None:
+            t.col("facets")[slot] = []
+            t.col("outgoing")[slot] = []
+            t.col("incoming")[slot] = []
+
+    def _put_relation(self, state, rid, name, description, sid, tid):
+        src = state.entities.slot(sid)
+        tgt = state.entities.slot(tid)
+        if src is None or tgt is None:
+            return
+        t = state.relations
+        slot = t.slot(rid)
+        if slot is None:
+            slot = t.insert(_s(rid))
+            t.col("facets")[slot] = []
+            t.col("source")[slot] = src
+            t.col("target")[slot] = tgt
+            state.entities.col("outgoing")[src].append(slot)
+            state.entities.col("incoming")[tgt].append(slot)
+        t.col("name")[slot] = _s(name)
+        t.col("description")[slot] = description
+
+    def _put_facet(self, state, fid, ftype, configuration, oid, on_entity):
+        owner_table = state.entities if on_entity else state.relations
+        owner = owner_table.slot(oid)
+        if owner is None:
+            return
+        t = state.facets
+        slot = t.slot(fid)
+        if slot is None:
+            slot = t.insert(_s(fid))
+            t.col("owner")[slot] = owner
+            t.col("owner_is_entity")[slot] = bool(on_entity)
+            owner_table.col("facets")[owner].append(slot)
+        t.col("type")[slot] = _s(ftype)
+        t.col("configuration")[slot] = _parse_configuration(configuration)
+
+    def _drop_facet(self, state, fid):
+        t = state.facets
+        slot = t.slot(fid)
+        if slot is None:
+            return
+        owner_table = state.entities if t.col("owner_is_entity")[slot] else state.relations
+        owner_facets = owner_table.col("facets")[t.col("owner")[slot]]
+        if owner_facets is not None and slot in owner_facets:
+            owner_facets.remove(slot)
+        t.delete(fid)
+
+    def _drop_relation(self, state, rid):
+        t = state.relations
+        slot = t.slot(rid)
+        if slot is None:
+            return
+        for f in list(t.col("facets")[slot]):
+            self._drop_facet(state, state.facets.ids[f])
+        src, tgt = t.col("source")[slot], t.col("target")[slot]
+        outgoing = state.entities.col("outgoing")[src]
+        incoming = state.entities.col("incoming")[tgt]
+        if outgoing is not None and slot in outgoing:
+            outgoing.remove(slot)
+        if incoming is not None and slot in incoming:
+            incoming.remove(slot)
+        t.delete(rid)
+
+    def _drop_entity(self, state, eid):
+        t = state.entities
+        slot = t.slot(eid)
+        if slot is None:
+            return
+        for r in list(t.col("outgoing")[slot]) + list(t.col("incoming")[slot]):
+            rid = state.relations.ids[r]
+            if rid is not None:
+                self._drop_relation(state, rid)
+        for f in list(t.col("facets")[slot]):
+            self._drop_facet(state, state.facets.ids[f])
+        t.delete(eid)
+
+    # ---- reads ----
+
+    def _facet_dict(self, state, slot):
+        f = state.facets
+        return {
+            "id": f.ids[slot],
+            "type": f.col("type")[slot],
+            "configuration": f.col("configuration")[slot]
+        }
+
+    def _relation_dict(self, state, slot):
+        r = state.relations
+        e = state.entities
+        return {
+            "id": r.ids[slot],
+            "source_entity_id": e.ids[r.col("source")[slot]],
+            "target_entity_id": e.ids[r.col("target")[slot]],
+            "name": r.col("name")[slot],
+            "description": r.col("description")[slot],
+            "facets": [self._facet_dict(state, f) for f in r.col("facets")[slot]]
+        }
+
+    def get_entity(self, entity_id: str):
+        with self._lock:
+            state = self._state
+            e = state.entities
+            slot = e.slot(entity_id)
+            if slot is None:
+                return None
+            return {
+                "id": e.ids[slot],
+                "name": e.col("name")[slot],
+                "description": e.col("description")[slot],
+                "facets": [self._facet_dict(state, f) for f in e.col("facets")[slot]],
+                "outgoing_relations": [self._relation_dict(state, r) for r in e.col("outgoing")[slot]],
+                "incoming_relations": [self._relation_dict(state, r) for r in e.col("incoming")[slot]]
+            }
+
+    def get_all_entities(self):
+        with self._lock:
+            e = self._state.entities
+            names = e.col("name")
+            descriptions = e.col("description")
+            return [
+                {
+                    "id": eid,
+                    "name": names[slot],
+                    "description": descriptions[slot],
+                    "facets": [], "outgoing_relations": [], "incoming_relations": []
+                }
+                for slot, eid in enumerate(e.ids) if eid is not None
+            ]
+
+    def get_relation(self, relation_id: str):
+        with self._lock:
+            state = self._state
+            slot = state.relations.slot(relation_id)
+            if slot is None:
+                return None
+            return self._relation_dict(state, slot)
+
+    def get_facet(self, facet_id: str):
+        with self._lock:
+            state = self._state
+            f = state.facets
+            slot = f.slot(facet_id)
+            if slot is None:
+                return None
+            on_entity = f.col("owner_is_entity")[slot]
+            owner_table = state.entities if on_entity else state.relations
+            owner_id = owner_table.ids[f.col("owner")[slot]]
+            res = self._facet_dict(state, slot)
+            res["entity_id"] = owner_id if on_entity else None
+            res["relation_id"] = None if on_entity else owner_id
+            return res
+
+    def get_graph(self):
+        with self._lock:
+            state = self._state
+            e = state.entities
+            r = state.relations
+            nodes = [
+                {
+                    "id": eid,
+                    "name": e.col("name")[slot],
+                    "description": e.col("description")[slot],
+                    "facets": [self._facet_dict(state, f) for f in e.col("facets")[slot]]
+                }
+                for slot, eid in enumerate(e.ids) if eid is not None
+            ]
+            edges = [
+                {
+                    "source_id": e.ids[r.col("source")[slot]],
+                    "target_id": e.ids[r.col("target")[slot]],
+                    "relation_name": r.col("name")[slot],
+                    "relation_id": rid,
+                    "facets": [self._facet_dict(state, f) for f in r.col("facets")[slot]]
+                }
+                for slot, rid in enumerate(r.ids) if rid is not None
+            ]
+            return {"nodes": nodes, "edges": edges}
+
+# One replica per tenant; this name resolves to the current tenant's.
+replica = TenantLocal("replica")
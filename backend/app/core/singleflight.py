@@ -0,0 +1,104 @@
+import asyncio
+import threading
+import os
+
+SINGLEFLIGHT_ENABLED = os.getenv("SINGLEFLIGHT_ENABLED", "true").lower() == "true"
+
+# Result handed to async waiters when their leader was cancelled: they start over.
+_RETRY = object()
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+class SingleFlight:
+    """
+    Deduplicates identical work in flight: the first caller for a key runs it, callers
+    arriving before it finishes wait and share its result (or its exception). Nothing
+    is cached once the call returns.
+
+    `do` is for sync code (threadpool endpoints), `do_async` for coroutines; waiters of
+    `do_async` hold no thread while they wait.
+    """
+
+    def __init__(self, enabled: bool = SINGLEFLIGHT_ENABLED):
+        self.enabled = enabled
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._async_calls = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        if not self.enabled:
+            return fn()
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def do_async(self, key, fn):
+        """`fn` returns an awaitable."""
+        if not self.enabled:
+            return await fn()
+        loop = asyncio.get_running_loop()
+        # Futures belong to one event loop; keys are kept apart per loop.
+        key = (id(loop), key)
+        while key in self._async_calls:
+            self.coalesced += 1
+            # shield: a cancelled waiter must not cancel the shared call.
+            result = await asyncio.shield(self._async_calls[key])
+            if result is not _RETRY:
+                return result
+
+        future = self._async_calls[key] = loop.create_future()
+        self.executed += 1
+        try:
+            result = await fn()
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            # Only the leader is cancelled. Its waiters retry; the first one leads.
+            future.set_result(_RETRY)
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Retrieved here so an unobserved failure is not logged as never retrieved.
+            future.exception()
+            raise
+        finally:
+            del self._async_calls[key]
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._calls) + len(self._async_calls),
+        }
+
+singleflight = SingleFlight()
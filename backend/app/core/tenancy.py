@@ -0,0 +1,287 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+import re
+import threading
+import time
+import os
+
+TENANT_HEADER = os.getenv("TENANT_HEADER", "X-Tenant-Id")
+DEFAULT_TENANT = os.getenv("DEFAULT_TENANT", "default")
+# Reject requests without a tenant header instead of serving the default tenant.
+TENANT_REQUIRED = os.getenv("TENANT_REQUIRED", "false").lower() == "true"
+# "acme=acme,globex=globex-models": tenant id -> Neo4j database.
+TENANT_DATABASES = os.getenv("TENANT_DATABASES", "")
+# Database for tenants not listed above, e.g. "tenant-{tenant}". Empty: unlisted tenants are rejected.
+TENANT_DATABASE_TEMPLATE = os.getenv("TENANT_DATABASE_TEMPLATE", "")
+# Quotas per tenant; 0 disables them.
+TENANT_MAX_ENTITIES = int(os.getenv("TENANT_MAX_ENTITIES", "0"))
+TENANT_RATE_LIMIT_PER_SECOND = float(os.getenv("TENANT_RATE_LIMIT_PER_SECOND", "0"))
+TENANT_RATE_LIMIT_BURST = float(os.getenv("TENANT_RATE_LIMIT_BURST", "200"))
+# Tenants kept in memory (change feed, indexes) per worker; the least recently used is
+# stopped beyond this. The default tenant is never evicted.
+TENANT_MAX_ACTIVE = int(os.getenv("TENANT_MAX_ACTIVE", "64"))
+# Seconds between SHOW DATABASES lookups of the job runners (template tenants only).
+TENANT_DISCOVERY_INTERVAL = float(os.getenv("TENANT_DISCOVERY_INTERVAL", "60"))
+
+_TENANT_ID = re.compile(r"^[a-z0-9][a-z0-9-]{0,62}$")
+
+def _parse_mapping(text):
+    mapping = {}
+    for item in text.split(","):
+        if "=" in item:
+            tenant, database = item.split("=", 1)
+            mapping[tenant.strip()] = database.strip()
+    return mapping
+
+class UnknownTenant(Exception):
+    pass
+
+def _template_pattern(template):
+    # "tenant-{tenant}" -> ^tenant-(<tenant id>)$, to recognise tenant databases.
+    if "{tenant}" not in template:
+        return None
+    prefix, _, suffix = template.partition("{tenant}")
+    return re.compile(f"^{re.escape(prefix)}({_TENANT_ID.pattern[1:-1]}){re.escape(suffix)}$")
+
+def resolve_database(tenant: str):
+    from app.database import NEO4J_DATABASE
+    if tenant == DEFAULT_TENANT:
+        return NEO4J_DATABASE
+    mapping = _parse_mapping(TENANT_DATABASES)
+    if tenant in mapping:
+        return mapping[tenant]
+    if TENANT_DATABASE_TEMPLATE and _TENANT_ID.match(tenant):
+        return TENANT_DATABASE_TEMPLATE.format(tenant=tenant)
+    raise UnknownTenant(tenant)
+
+# (tenant id, database) of the current request or background task; unset means the default.
+_current: ContextVar = ContextVar("tenant", default=None)
+
+def current_tenant():
+    current = _current.get()
+    return current[0] if current is not None else DEFAULT_TENANT
+
+def current_database():
+    current = _current.get()
+    if current is not None:
+        return current[1]
+    from app.database import NEO4J_DATABASE
+    return NEO4J_DATABASE
+
+@contextmanager
+def use_tenant(tenant: str, database: str = None):
+    token = _current.set((tenant, database or resolve_database(tenant)))
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+class TenantState:
+    """Per-tenant in-memory state: the change feed tailing the tenant's database and its consumers."""
+
+    def __init__(self, tenant: str, database: str):
+        from app.core.changelog import ChangeFeed
+        from app.core.dag import DagIndex, DAG_INDEX_ENABLED
+        from app.core.replica import GraphReplica, REPLICA_ENABLED
+        self.tenant = tenant
+        self.database = database
+        self.change_feed = ChangeFeed(tenant, database)
+        self.dag_index = DagIndex()
+        self.replica = GraphReplica()
+        if DAG_INDEX_ENABLED:
+            self.dag_index.live = True
+            self.change_feed.subscribe(self.dag_index)
+        if REPLICA_ENABLED:
+            self.change_feed.subscribe(self.replica)
+        # Last layout and node ordering (app/services/layout_service.py).
+        self.layout_cache = {"version": None, "layout": None, "rank": {}}
+        self.started = False
+        self.requests = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.quota_rejections = 0
+        self.latency_total = 0.0
+
+    def stats(self):
+        return {
+            "database": self.database,
+            "started": self.started,
+            "change_feed_running": self.change_feed.running,
+            "dag_index": {
+                "live": self.dag_index.live,
+                "entities": len(self.dag_index.succ),
+                "relations": len(self.dag_index.edges),
+                "stale": self.dag_index.stale,
+                "skipped_edges": self.dag_index.skipped_edges,
+            } if self.dag_index.loaded else None,
+            "requests": self.requests,
+            "errors": self.errors,
+            "rate_limited": self.rate_limited,
+            "quota_rejections": self.quota_rejections,
+            "mean_latency_ms": round(self.latency_total / self.requests * 1000, 3) if self.requests else 0.0,
+        }
+
+class TenantRegistry:
+    """
+    Tenants are created on first use. The default tenant is started during warm-up; other
+    tenants start (indexes, change feed load) on their first request.
+
+    At most TENANT_MAX_ACTIVE tenants are held; the least recently used one is stopped and
+    dropped, and starts again on its next request. A tenant whose database does not exist
+    is dropped when it fails to start.
+    """
+
+    def __init__(self):
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+        self._discovered = []
+        self._discovered_at = None
+        self._start_lock = threading.Lock()
+        self.buckets = None
+        if TENANT_RATE_LIMIT_PER_SECOND > 0:
+            from app.core.admission import TokenBuckets
+            self.buckets = TokenBuckets(TENANT_RATE_LIMIT_PER_SECOND, TENANT_RATE_LIMIT_BURST, 100000)
+
+    def state(self, tenant: str = None):
+        tenant = tenant or current_tenant()
+        state = self._states.get(tenant)
+        evicted = []
+        if state is None:
+            database = current_database() if tenant == current_tenant() else resolve_database(tenant)
+            with self._lock:
+                state = self._states.get(tenant)
+                if state is None:
+                    state = self._states[tenant] = TenantState(tenant, database)
+                    evicted = self._evict_locked()
+        else:
+            with self._lock:
+                if tenant in self._states:
+                    self._states.move_to_end(tenant)
+        for old in evicted:
+            self._stop_later(old)
+        return state
+
+    def _evict_locked(self):
+        evicted = []
+        for name in list(self._states):
+            if len(self._states) <= max(TENANT_MAX_ACTIVE, 1):
+                break
+            if name != DEFAULT_TENANT:
+                evicted.append(self._states.pop(name))
+        return evicted
+
+    def _stop_later(self, state):
+        # stop() joins the feed thread; keep that off the request path.
+        threading.Thread(target=state.change_feed.stop, name="tenant-stop", daemon=True).start()
+
+    def drop(self, tenant: str):
+        with self._lock:
+            state = self._states.pop(tenant, None)
+        if state is not None and tenant != DEFAULT_TENANT:
+            self._stop_later(state)
+
+    def start(self, driver, tenant: str = None):
+        """
+        Creates the tenant's indexes and starts its change feed (no-op once started).
+        Raises UnknownTenant, and forgets the tenant, when its database does not exist.
+        """
+        from app.core.indexes import ensure_indexes
+        from neo4j.exceptions import ClientError
+        state = self.state(tenant)
+        if state.started:
+            return state
+        with self._start_lock, use_tenant(state.tenant, state.database):
+            if not state.started:
+                try:
+                    ensure_indexes(driver)
+                    state.change_feed.start(driver)
+                except ClientError as e:
+                    if e.code == "Neo.ClientError.Database.DatabaseNotFound" and state.tenant != DEFAULT_TENANT:
+                        self.drop(state.tenant)
+                        raise UnknownTenant(state.tenant) from e
+                    raise
+                state.started = True
+        return state
+
+    def stop(self):
+        for state in list(self._states.values()):
+            state.change_feed.stop()
+            state.started = False
+
+    def tenants(self):
+        return list(self._states.values())
+
+    def known(self, driver=None):
+        """
+        The default tenant, the mapped ones, the active ones and, with a database template
+        and a driver, every tenant whose database exists (SHOW DATABASES, cached for
+        TENANT_DISCOVERY_INTERVAL seconds).
+        """
+        names = [DEFAULT_TENANT] + list(_parse_mapping(TENANT_DATABASES))
+        if driver is not None and TENANT_DATABASE_TEMPLATE:
+            names += self._discover(driver)
+        return list(dict.fromkeys(names + list(self._states)))
+
+    def _discover(self, driver):
+        now = time.monotonic()
+        if self._discovered_at is not None and now - self._discovered_at < TENANT_DISCOVERY_INTERVAL:
+            return self._discovered
+        pattern = _template_pattern(TENANT_DATABASE_TEMPLATE)
+        if pattern is None:
+            return []
+        try:
+            records, _, _ = driver.execute_query("SHOW DATABASES YIELD name RETURN DISTINCT name", database_="system")
+        except Exception as e:
+            print(f"Tenant discovery failed: {e}")
+            return self._discovered
+        found = [m.group(1) for m in (pattern.match(r["name"]) for r in records) if m]
+        self._discovered, self._discovered_at = found, now
+        return found
+
+    def stats(self):
+        return {state.tenant: state.stats() for state in self.tenants()}
+
+tenants = TenantRegistry()
+
+class TenantLocal:
+    """
+    Module-level handle (`dag_index`, `replica`, `change_feed`) that forwards to the
+    instance of the current tenant, so callers keep using one name.
+    """
+
+    def __init__(self, attribute: str):
+        self._attribute = attribute
+
+    def __getattr__(self, name):
+        return getattr(getattr(tenants.state(), self._attribute), name)
+
+    def __repr__(self):
+        return f"<{self._attribute} of tenant {current_tenant()}>"
+
+def record_request(state: TenantState, started: float, status_code: int):
+    state.requests += 1
+    state.latency_total += time.perf_counter() - started
+    if status_code >= 500:
+        state.errors += 1
+
+def check_entity_quota(driver, ids):
+    """Raises 403 when creating the entities `ids` would take the tenant past TENANT_MAX_ENTITIES."""
+    if TENANT_MAX_ENTITIES <= 0:
+        return
+    from fastapi import HTTPException
+    from app.database import execute_read
+    state = tenants.state()
+    records, _, _ = execute_read(driver, """
+    MATCH (n:Entity) WITH count(n) as total
+    OPTIONAL MATCH (e:Entity) WHERE e.id IN $ids
+    RETURN total, count(e) as existing
+    """, ids=list(set(ids)))
+    total, existing = records[0]["total"], records[0]["existing"]
+    new = len(set(ids)) - existing
+    if new and total + new > TENANT_MAX_ENTITIES:
+        state.quota_rejections += 1
+        raise HTTPException(
+            status_code=403,
+            detail=f"Entity quota of tenant {state.tenant} exceeded ({TENANT_MAX_ENTITIES} entities)"
+        )
@@ -1,11 +1,166 @@
-from neo4j import GraphDatabase
+from neo4j import GraphDatabase, Driver, RoutingControl
+from app.core.bookmarks import current_bookmark_manager
+from app.core.singleflight import singleflight
+from app.core.tenancy import current_database
+from app.core.profiling import timed
+import threading
+import json
+import time
 import os
 
 NEO4J_URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
 NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "password")
+# Database of the default tenant. Queries go to the current tenant's database (app/core/tenancy.py).
+NEO4J_DATABASE = os.getenv("NEO4J_DATABASE", "neo4j")
 
-driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+# Connection pool settings, per worker process.
+# Total connections to Neo4j = workers x NEO4J_MAX_POOL_SIZE.
+NEO4J_MAX_POOL_SIZE = int(os.getenv("NEO4J_MAX_POOL_SIZE", "40"))
+NEO4J_MAX_CONNECTION_LIFETIME = float(os.getenv("NEO4J_MAX_CONNECTION_LIFETIME", "3600"))
+NEO4J_CONNECTION_ACQUISITION_TIMEOUT = float(os.getenv("NEO4J_CONNECTION_ACQUISITION_TIMEOUT", "30"))
+# Idle connections older than this are pinged before reuse.
+NEO4J_LIVENESS_CHECK_TIMEOUT = float(os.getenv("NEO4J_LIVENESS_CHECK_TIMEOUT", "30"))
+# Connections opened at startup so the first requests don't pay the handshake.
+NEO4J_WARMUP_CONNECTIONS = int(os.getenv("NEO4J_WARMUP_CONNECTIONS", "4"))
+
+class DriverManager:
+    """
+    Owns the Neo4j driver of the current worker process.
+
+    Started from the FastAPI lifespan. If used before that (scripts, TestClient without
+    a `with` block) the driver is created lazily. A driver inherited through fork() is
+    never reused: the child creates its own pool.
+    """
+
+    def __init__(self):
+        self._driver = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.started_at = None
+        self.warmup_seconds = None
+
+    def get(self) -> Driver:
+        if self._driver is None or self._pid != os.getpid():
+            with self._lock:
+                if self._driver is None or self._pid != os.getpid():
+                    self._create()
+        return self._driver
+
+    def _create(self):
+        self._driver = GraphDatabase.driver(
+            NEO4J_URI,
+            auth=(NEO4J_USER, NEO4J_PASSWORD),
+            max_connection_pool_size=NEO4J_MAX_POOL_SIZE,
+            max_connection_lifetime=NEO4J_MAX_CONNECTION_LIFETIME,
+            connection_acquisition_timeout=NEO4J_CONNECTION_ACQUISITION_TIMEOUT,
+            liveness_check_timeout=NEO4J_LIVENESS_CHECK_TIMEOUT,
+        )
+        self._pid = os.getpid()
+        self.started_at = time.time()
+
+    def start(self):
+        driver = self.get()
+        driver.verify_connectivity()
+        self.warmup(NEO4J_WARMUP_CONNECTIONS)
+        return driver
+
+    def warmup(self, connections: int):
+        # Hold `connections` transactions open at once so the pool really opens that many sockets.
+        start = time.perf_counter()
+        driver = self.get()
+        sessions = []
+        try:
+            for _ in range(min(connections, NEO4J_MAX_POOL_SIZE)):
+                session = driver.session(database=NEO4J_DATABASE)
+                sessions.append(session)
+                tx = session.begin_transaction()
+                tx.run("RETURN 1").consume()
+        finally:
+            for session in sessions:
+                session.close()
+        self.warmup_seconds = time.perf_counter() - start
+
+    def close(self):
+        with self._lock:
+            if self._driver is not None and self._pid == os.getpid():
+                self._driver.close()
+            self._driver = None
+            self._pid = None
+
+    def pool_metrics(self):
+        metrics = {
+            "pid": os.getpid(),
+            "started": self._driver is not None,
+            "max_pool_size": NEO4J_MAX_POOL_SIZE,
+            "warmup_seconds": self.warmup_seconds,
+            "addresses": {},
+        }
+        if self._driver is None:
+            return metrics
+        # The driver has no public pool API; read its internals defensively.
+        pool = getattr(self._driver, "_pool", None)
+        connections = getattr(pool, "connections", {}) or {}
+        for address, conns in list(connections.items()):
+            in_use = sum(1 for c in list(conns) if getattr(c, "in_use", False))
+            metrics["addresses"][str(address)] = {
+                "open": len(conns),
+                "in_use": in_use,
+                "idle": len(conns) - in_use,
+            }
+        return metrics
+
+driver_manager = DriverManager()
 
 def get_driver():
-    return driver
+    return driver_manager.get()
+
+def execute_read(driver: Driver, query, parameters=None, **kwargs):
+    """
+    Run a read-only query. In a cluster it may be served by a follower.
+
+    Identical reads already in flight on this worker are coalesced into one query. The key
+    includes the bookmarks the read waits for, so a read never joins one that started
+    before a write it must see.
+    """
+    database = current_database()
+    bookmark_manager = current_bookmark_manager(driver)
+    run = lambda: driver.execute_query(
+        query,
+        parameters_=parameters,
+        routing_=RoutingControl.READ,
+        database_=database,
+        bookmark_manager_=bookmark_manager,
+        **kwargs
+    )
+    with timed("db"):
+        if any(k.endswith("_") for k in kwargs):
+            return run()  # driver options (result_transformer_, ...) are not part of the key
+        try:
+            params = json.dumps([parameters, kwargs], sort_keys=True)
+        except TypeError:
+            return run()
+        key = (database, query, params, frozenset(bookmark_manager.get_bookmarks()))
+        return singleflight.do(key, run)
+
+def execute_write(driver: Driver, query, parameters=None, **kwargs):
+    """Run a query on the leader."""
+    database = current_database()
+    with timed("db"):
+        return driver.execute_query(
+            query,
+            parameters_=parameters,
+            routing_=RoutingControl.WRITE,
+            database_=database,
+            bookmark_manager_=current_bookmark_manager(driver),
+            **kwargs
+        )
+
+def write_transaction(driver: Driver, work, *args, **kwargs):
+    """
+    Run `work(tx, *args, **kwargs)` in one transaction on the leader. Transient failures
+    retry the whole function, so it must not have side effects outside the transaction.
+    """
+    with timed("db"):
+        with driver.session(database=current_database(), bookmark_manager=current_bookmark_manager(driver)) as session:
+            return session.execute_write(work, *args, **kwargs)
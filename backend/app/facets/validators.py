@@ -0,0 +1,280 @@
+from collections import OrderedDict
+from typing import Any, List, Optional, Literal
+from decimal import Decimal
+import datetime
+import hashlib
+import json
+import threading
+import os
+from neo4j import Driver
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import StreamingResponse
+from pydantic import ConfigDict, Field, ValidationError, create_model
+from app.database import execute_read
+from app.core.tenancy import current_database
+
+VALIDATOR_CACHE_SIZE = int(os.getenv("VALIDATOR_CACHE_SIZE", "1024"))
+# Max number of relations followed when collecting inherited property facets.
+INHERIT_MAX_DEPTH = int(os.getenv("INHERIT_MAX_DEPTH", "10"))
+# Longest NDJSON row accepted by validate:batch; longer rows are reported, not buffered.
+VALIDATE_MAX_ROW_BYTES = int(os.getenv("VALIDATE_MAX_ROW_BYTES", str(1024 * 1024)))
+
+# Property facet `dataType` -> Python type used in the generated model.
+DATA_TYPES = {
+    "string": str,
+    "str": str,
+    "text": str,
+    "integer": int,
+    "int": int,
+    "float": float,
+    "double": float,
+    "number": float,
+    "decimal": Decimal,
+    "boolean": bool,
+    "bool": bool,
+    "date": datetime.date,
+    "datetime": datetime.datetime,
+    "time": datetime.time,
+    "object": dict,
+    "json": dict,
+    "array": list,
+    "list": list,
+    "enum": str,
+}
+
+class CompiledValidator:
+    """
+    Pydantic model generated from an entity's property facets.
+
+    `version` is a fingerprint of the facets it was built from; any facet change
+    produces a different version and therefore a recompile.
+    """
+
+    def __init__(self, entity_id: str, version: str, model, fields: List[dict]):
+        self.entity_id = entity_id
+        self.version = version
+        self.model = model
+        self.fields = fields
+        # pydantic-core validator; validates raw JSON without a json.loads round-trip
+        self._validator = model.__pydantic_validator__
+
+    def validate_json(self, raw):
+        """Returns None when valid, otherwise a list of {loc, msg, type}."""
+        try:
+            self._validator.validate_json(raw)
+            return None
+        except ValidationError as e:
+            return [
+                {"loc": list(err["loc"]), "msg": err["msg"], "type": err["type"]}
+                for err in e.errors(include_url=False)
+            ]
+
+def _field_type(configuration: dict):
+    data_type = str(configuration.get("dataType", configuration.get("datatype", ""))).lower()
+    values = configuration.get("values") or configuration.get("options")
+    if data_type == "enum" and isinstance(values, list):
+        # Literal needs hashable values; JSON objects and arrays cannot be enum members.
+        values = [v for v in values if v is None or isinstance(v, (str, int, float, bool))]
+        return Literal[tuple(values)] if values else Any
+    return DATA_TYPES.get(data_type, Any)
+
+def compile_validator(entity_id: str, version: str, facets: List[dict], allow_extra: bool):
+    """
+    `facets` are {"configuration": dict, "depth": int}; depth 0 is the entity itself.
+    When an inherited property has the same name as a nearer one, the nearer one wins.
+    """
+    fields = {}
+    seen = set()
+    described = []
+    for facet in sorted(facets, key=lambda f: f["depth"]):
+        conf = facet["configuration"]
+        name = conf.get("name")
+        if not isinstance(name, str) or not name or name in seen:
+            continue
+        seen.add(name)
+        field_type = _field_type(conf)
+        # Property names are arbitrary strings; keep them as aliases of positional field names.
+        if conf.get("required"):
+            fields[f"field_{len(seen)}"] = (field_type, Field(..., alias=name))
+        else:
+            fields[f"field_{len(seen)}"] = (Optional[field_type], Field(None, alias=name))
+        described.append({
+            "name": name,
+            "dataType": conf.get("dataType", conf.get("datatype")),
+            "required": bool(conf.get("required")),
+            "inherited": facet["depth"] > 0,
+        })
+
+    model = create_model(
+        f"EntityInstance_{entity_id.replace('-', '_')}",
+        __config__=ConfigDict(extra="allow" if allow_extra else "forbid"),
+        **fields
+    )
+    return CompiledValidator(entity_id, version, model, described)
+
+class ValidatorCache:
+    """
+    LRU of compiled validators keyed by (entity_id, inherit, allow_extra).
+
+    Every lookup re-reads the property facets (one small query) and compares their
+    fingerprint with the cached version, so facet writes from any worker invalidate it.
+    """
+
+    def __init__(self, size: int = VALIDATOR_CACHE_SIZE):
+        self._size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.compiles = 0
+
+    def _fetch_facets(self, driver: Driver, entity_id: str, inherit: bool):
+        if inherit:
+            # Follow only relations that carry a facet with {"inherit": true}: one typed
+            # entity -> relation -> entity hop at a time, at most INHERIT_MAX_DEPTH hops.
+            query = f"""
+            MATCH (n:Entity {{id: $id}})
+            CALL {{
+                WITH n
+                RETURN n as m, 0 as depth
+                UNION
+                WITH n
+                MATCH p = (n) (
+                    (:Entity)-[:HAS_OUTGOING]->(r:RelationDefinition)-[:TARGETS]->(:Entity)
+                    WHERE EXISTS {{ (r)-[:HAS_FACET]->(:Facet {{cfg_inherit: true}}) }}
+                ){{1,{INHERIT_MAX_DEPTH}}} (m:Entity)
+                RETURN DISTINCT m, min(length(p)) / 2 as depth
+            }}
+            WITH n, m, min(depth) as depth
+            OPTIONAL MATCH (m)-[:HAS_FACET]->(f:Facet {{type: 'property'}})
+            RETURN n.id as id, collect({{id: f.id, configuration: f.configuration, depth: depth}}) as facets
+            """
+        else:
+            query = """
+            MATCH (n:Entity {id: $id})
+            OPTIONAL MATCH (n)-[:HAS_FACET]->(f:Facet {type: 'property'})
+            RETURN n.id as id, collect({id: f.id, configuration: f.configuration, depth: 0}) as facets
+            """
+        records, _, _ = execute_read(driver, query, id=entity_id)
+        if not records:
+            return None
+        return [f for f in records[0]["facets"] if f["id"] is not None]
+
+    def get(self, driver: Driver, entity_id: str, inherit: bool = False, allow_extra: bool = False):
+        raw = self._fetch_facets(driver, entity_id, inherit)
+        if raw is None:
+            return None
+
+        digest = hashlib.sha1()
+        for f in sorted(raw, key=lambda f: (f["depth"], f["id"])):
+            digest.update(f"{f['id']}:{f['depth']}:{f['configuration']}\n".encode())
+        version = digest.hexdigest()[:16]
+
+        key = (current_database(), entity_id, inherit, allow_extra)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and cached.version == version:
+                self._entries.move_to_end(key)
+                return cached
+
+        facets = []
+        for f in raw:
+            try: conf = json.loads(f["configuration"])
+            except: conf = {}
+            facets.append({"configuration": conf, "depth": f["depth"]})
+        validator = compile_validator(entity_id, version, facets, allow_extra)
+
+        with self._lock:
+            self.compiles += 1
+            self._entries[key] = validator
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._size:
+                self._entries.popitem(last=False)
+        return validator
+
+validator_cache = ValidatorCache()
+
+def _row_too_large(row: int):
+    return {"row": row, "errors": [
+        {"loc": [], "msg": f"Row exceeds {VALIDATE_MAX_ROW_BYTES} bytes", "type": "row_too_large"}
+    ]}
+
+def _validate_lines(validator: CompiledValidator, lines: List[bytes], first_row: int):
+    errors = []
+    checked = 0
+    for offset, line in enumerate(lines):
+        if not line.strip():
+            continue
+        checked += 1
+        if len(line) > VALIDATE_MAX_ROW_BYTES:
+            errors.append(_row_too_large(first_row + offset))
+            continue
+        row_errors = validator.validate_json(line)
+        if row_errors:
+            errors.append({"row": first_row + offset, "errors": row_errors})
+    return checked, errors
+
+async def validate_ndjson(validator: CompiledValidator, chunks):
+    """
+    Validates an NDJSON body as it arrives and yields NDJSON output: one line per
+    invalid row ({"row": n, "errors": [...]}, rows are 1-based line numbers) and a
+    final {"summary": {...}} line. The partial row is buffered up to VALIDATE_MAX_ROW_BYTES;
+    a longer row is reported as invalid and skipped up to its newline, so memory stays
+    bounded by that cap plus the largest network chunk.
+    """
+    buffer = b""
+    row = 1
+    rows = invalid = 0
+    skipping = False
+    async for chunk in chunks:
+        if not chunk:
+            continue
+        if skipping:
+            end = chunk.find(b"\n")
+            if end < 0:
+                continue
+            chunk = chunk[end + 1:]
+            skipping = False
+            row += 1
+        buffer += chunk
+        lines = buffer.split(b"\n")
+        buffer = lines.pop()
+        if lines:
+            checked, errors = await run_in_threadpool(_validate_lines, validator, lines, row)
+            row += len(lines)
+            rows += checked
+            invalid += len(errors)
+            for error in errors:
+                yield json.dumps(error) + "\n"
+        if len(buffer) > VALIDATE_MAX_ROW_BYTES:
+            buffer = b""
+            skipping = True
+            rows += 1
+            invalid += 1
+            yield json.dumps(_row_too_large(row)) + "\n"
+
+    if buffer.strip():
+        checked, errors = await run_in_threadpool(_validate_lines, validator, [buffer], row)
+        rows += checked
+        invalid += len(errors)
+        for error in errors:
+            yield json.dumps(error) + "\n"
+
+    yield json.dumps({"summary": {
+        "entity_id": validator.entity_id,
+        "schema_version": validator.version,
+        "rows": rows,
+        "valid": rows - invalid,
+        "invalid": invalid,
+    }}) + "\n"
+
+class RequestStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose body is produced while the request body is still being read.
+
+    On ASGI servers older than spec 2.4 the stock StreamingResponse listens for client
+    disconnects by calling receive(), which would steal the request body chunks.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
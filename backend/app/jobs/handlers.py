@@ -0,0 +1,421 @@
+from abc import ABC, abstractmethod
+from neo4j import Driver
+from fastapi import HTTPException
+from app.database import execute_read
+from app.core.tenancy import check_entity_quota
+from app.services.changelog_service import ChangeLogService
+from app.services.entity_service import EntityService
+from app.services.facet_service import FacetService, SYNC_REFERENCE_CYPHER
+from app.services.consistency_service import ConsistencyService, CONSISTENCY_SAMPLE
+import json
+import os
+
+# Export files are written here and import files are read from here.
+JOB_EXPORT_DIR = os.getenv("JOB_EXPORT_DIR", "exports")
+
+def _export_path(name):
+    return os.path.join(JOB_EXPORT_DIR, name)
+
+def _count(driver: Driver, query, **params):
+    records, _, _ = execute_read(driver, query, **params)
+    return records[0]["total"]
+
+def _facet_rows(facets):
+    rows = []
+    for f in facets:
+        conf = f.get("configuration") or {}
+        rows.append({
+            "id": f["id"],
+            "type": f["type"],
+            "configuration": json.dumps(conf),
+            "fields": FacetService.extract_fields(conf),
+            "ref": FacetService.reference_target(f["type"], conf)
+        })
+    return rows
+
+def _parse_facets(facets):
+    result = []
+    for f in facets:
+        try: conf = json.loads(f["configuration"])
+        except: conf = {}
+        result.append({"id": f["id"], "type": f["type"], "configuration": conf})
+    return result
+
+# Upserts the facets in `facets` (see _facet_rows) onto owner `n`, carrying `n` along.
+MERGE_FACETS_CYPHER = f"""
+        CALL {{
+            WITH n, facets
+            UNWIND facets as fr
+            MERGE (f:Facet {{id: fr.id}})
+            SET f = {{id: fr.id, type: fr.type, configuration: fr.configuration}}
+            SET f += fr.fields
+            MERGE (n)-[:HAS_FACET]->(f)
+            WITH f, n, fr.ref as ref
+            {SYNC_REFERENCE_CYPHER}
+        }}
+"""
+
+class JobHandler(ABC):
+    """
+    One job type. `step` does one bounded batch and returns (checkpoint, done); the
+    checkpoint is persisted after every batch and passed back in after a restart, so a
+    batch must be safe to repeat. Checkpoints carry a `processed` count.
+
+    Handlers are used as classes, never instantiated, so a missing `step` is rejected
+    when the subclass is defined rather than when a job first runs.
+    """
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if getattr(cls.step, "__isabstractmethod__", False):
+            raise TypeError(f"{cls.__name__} must implement step()")
+
+    @staticmethod
+    def validate(params: dict):
+        pass
+
+    @staticmethod
+    def total(driver: Driver, job: dict):
+        return None
+
+    @staticmethod
+    @abstractmethod
+    def step(driver: Driver, job: dict, checkpoint: dict):
+        """Runs one batch. Returns (checkpoint, done)."""
+
+    @staticmethod
+    def result(job: dict, checkpoint: dict):
+        return {"processed": checkpoint["processed"]}
+
+class ExportJob(JobHandler):
+    """
+    Whole model as NDJSON: entity lines first, then relation lines, each with their facets.
+    Batches are not one snapshot; writes made during the export may be partially included.
+    """
+
+    @staticmethod
+    def total(driver: Driver, job: dict):
+        return _count(driver, "MATCH (n:Entity) RETURN count(n) as total") + \
+            _count(driver, "MATCH (r:RelationDefinition) RETURN count(r) as total")
+
+    @staticmethod
+    def step(driver: Driver, job: dict, checkpoint: dict):
+        checkpoint = checkpoint or {"phase": "entities", "after": "", "offset": 0, "entities": 0, "relations": 0, "processed": 0}
+        os.makedirs(JOB_EXPORT_DIR, exist_ok=True)
+        part = _export_path(f"{job['id']}.ndjson.part")
+
+        if checkpoint["phase"] == "entities":
+            records, _, _ = execute_read(driver, """
+            MATCH (n:Entity) WHERE n.id > $after
+            WITH n ORDER BY n.id LIMIT $limit
+            RETURN n, [(n)-[:HAS_FACET]->(f:Facet) | f] as facets
+            """, after=checkpoint["after"], limit=job["batch_size"])
+            lines = [{
+                "kind": "entity",
+                "id": r["n"]["id"],
+                "name": r["n"]["name"],
+                "description": r["n"].get("description"),
+                "facets": _parse_facets(r["facets"])
+            } for r in records]
+        else:
+            records, _, _ = execute_read(driver, """
+            MATCH (s:Entity)-[:HAS_OUTGOING]->(r:RelationDefinition)-[:TARGETS]->(t:Entity)
+            WHERE r.id > $after
+            WITH s, r, t ORDER BY r.id LIMIT $limit
+            RETURN r, s.id as sid, t.id as tid, [(r)-[:HAS_FACET]->(f:Facet) | f] as facets
+            """, after=checkpoint["after"], limit=job["batch_size"])
+            lines = [{
+                "kind": "relation",
+                "id": r["r"]["id"],
+                "source_id": r["sid"],
+                "target_id": r["tid"],
+                "name": r["r"]["name"],
+                "description": r["r"].get("description"),
+                "facets": _parse_facets(r["facets"])
+            } for r in records]
+
+        # Anything written after the last checkpoint (crash mid-batch) is dropped first.
+        with open(part, "ab") as f:
+            f.truncate(checkpoint["offset"])
+            f.seek(checkpoint["offset"])
+            for line in lines:
+                f.write((json.dumps(line) + "\n").encode())
+            offset = f.tell()
+
+        checkpoint = dict(checkpoint, offset=offset, processed=checkpoint["processed"] + len(lines))
+        if lines:
+            checkpoint["after"] = lines[-1]["id"]
+            checkpoint[checkpoint["phase"]] += len(lines)
+            return checkpoint, False
+        if checkpoint["phase"] == "entities":
+            return dict(checkpoint, phase="relations", after=""), False
+        os.replace(part, _export_path(f"{job['id']}.ndjson"))
+        return checkpoint, True
+
+    @staticmethod
+    def result(job: dict, checkpoint: dict):
+        return {
+            "file": f"{job['id']}.ndjson",
+            "entities": checkpoint["entities"],
+            "relations": checkpoint["relations"],
+            "bytes": checkpoint["offset"],
+        }
+
+class ImportJob(JobHandler):
+    """
+    Loads a file in the export format from JOB_EXPORT_DIR. Objects keep their ids and are
+    upserted, so an interrupted import can be repeated. Relations that would close a cycle
+    or whose endpoints are missing are skipped.
+    """
+
+    @staticmethod
+    def validate(params: dict):
+        name = params.get("file")
+        if not isinstance(name, str) or not name or os.path.basename(name) != name:
+            raise HTTPException(status_code=400, detail="params.file must be a file name in the export directory")
+        if not os.path.isfile(_export_path(name)):
+            raise HTTPException(status_code=400, detail=f"Import file not found: {name}")
+
+    @staticmethod
+    def total(driver: Driver, job: dict):
+        with open(_export_path(job["params"]["file"]), "rb") as f:
+            return sum(1 for line in f if line.strip())
+
+    @staticmethod
+    def _import_relations(tx, rows):
+        imported, skipped = [], 0
+        for row in rows:
+            existing = tx.run("""
+            MATCH (s:Entity)-[:HAS_OUTGOING]->(r:RelationDefinition {id: $id})-[:TARGETS]->(t:Entity)
+            RETURN s.id as sid, t.id as tid
+            """, id=row["id"]).single()
+            if existing is None:
+                # Same cycle check as RelationService, inside the batch transaction so it also
+                # sees the relations created earlier in this batch.
+                check = tx.run("""
+                MATCH (s:Entity {id: $sid}), (t:Entity {id: $tid})
+                RETURN EXISTS { (t)-[:HAS_OUTGOING|TARGETS*]->(s) } as cycle
+                """, sid=row["source_id"], tid=row["target_id"]).single()
+                if check is None or check["cycle"] or row["source_id"] == row["target_id"]:
+                    skipped += 1
+                    continue
+            elif (existing["sid"], existing["tid"]) != (row["source_id"], row["target_id"]):
+                skipped += 1
+                continue
+
+            tx.run(f"""
+            MATCH (s:Entity {{id: $sid}}), (t:Entity {{id: $tid}})
+            MERGE (n:RelationDefinition {{id: $id}})
+            MERGE (s)-[:HAS_OUTGOING]->(n)
+            MERGE (n)-[:TARGETS]->(t)
+            SET n.name = $name, n.description = $description
+            WITH n, $facets as facets
+            {MERGE_FACETS_CYPHER}
+            RETURN n.id
+            """, sid=row["source_id"], tid=row["target_id"], id=row["id"], name=row["name"],
+                description=row.get("description") or "", facets=_facet_rows(row["facets"])).consume()
+            imported.append(row)
+        return imported, skipped
+
+    @staticmethod
+    def step(driver: Driver, job: dict, checkpoint: dict):
+        checkpoint = checkpoint or {"offset": 0, "entities": 0, "relations": 0, "skipped": 0, "processed": 0}
+        entities, relations = [], []
+        with open(_export_path(job["params"]["file"]), "rb") as f:
+            f.seek(checkpoint["offset"])
+            for _ in range(job["batch_size"]):
+                line = f.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                (entities if item.get("kind") == "entity" else relations).append(item)
+            offset = f.tell()
+
+        if entities:
+            check_entity_quota(driver, [e["id"] for e in entities])
+        # One transaction per batch: the nodes and their change events commit together.
+        imported, skipped = ChangeLogService.write(driver, lambda tx: ImportJob._import_batch(tx, entities, relations))
+
+        done = offset == checkpoint["offset"]
+        return dict(
+            checkpoint,
+            offset=offset,
+            entities=checkpoint["entities"] + len(entities),
+            relations=checkpoint["relations"] + len(relations) - skipped,
+            skipped=checkpoint["skipped"] + skipped,
+            processed=checkpoint["processed"] + len(entities) + len(relations)
+        ), done
+
+    @staticmethod
+    def _import_batch(tx, entities, relations):
+        events = []
+        if entities:
+            tx.run(f"""
+            UNWIND $rows as row
+            MERGE (n:Entity {{id: row.id}})
+            SET n.name = row.name, n.description = row.description
+            WITH n, row.facets as facets
+            {MERGE_FACETS_CYPHER}
+            RETURN count(n)
+            """, rows=[dict(e, facets=_facet_rows(e["facets"])) for e in entities]).consume()
+            for e in entities:
+                events.append({"op": "upsert", "kind": "Entity", "id": e["id"]})
+                events += [{"op": "upsert", "kind": "Facet", "id": f["id"], "owner_id": e["id"]} for f in e["facets"]]
+
+        imported, skipped = [], 0
+        if relations:
+            ChangeLogService.lock(tx)
+            imported, skipped = ImportJob._import_relations(tx, relations)
+            for r in imported:
+                events.append({"op": "upsert", "kind": "Relation", "id": r["id"],
+                               "source_id": r["source_id"], "target_id": r["target_id"]})
+                events += [{"op": "upsert", "kind": "Facet", "id": f["id"], "owner_id": r["id"]} for f in r["facets"]]
+        return (imported, skipped), events
+
+    @staticmethod
+    def result(job: dict, checkpoint: dict):
+        return {k: checkpoint[k] for k in ("entities", "relations", "skipped")}
+
+class DeleteJob(JobHandler):
+    """
+    Cascade delete of one entity with many relations: incident relations (and their facets)
+    are deleted `batch_size` at a time, then the entity itself.
+    """
+
+    @staticmethod
+    def validate(params: dict):
+        if not isinstance(params.get("entity_id"), str):
+            raise HTTPException(status_code=400, detail="params.entity_id is required")
+
+    @staticmethod
+    def total(driver: Driver, job: dict):
+        return _count(driver, """
+        MATCH (n:Entity {id: $id})
+        OPTIONAL MATCH (n)-[:HAS_OUTGOING|TARGETS]-(r:RelationDefinition)
+        RETURN count(DISTINCT r) + count(DISTINCT n) as total
+        """, id=job["params"]["entity_id"])
+
+    @staticmethod
+    def step(driver: Driver, job: dict, checkpoint: dict):
+        checkpoint = checkpoint or {"relations": 0, "processed": 0}
+        entity_id = job["params"]["entity_id"]
+
+        def work(tx):
+            records = list(tx.run("""
+            MATCH (n:Entity {id: $id})-[:HAS_OUTGOING|TARGETS]-(r:RelationDefinition)
+            WITH DISTINCT r LIMIT $limit
+            OPTIONAL MATCH (r)-[:HAS_FACET]->(f:Facet)
+            WITH r, r.id as rid, collect(f) as facets
+            WITH r, rid, facets, [x IN facets | x.id] as facet_ids
+            FOREACH (x IN facets | DETACH DELETE x)
+            DETACH DELETE r
+            RETURN rid, facet_ids
+            """, id=entity_id, limit=job["batch_size"]))
+            events = [{"op": "delete", "kind": "Facet", "id": fid} for r in records for fid in r["facet_ids"]]
+            events += [{"op": "delete", "kind": "Relation", "id": r["rid"]} for r in records]
+            return records, events
+
+        records = ChangeLogService.write(driver, work)
+        if records:
+            return dict(
+                checkpoint,
+                relations=checkpoint["relations"] + len(records),
+                processed=checkpoint["processed"] + len(records)
+            ), False
+
+        # No relations left: the entity itself (and its facets) is now a small delete.
+        EntityService.delete_entity(driver, entity_id)
+        return dict(checkpoint, processed=checkpoint["processed"] + 1), True
+
+    @staticmethod
+    def result(job: dict, checkpoint: dict):
+        return {"entity_id": job["params"]["entity_id"], "relations": checkpoint["relations"]}
+
+# Migration name -> (batch function (driver, after id, limit) -> (last id, count), total query)
+MIGRATIONS = {
+    "backfill_facet_fields": (FacetService.backfill_fields, "MATCH (f:Facet) RETURN count(f) as total"),
+}
+
+class MigrationJob(JobHandler):
+    @staticmethod
+    def validate(params: dict):
+        if params.get("name") not in MIGRATIONS:
+            raise HTTPException(status_code=400, detail=f"params.name must be one of: {', '.join(MIGRATIONS)}")
+
+    @staticmethod
+    def total(driver: Driver, job: dict):
+        return _count(driver, MIGRATIONS[job["params"]["name"]][1])
+
+    @staticmethod
+    def step(driver: Driver, job: dict, checkpoint: dict):
+        checkpoint = checkpoint or {"after": "", "processed": 0}
+        batch, _ = MIGRATIONS[job["params"]["name"]]
+        after, count = batch(driver, checkpoint["after"], job["batch_size"])
+        if not count:
+            return checkpoint, True
+        return dict(checkpoint, after=after, processed=checkpoint["processed"] + count), False
+
+class ConsistencyJob(JobHandler):
+    """
+    Runs the checks of ConsistencyService one after the other, one batch per step, and
+    with {"repair": true} repairs each batch's findings right after it is scanned.
+    The report holds counts and at most CONSISTENCY_SAMPLE offending objects per check.
+    """
+
+    @staticmethod
+    def _checks(params: dict):
+        return params.get("checks") or ConsistencyService.CHECKS
+
+    @staticmethod
+    def validate(params: dict):
+        checks = params.get("checks")
+        if checks is not None and (not isinstance(checks, list) or not set(checks) <= set(ConsistencyService.CHECKS)):
+            raise HTTPException(status_code=400, detail=f"params.checks must be a list of: {', '.join(ConsistencyService.CHECKS)}")
+        if not isinstance(params.get("repair", False), bool):
+            raise HTTPException(status_code=400, detail="params.repair must be a boolean")
+
+    @staticmethod
+    def total(driver: Driver, job: dict):
+        return sum(ConsistencyService.count(driver, check) for check in ConsistencyJob._checks(job["params"]))
+
+    @staticmethod
+    def step(driver: Driver, job: dict, checkpoint: dict):
+        checks = ConsistencyJob._checks(job["params"])
+        checkpoint = checkpoint or {
+            "check": 0, "after": "", "processed": 0,
+            "report": {c: {"scanned": 0, "found": 0, "repaired": 0, "sample": []} for c in checks}
+        }
+        check = checks[checkpoint["check"]]
+        after, scanned, findings = ConsistencyService.scan(driver, check, checkpoint["after"], job["batch_size"])
+        if not scanned:
+            if checkpoint["check"] + 1 == len(checks):
+                return checkpoint, True
+            return dict(checkpoint, check=checkpoint["check"] + 1, after=""), False
+
+        repaired = ConsistencyService.repair(driver, check, findings) if job["params"].get("repair") else 0
+        entry = checkpoint["report"][check]
+        room = CONSISTENCY_SAMPLE - len(entry["sample"])
+        for finding in findings[:max(room, 0)]:
+            if finding.get("configuration"):
+                finding["configuration"] = finding["configuration"][:200]
+            entry["sample"].append(finding)
+        entry.update(
+            scanned=entry["scanned"] + scanned,
+            found=entry["found"] + len(findings),
+            repaired=entry["repaired"] + repaired
+        )
+        return dict(checkpoint, after=after, processed=checkpoint["processed"] + scanned), False
+
+    @staticmethod
+    def result(job: dict, checkpoint: dict):
+        return {"repair": bool(job["params"].get("repair")), "checks": checkpoint["report"]}
+
+HANDLERS = {
+    "export": ExportJob,
+    "import": ImportJob,
+    "delete": DeleteJob,
+    "migration": MigrationJob,
+    "consistency": ConsistencyJob,
+}
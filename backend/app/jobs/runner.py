@@ -0,0 +1,124 @@
+from neo4j import Driver
+from app.services.job_service import JobService
+from app.jobs.handlers import HANDLERS
+from app.core.tenancy import tenants, use_tenant
+import threading
+import traceback
+import socket
+import uuid
+import os
+
+JOBS_ENABLED = os.getenv("JOBS_ENABLED", "true").lower() == "true"
+# Runner threads per API worker. 0 by default: jobs run in scripts/job_worker.py, so
+# their batches never compete with requests for the worker's threads and connections.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "0"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "2.0"))
+# A job whose runner has not checkpointed for this long is picked up by another runner.
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+# Pause between batches, leaving Neo4j to interactive traffic.
+JOB_BATCH_PAUSE = float(os.getenv("JOB_BATCH_PAUSE", "0.05"))
+
+class JobRunner:
+    """
+    Runs queued jobs on background threads, one bounded batch at a time, checkpointing
+    after each batch. Jobs are claimed from the graph, so any number of API workers and
+    dedicated job workers can share the queue.
+    """
+
+    def __init__(self):
+        self._threads = []
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.completed = 0
+        self.failed = 0
+
+    @property
+    def running(self):
+        return any(t.is_alive() for t in self._threads)
+
+    def start(self, driver: Driver, workers: int = JOB_WORKERS):
+        if self.running or workers <= 0:
+            return
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._loop, args=(driver,), name=f"job-runner-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def stop(self, timeout: float = 30):
+        # Running jobs stop after their current batch and go back to the queue.
+        self._stop.set()
+        self._wake.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def wake(self):
+        self._wake.set()
+
+    def _loop(self, driver: Driver):
+        while not self._stop.is_set():
+            ran = False
+            # Each tenant keeps its jobs in its own database.
+            for tenant in tenants.known(driver):
+                if self._stop.is_set():
+                    return
+                try:
+                    with use_tenant(tenant):
+                        job = JobService.claim(driver, self.owner, JOB_LEASE_SECONDS)
+                        if job is not None:
+                            self.run_job(driver, job)
+                            ran = True
+                except Exception as e:
+                    print(f"Job claim failed for tenant {tenant}: {e}")
+            if not ran:
+                self._wake.wait(JOB_POLL_INTERVAL)
+                self._wake.clear()
+
+    def run_job(self, driver: Driver, job: dict):
+        handler = HANDLERS[job["type"]]
+        checkpoint = job["checkpoint"]
+        try:
+            total = job["total"]
+            if total is None:
+                total = handler.total(driver, job)
+                JobService.save_checkpoint(driver, job["id"], self.owner, JOB_LEASE_SECONDS, checkpoint, job["processed"], total)
+            while True:
+                if self._stop.is_set():
+                    JobService.release(driver, job["id"], self.owner)
+                    return
+                checkpoint, done = handler.step(driver, job, checkpoint)
+                owned, cancel = JobService.save_checkpoint(
+                    driver, job["id"], self.owner, JOB_LEASE_SECONDS, checkpoint, checkpoint["processed"]
+                )
+                if not owned:
+                    return  # lease lost (we stalled past JOB_LEASE_SECONDS); another runner has it
+                if done:
+                    JobService.finish(driver, job["id"], self.owner, "succeeded", result=handler.result(job, checkpoint))
+                    self.completed += 1
+                    return
+                if cancel:
+                    JobService.finish(driver, job["id"], self.owner, "cancelled", result=handler.result(job, checkpoint))
+                    return
+                self._stop.wait(JOB_BATCH_PAUSE)
+        except Exception as e:
+            traceback.print_exc()
+            self.failed += 1
+            try:
+                JobService.finish(driver, job["id"], self.owner, "failed", error=str(e))
+            except Exception:
+                pass
+
+    def stats(self):
+        return {
+            "enabled": JOBS_ENABLED,
+            "owner": self.owner,
+            "threads": sum(1 for t in self._threads if t.is_alive()),
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+job_runner = JobRunner()
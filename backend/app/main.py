@@ -1,8 +1,105 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.routers import entities, relations, facets, graph
+from app.api.routers import entities, relations, facets, graph, health, query, jobs, admin
+from app.database import driver_manager
+from app.core.bookmarks import BOOKMARKS_HEADER, begin_request, end_request
+from app.core.admission import admission, EXEMPT_PATHS
+from app.core.tenancy import (
+    tenants, use_tenant, resolve_database, record_request, UnknownTenant,
+    TENANT_HEADER, TENANT_REQUIRED, DEFAULT_TENANT
+)
+import time
+from app.jobs.runner import job_runner, JOBS_ENABLED
+from app.core.readiness import readiness
+from app.core.profiling import ProfiledJSONResponse, should_sample, sampled, server_timing, profiling_stats
+
+def warmup():
+    # Each step is idempotent: a failed attempt is simply retried from the top.
+    with readiness.phase("driver_pool"):
+        driver = driver_manager.start()
+    # Indexes and change feed load of the default tenant; other tenants start on first use.
+    with readiness.phase("default_tenant"):
+        tenants.start(driver, DEFAULT_TENANT)
+    if JOBS_ENABLED:
+        job_runner.start(driver)
+    # Built once here instead of on the first /docs or /openapi.json request.
+    with readiness.phase("openapi_schema"):
+        app.openapi()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Liveness answers immediately; GET /health/ready turns green once warm-up is done.
+    readiness.start(warmup)
+    yield
+    readiness.stop()
+    job_runner.stop()
+    tenants.stop()
+    driver_manager.close()
+
+app = FastAPI(
+    title="Dynamic Entity System Model Builder (Neo4j)",
+    lifespan=lifespan,
+    default_response_class=ProfiledJSONResponse
+)
 
-app = FastAPI(title="Dynamic Entity System Model Builder (Neo4j)")
+# Innermost middleware: the timings of sampled requests cover the route only, not the
+# admission queue. See app/core/profiling.py for the phases.
+@app.middleware("http")
+async def profiling_middleware(request: Request, call_next):
+    if not should_sample(request):
+        return await call_next(request)
+    started = time.perf_counter()
+    with sampled() as timings:
+        response = await call_next(request)
+    total = time.perf_counter() - started
+    phases, header = server_timing(timings, total)
+    response.headers["Server-Timing"] = header
+    route = request.scope.get("route")
+    if route is not None:
+        profiling_stats.record(route.path, phases, total, timings.get("queries", 0))
+    return response
+
+# Registered before CORS so it runs inside it: shed responses still carry CORS headers
+# and preflight requests never wait for a slot.
+@app.middleware("http")
+async def admission_middleware(request: Request, call_next):
+    return await admission(request, call_next)
+
+@app.middleware("http")
+async def tenant_middleware(request: Request, call_next):
+    # Every query of the request goes to the tenant's database (see app/core/tenancy.py).
+    tenant = request.headers.get(TENANT_HEADER)
+    exempt = request.method == "OPTIONS" or EXEMPT_PATHS.match(request.url.path)
+    if tenant is None:
+        if TENANT_REQUIRED and not exempt:
+            return JSONResponse(status_code=400, content={"detail": f"Missing {TENANT_HEADER} header"})
+        tenant = DEFAULT_TENANT
+    try:
+        database = resolve_database(tenant)
+    except UnknownTenant:
+        return JSONResponse(status_code=404, content={"detail": f"Unknown tenant: {tenant}"})
+
+    with use_tenant(tenant, database):
+        if exempt:
+            return await call_next(request)
+        state = tenants.state()
+        if tenants.buckets is not None and tenants.buckets.take(tenant, 1):
+            state.rate_limited += 1
+            return JSONResponse(status_code=429, content={"detail": "Tenant rate limit exceeded"}, headers={"Retry-After": "1"})
+        if not state.started:
+            try:
+                await run_in_threadpool(tenants.start, driver_manager.get())
+            except UnknownTenant:
+                return JSONResponse(status_code=404, content={"detail": f"Unknown tenant: {tenant}"})
+            except Exception as e:
+                return JSONResponse(status_code=503, content={"detail": f"Tenant database unavailable: {e}"})
+        started = time.perf_counter()
+        response = await call_next(request)
+        record_request(state, started, response.status_code)
+        return response
 
 app.add_middleware(
     CORSMiddleware,
@@ -10,12 +107,32 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[BOOKMARKS_HEADER, "Retry-After", "Server-Timing"],
 )
 
+@app.middleware("http")
+async def bookmarks_middleware(request: Request, call_next):
+    # Clients echo X-Neo4j-Bookmarks from a write response on later reads to get
+    # read-your-writes even when the read is routed to a follower or another worker.
+    holder, token = begin_request(request.headers.get(BOOKMARKS_HEADER))
+    try:
+        response = await call_next(request)
+    finally:
+        end_request(token)
+    if holder.manager is not None:
+        bookmarks = holder.manager.response_bookmarks()
+        if bookmarks:
+            response.headers[BOOKMARKS_HEADER] = ",".join(bookmarks)
+    return response
+
 app.include_router(entities.router, prefix="/entities", tags=["Entities"])
 app.include_router(relations.router, prefix="/relations", tags=["Relations"])
 app.include_router(facets.router, prefix="/facets", tags=["Facets"])
 app.include_router(graph.router, prefix="/graph", tags=["Graph"])
+app.include_router(query.router, prefix="/query", tags=["Query"])
+app.include_router(jobs.router, prefix="/jobs", tags=["Jobs"])
+app.include_router(health.router, prefix="/health", tags=["Health"])
+app.include_router(admin.router, prefix="/admin", tags=["Admin"])
 
 @app.get("/")
 def read_root():
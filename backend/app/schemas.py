@@ -1,4 +1,4 @@
-from typing import List, Optional, Dict, Any, Union
+from typing import List, Optional, Dict, Any, Union, Literal
 from pydantic import BaseModel
 
 # Facet Types: 'property', 'lifecycle', 'criteria', 'entity'
@@ -16,10 +16,23 @@ class FacetUpdate(BaseModel):
     # Usually type shouldn't change, but configuration might.
     configuration: Optional[Dict[str, Any]] = None
 
+class EntityReference(BaseModel):
+    id: str
+    name: str
+    description: Optional[str] = None
+
 class FacetResponse(FacetCreate):
     id: str
     entity_id: Optional[str] = None # Can belong to Entity OR Relation
     relation_id: Optional[str] = None
+    # Only set for 'entity' facets when the read asked for ?expand=entity_refs
+    target_entity: Optional[EntityReference] = None
+
+class DanglingReference(BaseModel):
+    facet_id: str
+    owner_id: str
+    owner_type: str # 'Entity' or 'RelationDefinition'
+    target_entity_id: Optional[str] = None
 
 class RelationCreate(BaseModel):
     target_entity_id: str
@@ -67,3 +80,81 @@ class GraphEdge(BaseModel):
 class GraphResponse(BaseModel):
     nodes: List[GraphNode]
     edges: List[GraphEdge]
+
+# Facet query: an owner (entity or relation) matches when, for every FacetMatch,
+# it has at least one facet satisfying that match's type and all of its predicates.
+
+class FacetPredicate(BaseModel):
+    key: str # top-level configuration key, e.g. "name" or "dataType"
+    op: Literal["eq", "ne", "in", "exists", "contains", "starts_with", "gt", "gte", "lt", "lte"] = "eq"
+    value: Any = None
+
+class FacetMatch(BaseModel):
+    type: Optional[str] = None
+    where: List[FacetPredicate] = []
+
+class FacetQueryRequest(BaseModel):
+    match: List[FacetMatch]
+    target: Literal["entity", "relation", "any"] = "any"
+    limit: int = 100
+    cursor: Optional[str] = None # next_cursor of the previous page
+
+class FacetQueryResponse(BaseModel):
+    entity_ids: List[str]
+    relation_ids: List[str]
+    next_cursor: Optional[str] = None
+
+class LayoutNode(BaseModel):
+    id: str
+    level: int # longest-path depth from a root; also the layout layer
+    position: int # order within the layer
+    x: float
+    y: float
+    ancestor_count: int
+    descendant_count: int
+
+class LayoutEdge(BaseModel):
+    relation_id: str
+    source_id: str
+    target_id: str
+    points: List[List[float]] # source, bend points (one per crossed layer), target
+
+class GraphLayoutResponse(BaseModel):
+    version: Optional[int] = None # change log sequence the layout was computed for
+    layers: int
+    incremental: bool
+    order: List[str] # topological order of entity ids
+    nodes: List[LayoutNode]
+    edges: List[LayoutEdge]
+
+class LineageResponse(BaseModel):
+    entity_id: str
+    direction: Literal["up", "down"]
+    version: Optional[int] = None # change log sequence the answer reflects
+    count: int # full size of the set, even when ids is truncated
+    ids: List[str]
+
+class JobCreate(BaseModel):
+    type: Literal["export", "import", "delete", "migration", "consistency"]
+    # export: {}
+    # import: {"file": "<name in JOB_EXPORT_DIR>"}
+    # delete: {"entity_id": "uuid"}
+    # migration: {"name": "backfill_facet_fields"}
+    # consistency: {"checks": ["orphan_facets", ...], "repair": false}
+    params: Dict[str, Any] = {}
+    batch_size: int = 500
+
+class JobResponse(BaseModel):
+    id: str
+    type: str
+    status: str # queued, running, succeeded, failed, cancelled
+    params: Dict[str, Any]
+    batch_size: int
+    processed: int
+    total: Optional[int] = None # estimate taken when the job starts
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    cancel_requested: bool
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
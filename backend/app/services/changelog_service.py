@@ -0,0 +1,135 @@
+from neo4j import Driver
+from app.database import execute_read, execute_write, write_transaction
+import os
+import time
+
+# Number of events kept in the log. Readers that fall further behind than this
+# must reload their state from scratch.
+CHANGELOG_RETENTION = int(os.getenv("CHANGELOG_RETENTION", "100000"))
+
+class ChangeLogService:
+    """
+    Append-only log of model changes, stored in the graph itself.
+
+    Every write path records one event per object it touched:
+        { seq, op: "upsert" | "delete", kind: "Entity" | "Relation" | "Facet", id,
+          source_id, target_id, owner_id }
+    `seq` is allocated from a single :ChangeLogHead node, so events commit in order.
+    Events are appended in the transaction of the change they describe (see `write`): a
+    change is never committed without its events, so consumers cannot silently diverge.
+    """
+
+    @staticmethod
+    def write(driver: Driver, work):
+        """
+        Runs `work(tx)` -> (result, events) in one transaction and appends `events` to the
+        log in that same transaction. Returns `result` once it has committed.
+        """
+        def run(tx):
+            result, events = work(tx)
+            return result, ChangeLogService.append(tx, events)
+
+        result, seqs = write_transaction(driver, run)
+        ChangeLogService._committed(driver, seqs)
+        return result
+
+    @staticmethod
+    def lock(tx):
+        """
+        Takes the write lock on the log head for the rest of `tx`. Every logged write needs
+        it to commit, so checks made after this (e.g. the relation cycle check) cannot race
+        with another write.
+        """
+        tx.run("""
+        MERGE (h:ChangeLogHead {id: 'head'})
+        ON CREATE SET h.seq = 0
+        SET h._lock = true
+        REMOVE h._lock
+        """).consume()
+
+    @staticmethod
+    def append(tx, events: list):
+        if not events:
+            return []
+
+        query = """
+        MERGE (h:ChangeLogHead {id: 'head'})
+        ON CREATE SET h.seq = 0
+        SET h.seq = h.seq + size($events)
+        WITH h, h.seq - size($events) as base
+        UNWIND range(0, size($events) - 1) as i
+        WITH h, base, i, $events[i] as e
+        CREATE (c:ChangeEvent {
+            seq: base + i + 1,
+            op: e.op,
+            kind: e.kind,
+            id: e.id,
+            source_id: e.source_id,
+            target_id: e.target_id,
+            owner_id: e.owner_id,
+            ts: $ts
+        })
+        RETURN c.seq as seq
+        """
+        payload = [
+            {
+                "op": e["op"],
+                "kind": e["kind"],
+                "id": e["id"],
+                "source_id": e.get("source_id"),
+                "target_id": e.get("target_id"),
+                "owner_id": e.get("owner_id"),
+            }
+            for e in events
+        ]
+        return [r["seq"] for r in tx.run(query, events=payload, ts=time.time())]
+
+    @staticmethod
+    def _committed(driver: Driver, seqs: list):
+        # The change has committed: pruning and the in-process catch-up are best effort.
+        if seqs and seqs[-1] % 1000 < len(seqs):
+            try:
+                ChangeLogService.prune(driver, seqs[-1])
+            except Exception as e:
+                print(f"Change log prune failed: {e}")
+
+        # Let in-process consumers catch up immediately so this worker reads its own writes.
+        if seqs:
+            from app.core.changelog import change_feed
+            change_feed.notify()
+
+    @staticmethod
+    def fetch_since(driver: Driver, seq: int, limit: int = 1000):
+        query = """
+        MATCH (c:ChangeEvent) WHERE c.seq > $seq
+        RETURN c ORDER BY c.seq LIMIT $limit
+        """
+        records, _, _ = execute_read(driver, query, seq=seq, limit=limit)
+        return [dict(r["c"]) for r in records]
+
+    @staticmethod
+    def head_seq(driver: Driver):
+        query = """
+        OPTIONAL MATCH (h:ChangeLogHead {id: 'head'})
+        RETURN coalesce(h.seq, 0) as seq
+        """
+        records, _, _ = execute_read(driver, query)
+        return records[0]["seq"]
+
+    @staticmethod
+    def oldest_seq(driver: Driver):
+        query = """
+        MATCH (c:ChangeEvent)
+        RETURN min(c.seq) as seq
+        """
+        records, _, _ = execute_read(driver, query)
+        return records[0]["seq"]
+
+    @staticmethod
+    def prune(driver: Driver, head: int):
+        query = """
+        MATCH (c:ChangeEvent) WHERE c.seq <= $cutoff
+        WITH c LIMIT 10000
+        DELETE c
+        """
+        execute_write(driver, query, cutoff=head - CHANGELOG_RETENTION)
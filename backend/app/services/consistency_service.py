@@ -0,0 +1,172 @@
+from neo4j import Driver
+from app.database import execute_read
+from app.services.changelog_service import ChangeLogService
+from app.services.facet_service import ENTITY_REFERENCE_TYPE, ENTITY_REFERENCE_KEY, CONFIGURATION_FIELD_PREFIX
+import json
+import os
+
+# Offending ids kept per check in the report; counts are always complete.
+CONSISTENCY_SAMPLE = int(os.getenv("CONSISTENCY_SAMPLE", "100"))
+
+REFERENCE_FIELD = CONFIGURATION_FIELD_PREFIX + ENTITY_REFERENCE_KEY
+
+def _configuration_error(raw):
+    if raw is None:
+        return "missing"
+    try: conf = json.loads(raw)
+    except Exception as e: return f"invalid JSON: {e}"
+    if not isinstance(conf, dict):
+        return f"not an object: {type(conf).__name__}"
+    return None
+
+class ConsistencyService:
+    """
+    Model-wide consistency checks. Each check walks one label in id order, `limit` nodes
+    per call, so memory stays bounded by the batch size whatever the size of the graph:
+
+    - orphan_facets: facets without an owner (HAS_FACET edge),
+    - broken_relations: relations without exactly one source entity and one target entity,
+    - malformed_configurations: facet configurations that are not a JSON object,
+    - dangling_references: entity reference facets without a REFERENCES edge,
+    - cycles: relations that lie on a cycle of the relation graph.
+
+    `repair` fixes what can be fixed without guessing: orphans and broken relations are
+    deleted, malformed configurations are reset to {} (the raw value is kept in
+    `configuration_invalid`), references are re-linked when the target exists. Cycles and
+    references to missing entities are only reported.
+    """
+
+    CHECKS = ["orphan_facets", "broken_relations", "malformed_configurations", "dangling_references", "cycles"]
+
+    # Check -> label it walks, for progress totals.
+    LABELS = {
+        "orphan_facets": "Facet",
+        "broken_relations": "RelationDefinition",
+        "malformed_configurations": "Facet",
+        "dangling_references": "Facet",
+        "cycles": "RelationDefinition",
+    }
+
+    @staticmethod
+    def count(driver: Driver, check: str):
+        if check == "dangling_references":
+            records, _, _ = execute_read(driver, "MATCH (f:Facet {type: $type}) RETURN count(f) as total", type=ENTITY_REFERENCE_TYPE)
+        else:
+            records, _, _ = execute_read(driver, f"MATCH (n:{ConsistencyService.LABELS[check]}) RETURN count(n) as total")
+        return records[0]["total"]
+
+    @staticmethod
+    def scan(driver: Driver, check: str, after: str, limit: int):
+        """
+        Checks up to `limit` nodes with id > `after`.
+        Returns (last id, nodes scanned, findings); (None, 0, []) when there are none left.
+        """
+        if check == "orphan_facets":
+            query = """
+            MATCH (f:Facet) WHERE f.id > $after
+            WITH f ORDER BY f.id LIMIT $limit
+            RETURN f.id as id, NOT EXISTS { ()-[:HAS_FACET]->(f) } as bad
+            """
+        elif check == "broken_relations":
+            query = """
+            MATCH (r:RelationDefinition) WHERE r.id > $after
+            WITH r ORDER BY r.id LIMIT $limit
+            WITH r, COUNT { (:Entity)-[:HAS_OUTGOING]->(r) } as sources, COUNT { (r)-[:TARGETS]->(:Entity) } as targets
+            RETURN r.id as id, sources <> 1 OR targets <> 1 as bad, sources, targets
+            """
+        elif check == "malformed_configurations":
+            query = """
+            MATCH (f:Facet) WHERE f.id > $after
+            WITH f ORDER BY f.id LIMIT $limit
+            RETURN f.id as id, f.configuration as configuration
+            """
+        elif check == "dangling_references":
+            query = """
+            MATCH (f:Facet {type: $type}) WHERE f.id > $after
+            WITH f ORDER BY f.id LIMIT $limit
+            RETURN f.id as id, NOT EXISTS { (f)-[:REFERENCES]->(:Entity) } as bad, f[$key] as target,
+                   EXISTS { MATCH (t:Entity) WHERE t.id = f[$key] } as target_exists
+            """
+        elif check == "cycles":
+            # Relation s -> t lies on a cycle iff t reaches s.
+            query = """
+            MATCH (r:RelationDefinition) WHERE r.id > $after
+            WITH r ORDER BY r.id LIMIT $limit
+            OPTIONAL MATCH (s:Entity)-[:HAS_OUTGOING]->(r)-[:TARGETS]->(t:Entity)
+            RETURN r.id as id, s.id as source_id, t.id as target_id,
+                   t IS NOT NULL AND EXISTS { (t)-[:HAS_OUTGOING|TARGETS*]->(s) } as bad
+            """
+        else:
+            raise ValueError(f"Unknown check: {check}")
+
+        records, _, _ = execute_read(
+            driver, query, after=after, limit=limit, type=ENTITY_REFERENCE_TYPE, key=REFERENCE_FIELD
+        )
+        if not records:
+            return None, 0, []
+
+        findings = []
+        for r in records:
+            if check == "malformed_configurations":
+                error = _configuration_error(r["configuration"])
+                if error:
+                    findings.append({"id": r["id"], "error": error, "configuration": r["configuration"]})
+            elif r["bad"]:
+                finding = dict(r)
+                del finding["bad"]
+                findings.append(finding)
+        return records[-1]["id"], len(records), findings
+
+    @staticmethod
+    def repair(driver: Driver, check: str, findings: list):
+        """Repairs the findings of one scan that are still present. Returns the number repaired."""
+        if not findings or check == "cycles":
+            return 0
+
+        def work(tx):
+            events = []
+            if check == "orphan_facets":
+                records = list(tx.run("""
+                UNWIND $ids as id
+                MATCH (f:Facet {id: id}) WHERE NOT EXISTS { ()-[:HAS_FACET]->(f) }
+                DETACH DELETE f
+                RETURN id
+                """, ids=[f["id"] for f in findings]))
+                events = [{"op": "delete", "kind": "Facet", "id": r["id"]} for r in records]
+            elif check == "broken_relations":
+                records = list(tx.run("""
+                UNWIND $ids as id
+                MATCH (r:RelationDefinition {id: id})
+                WHERE COUNT { (:Entity)-[:HAS_OUTGOING]->(r) } <> 1 OR COUNT { (r)-[:TARGETS]->(:Entity) } <> 1
+                OPTIONAL MATCH (r)-[:HAS_FACET]->(f:Facet)
+                WITH r, id, collect(f) as facets
+                WITH r, id, facets, [x IN facets | x.id] as facet_ids
+                FOREACH (x IN facets | DETACH DELETE x)
+                DETACH DELETE r
+                RETURN id, facet_ids
+                """, ids=[f["id"] for f in findings]))
+                for r in records:
+                    events += [{"op": "delete", "kind": "Facet", "id": fid} for fid in r["facet_ids"]]
+                    events.append({"op": "delete", "kind": "Relation", "id": r["id"]})
+            elif check == "malformed_configurations":
+                # Only if unchanged since the scan; a concurrent update may have fixed it already.
+                records = list(tx.run("""
+                UNWIND $rows as row
+                MATCH (o)-[:HAS_FACET]->(f:Facet {id: row.id})
+                WHERE f.configuration = row.configuration OR (f.configuration IS NULL AND row.configuration IS NULL)
+                SET f.configuration_invalid = f.configuration, f.configuration = '{}'
+                RETURN f.id as id, o.id as owner_id
+                """, rows=[{"id": f["id"], "configuration": f["configuration"]} for f in findings]))
+                events = [{"op": "upsert", "kind": "Facet", "id": r["id"], "owner_id": r["owner_id"]} for r in records]
+            elif check == "dangling_references":
+                records = list(tx.run("""
+                UNWIND $ids as id
+                MATCH (f:Facet {id: id})
+                MATCH (t:Entity) WHERE t.id = f[$key]
+                MERGE (f)-[:REFERENCES]->(t)
+                RETURN id
+                """, ids=[f["id"] for f in findings if f["target_exists"]], key=REFERENCE_FIELD))
+
+            return records, events
+
+        return len(ChangeLogService.write(driver, work))
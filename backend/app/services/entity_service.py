@@ -1,53 +1,68 @@
 from neo4j import Driver
+from neo4j.exceptions import ClientError
+from app.database import execute_read
 from app.schemas import EntityCreate, EntityUpdate
+from app.services.changelog_service import ChangeLogService
+from app.services.facet_service import FacetService
+from app.core.replica import replica
+from app.core.tenancy import check_entity_quota
+from app.services.idempotency_service import IdempotencyService
 from fastapi import HTTPException
-import uuid
 import json
 
 class EntityService:
     @staticmethod
-    def create_entity(driver: Driver, entity: EntityCreate):
+    def create_entity(driver: Driver, entity: EntityCreate, idempotency_key: str = None):
+        eid, replay = IdempotencyService.reserve(driver, "entity", idempotency_key, entity.model_dump())
+        if replay:
+            existing = EntityService.get_entity(driver, eid)
+            if existing:
+                return existing
+
+        # MERGE: a retry whose first attempt did not get this far creates the entity once.
         query = """
-        CREATE (n:Entity {
-            id: $id,
-            name: $name,
-            description: $description
-        })
+        MERGE (n:Entity {id: $id})
+        ON CREATE SET n.name = $name, n.description = $description
         RETURN n.id as id, n.name as name, n.description as description
         """
+        check_entity_quota(driver, [eid])
+
+        def work(tx):
+            record = tx.run(query, id=eid, name=entity.name, description=entity.description).single()
+            return record, [{"op": "upsert", "kind": "Entity", "id": record["id"]}]
+
         try:
-            eid = str(uuid.uuid4())
-            records, summary, keys = driver.execute_query(
-                query, 
-                id=eid,
-                name=entity.name,
-                description=entity.description,
-                database_="neo4j"
-            )
-            record = records[0]
-            return {
-                "id": record["id"],
-                "name": record["name"],
-                "description": record["description"],
-                "facets": [],
-                "outgoing_relations": [],
-                "incoming_relations": []
-            }
-        except Exception as e:
+            record = ChangeLogService.write(driver, work)
+        except ClientError as e:
+            # Rejected by Neo4j (constraint, bad value); anything else is a server error.
             print(f"Error creating entity: {e}")
             raise HTTPException(status_code=400, detail=f"Error creating entity: {str(e)}")
+        return {
+            "id": record["id"],
+            "name": record["name"],
+            "description": record["description"],
+            "facets": [],
+            "outgoing_relations": [],
+            "incoming_relations": []
+        }
 
     @staticmethod
-    def get_entity(driver: Driver, entity_id: str):
+    def get_entity(driver: Driver, entity_id: str, expand_refs: bool = False):
+        if not expand_refs and replica.is_fresh():
+            return replica.get_entity(entity_id)
+
         # Fetch Entity, its Facets, and its Relations (Nodes)
-        query = """
-        MATCH (n:Entity {id: $id})
+        f = FacetService.projection("f", expand_refs)
+        rf = FacetService.projection("rf", expand_refs)
+        inc_rf = FacetService.projection("inc_rf", expand_refs)
+        query = f"""
+        MATCH (n:Entity {{id: $id}})
         RETURN n, 
-               [(n)-[:HAS_FACET]->(f:Facet) | f] as facets,
-               [(n)-[:HAS_OUTGOING]->(r:RelationDefinition)-[:TARGETS]->(t:Entity) | {rel: r, target: t, facets: [(r)-[:HAS_FACET]->(rf:Facet) | rf]}] as outgoing,
-               [(inc_s:Entity)-[:HAS_OUTGOING]->(inc_r:RelationDefinition)-[:TARGETS]->(n) | {rel: inc_r, source: inc_s, facets: [(inc_r)-[:HAS_FACET]->(inc_rf:Facet) | inc_rf]}] as incoming
+               [(n)-[:HAS_FACET]->(f:Facet) | {f}] as facets,
+               [(n)-[:HAS_OUTGOING]->(r:RelationDefinition)-[:TARGETS]->(t:Entity) | {{rel: r, target: t, facets: [(r)-[:HAS_FACET]->(rf:Facet) | {rf}]}}] as outgoing,
+               [(inc_s:Entity)-[:HAS_OUTGOING]->(inc_r:RelationDefinition)-[:TARGETS]->(n) | {{rel: inc_r, source: inc_s, facets: [(inc_r)-[:HAS_FACET]->(inc_rf:Facet) | {inc_rf}]}}] as incoming
         """
-        records, _, _ = driver.execute_query(query, id=entity_id, database_="neo4j")
+        records, _, _ = execute_read(driver, query, id=entity_id)
         
         if not records:
             return None
@@ -64,11 +79,14 @@ class EntityService:
                 conf = json.loads(f["configuration"])
             except:
                 conf = {}
-            return {
+            res = {
                 "id": f["id"],
                 "type": f["type"],
                 "configuration": conf
             }
+            if expand_refs:
+                res["target_entity"] = f.get("target_entity")
+            return res
 
         # Parse facets
         facets = [parse_facet(f) for f in record["facets"] if f]
@@ -114,11 +132,14 @@ class EntityService:
 
     @staticmethod
     def get_all_entities(driver: Driver):
+        if replica.is_fresh():
+            return replica.get_all_entities()
+
         query = """
         MATCH (n:Entity)
         RETURN n
         """
-        records, _, _ = driver.execute_query(query, database_="neo4j")
+        records, _, _ = execute_read(driver, query)
         entities = []
         for r in records:
             entities.append({
@@ -152,11 +173,12 @@ class EntityService:
         RETURN n
         """
         
-        records, _, _ = driver.execute_query(query, parameters_=params, database_="neo4j")
-        
-        if not records:
+        def work(tx):
+            record = tx.run(query, params).single()
+            return record, [{"op": "upsert", "kind": "Entity", "id": entity_id}] if record else []
+
+        if not ChangeLogService.write(driver, work):
              return None
-             
         return EntityService.get_entity(driver, entity_id)
 
     @staticmethod
@@ -187,8 +209,24 @@ class EntityService:
         
         OPTIONAL MATCH (n)-[:HAS_FACET]->(f:Facet)
         
-        DETACH DELETE n, r_out, rf_out, inc, rf_inc, f
+        WITH n, collect(r_out) + collect(inc) as rels, collect(rf_out) + collect(rf_inc) + collect(f) as facets
+        WITH n, rels, facets,
+             [x IN rels | x.id] as rel_ids, [x IN facets | x.id] as facet_ids
+        FOREACH (x IN facets | DETACH DELETE x)
+        FOREACH (x IN rels | DETACH DELETE x)
+        DETACH DELETE n
+        RETURN rel_ids, facet_ids
         """
         
-        driver.execute_query(query, id=entity_id, database_="neo4j")
+        def work(tx):
+            record = tx.run(query, id=entity_id).single()
+            if record is None:
+                return None, []
+            # Record the cascade explicitly so change feed consumers don't have to infer it.
+            events = [{"op": "delete", "kind": "Facet", "id": fid} for fid in set(record["facet_ids"])]
+            events += [{"op": "delete", "kind": "Relation", "id": rid} for rid in set(record["rel_ids"])]
+            events.append({"op": "delete", "kind": "Entity", "id": entity_id})
+            return None, events
+
+        ChangeLogService.write(driver, work)
         return {"message": "Entity deleted successfully"}
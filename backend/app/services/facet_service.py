@@ -1,40 +1,97 @@
 from neo4j import Driver
+from app.database import execute_read, execute_write
 from app.schemas import FacetCreate, FacetUpdate
+from app.services.changelog_service import ChangeLogService
+from app.core.replica import replica
+from app.services.idempotency_service import IdempotencyService
 from fastapi import HTTPException
-import uuid
 import json
 
+# Top-level scalar configuration values are copied onto the Facet node as `cfg_<key>`
+# properties so they can be filtered (and indexed) in Cypher. These keys get indexes.
+INDEXED_CONFIGURATION_KEYS = ["name", "dataType", "target_entity_id"]
+CONFIGURATION_FIELD_PREFIX = "cfg_"
+
+# `entity` facets point at another entity; the reference is materialised as
+# (facet)-[:REFERENCES]->(entity) so reads can resolve it in the same query.
+ENTITY_REFERENCE_TYPE = "entity"
+ENTITY_REFERENCE_KEY = "target_entity_id"
+
+# Re-links facet `f` to the entity whose id is in `ref` (if it exists), carrying `n` along.
+SYNC_REFERENCE_CYPHER = """
+        WITH f, n, ref
+        OPTIONAL MATCH (f)-[old:REFERENCES]->()
+        DELETE old
+        WITH DISTINCT f, n, ref
+        OPTIONAL MATCH (t:Entity {id: ref})
+        FOREACH (_ IN CASE WHEN t IS NULL THEN [] ELSE [1] END | MERGE (f)-[:REFERENCES]->(t))
+"""
+
 class FacetService:
     @staticmethod
-    def add_facet(driver: Driver, target_id: str, facet: FacetCreate, target_type: str = "Entity"):
+    def extract_fields(configuration: dict):
+        return {
+            CONFIGURATION_FIELD_PREFIX + key: value
+            for key, value in configuration.items()
+            if isinstance(value, (str, int, float, bool))
+        }
+
+    @staticmethod
+    def reference_target(facet_type: str, configuration: dict):
+        if facet_type != ENTITY_REFERENCE_TYPE:
+            return None
+        target = configuration.get(ENTITY_REFERENCE_KEY)
+        return target if isinstance(target, str) else None
+
+    @staticmethod
+    def projection(var: str, expand_refs: bool = False):
+        # Cypher expression returning facet `var`; when expanding, the referenced entity is
+        # resolved in the same query and attached as `target_entity` (null if dangling).
+        if not expand_refs:
+            return var
+        return (
+            f"{var} {{.*, target_entity: head([({var})-[:REFERENCES]->({var}_ref:Entity) | "
+            f"{var}_ref {{.id, .name, .description}}])}}"
+        )
+
+    @staticmethod
+    def add_facet(driver: Driver, target_id: str, facet: FacetCreate, target_type: str = "Entity", idempotency_key: str = None):
         # Supports adding facet to Entity OR RelationDefinition
-        
+        fid, replay = IdempotencyService.reserve(driver, f"facet:{target_id}", idempotency_key, facet.model_dump())
+        if replay:
+            existing = FacetService.get_facet(driver, fid)
+            if existing:
+                return existing
+
         config_str = json.dumps(facet.configuration)
         
         query = f"""
         MATCH (n) WHERE n.id = $eid AND (n:Entity OR n:RelationDefinition)
-        CREATE (n)-[:HAS_FACET]->(f:Facet {{
-            id: $fid,
-            type: $type,
-            configuration: $config
-        }})
+        MERGE (f:Facet {{id: $fid}})
+        ON CREATE SET f.type = $type, f.configuration = $config
+        MERGE (n)-[:HAS_FACET]->(f)
+        SET f += $fields
+        WITH f, n, $ref as ref
+        {SYNC_REFERENCE_CYPHER}
         RETURN f, labels(n) as labels
         """
-        fid = str(uuid.uuid4())
-        records, _, _ = driver.execute_query(
-            query, 
-            eid=target_id, 
-            fid=fid, 
-            type=facet.type, 
-            config=config_str,
-            database_="neo4j"
-        )
-        
-        if not records:
-             raise HTTPException(status_code=404, detail="Target (Entity or Relation) not found")
+        def work(tx):
+            record = tx.run(
+                query, 
+                eid=target_id, 
+                fid=fid, 
+                type=facet.type, 
+                config=config_str,
+                fields=FacetService.extract_fields(facet.configuration),
+                ref=FacetService.reference_target(facet.type, facet.configuration)
+            ).single()
+            if record is None:
+                 raise HTTPException(status_code=404, detail="Target (Entity or Relation) not found")
+            return record, [{"op": "upsert", "kind": "Facet", "id": record["f"]["id"], "owner_id": target_id}]
 
-        f = records[0]["f"]
-        labels = records[0]["labels"]
+        record = ChangeLogService.write(driver, work)
+        f = record["f"]
+        labels = record["labels"]
         
         return {
             "id": f["id"],
@@ -46,11 +103,14 @@ class FacetService:
 
     @staticmethod
     def get_facet(driver: Driver, facet_id: str):
+        if replica.is_fresh():
+            return replica.get_facet(facet_id)
+
         query = """
         MATCH (n)-[:HAS_FACET]->(f:Facet {id: $id})
         RETURN f, n.id as nid, labels(n) as labels
         """
-        records, _, _ = driver.execute_query(query, id=facet_id, database_="neo4j")
+        records, _, _ = execute_read(driver, query, id=facet_id)
         
         if not records:
             return None
@@ -70,6 +130,28 @@ class FacetService:
             "configuration": conf
         }
 
+    @staticmethod
+    def find_dangling_references(driver: Driver):
+        # One pass over the type index: entity facets without a live REFERENCES edge.
+        query = """
+        MATCH (o)-[:HAS_FACET]->(f:Facet {type: $type})
+        WHERE NOT (f)-[:REFERENCES]->(:Entity)
+        RETURN f.id as fid, o.id as oid, o:Entity as on_entity, f[$key] as target
+        ORDER BY fid
+        """
+        records, _, _ = execute_read(
+            driver, query, type=ENTITY_REFERENCE_TYPE, key=CONFIGURATION_FIELD_PREFIX + ENTITY_REFERENCE_KEY
+        )
+        return [
+            {
+                "facet_id": r["fid"],
+                "owner_id": r["oid"],
+                "owner_type": "Entity" if r["on_entity"] else "RelationDefinition",
+                "target_entity_id": r["target"]
+            }
+            for r in records
+        ]
+
     @staticmethod
     def update_facet(driver: Driver, facet_id: str, updates: FacetUpdate):
         if updates.configuration is None:
@@ -77,17 +159,29 @@ class FacetService:
             
         config_str = json.dumps(updates.configuration)
         
-        query = """
-        MATCH (f:Facet {id: $id})
-        SET f.configuration = $config
+        # Replace the whole property map so extracted fields of removed keys disappear too.
+        # The reference target depends on the facet type, which is only known in the graph:
+        # $ref_if_entity is applied only when f.type is the entity reference type.
+        query = f"""
+        MATCH (f:Facet {{id: $id}})
+        SET f = {{id: f.id, type: f.type, configuration: $config}}
+        SET f += $fields
+        WITH f, null as n, CASE WHEN f.type = $ref_type THEN $ref_if_entity ELSE null END as ref
+        {SYNC_REFERENCE_CYPHER}
         RETURN f
         """
         
-        records, _, _ = driver.execute_query(query, id=facet_id, config=config_str, database_="neo4j")
-        
-        if not records:
+        def work(tx):
+            record = tx.run(
+                query, id=facet_id, config=config_str,
+                fields=FacetService.extract_fields(updates.configuration),
+                ref_type=ENTITY_REFERENCE_TYPE,
+                ref_if_entity=FacetService.reference_target(ENTITY_REFERENCE_TYPE, updates.configuration)
+            ).single()
+            return record, [{"op": "upsert", "kind": "Facet", "id": facet_id}] if record else []
+
+        if not ChangeLogService.write(driver, work):
              return None
-             
         return FacetService.get_facet(driver, facet_id)
 
     @staticmethod
@@ -95,6 +189,45 @@ class FacetService:
         query = """
         MATCH (f:Facet {id: $id})
         DETACH DELETE f
+        RETURN count(*) as deleted
         """
-        driver.execute_query(query, id=facet_id, database_="neo4j")
+        def work(tx):
+            deleted = tx.run(query, id=facet_id).single()["deleted"]
+            return None, [{"op": "delete", "kind": "Facet", "id": facet_id}] if deleted else []
+
+        ChangeLogService.write(driver, work)
         return {"message": "Facet deleted successfully"}
+
+    @staticmethod
+    def backfill_fields(driver: Driver, after: str, limit: int):
+        """
+        Brings up to `limit` facets with id > `after` up to date (cfg_* fields, REFERENCES edge).
+        Returns (last facet id, number of facets), or (None, 0) when there are none left.
+        """
+        records, _, _ = execute_read(driver, """
+        MATCH (f:Facet) WHERE f.id > $after
+        RETURN f.id as id, f.type as type, f.configuration as configuration
+        ORDER BY f.id LIMIT $limit
+        """, after=after, limit=limit)
+        if not records:
+            return None, 0
+
+        rows = []
+        for r in records:
+            try: conf = json.loads(r["configuration"])
+            except: conf = {}
+            rows.append({
+                "id": r["id"],
+                "fields": FacetService.extract_fields(conf),
+                "ref": FacetService.reference_target(r["type"], conf)
+            })
+
+        execute_write(driver, """
+        UNWIND $rows as row
+        MATCH (f:Facet {id: row.id})
+        SET f += row.fields
+        WITH f, row WHERE row.ref IS NOT NULL
+        MATCH (t:Entity {id: row.ref})
+        MERGE (f)-[:REFERENCES]->(t)
+        """, rows=rows)
+        return records[-1]["id"], len(rows)
@@ -0,0 +1,65 @@
+from neo4j import Driver
+from app.database import execute_write
+from app.core.ids import new_id
+from fastapi import HTTPException
+import itertools
+import hashlib
+import json
+import time
+import os
+
+IDEMPOTENCY_HEADER = os.getenv("IDEMPOTENCY_HEADER", "Idempotency-Key")
+# Seconds a key is remembered. A retry after that creates a new object.
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "86400"))
+MAX_KEY_LENGTH = 255
+
+_reservations = itertools.count(1)
+
+class IdempotencyService:
+    """
+    Client-supplied idempotency keys for POSTs that create objects.
+
+    The first request with a key reserves the id of the object it creates
+    (:IdempotencyKey {key, target_id, fingerprint, created_at}); a retry with the same key
+    gets the same id back and is answered with the existing object instead of a duplicate.
+    A retry whose body differs from the first request is rejected with 422.
+    """
+
+    @staticmethod
+    def reserve(driver: Driver, scope: str, key: str, payload: dict):
+        """Returns (id, replay). Without a key every call gets a fresh id."""
+        if key is None:
+            return new_id(), False
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise HTTPException(status_code=400, detail=f"{IDEMPOTENCY_HEADER} must be 1-{MAX_KEY_LENGTH} characters")
+
+        fingerprint = hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+        # The unique constraint on key serializes concurrent retries; an expired key is reused.
+        query = """
+        MERGE (k:IdempotencyKey {key: $key})
+        ON CREATE SET k.target_id = $id, k.fingerprint = $fingerprint, k.created_at = $now
+        WITH k
+        FOREACH (_ IN CASE WHEN k.created_at < $now - $ttl THEN [1] ELSE [] END |
+            SET k.target_id = $id, k.fingerprint = $fingerprint, k.created_at = $now)
+        RETURN k.target_id as id, k.fingerprint as fingerprint
+        """
+        eid = new_id()
+        records, _, _ = execute_write(
+            driver, query, key=f"{scope}:{key}", id=eid, fingerprint=fingerprint, now=time.time(), ttl=IDEMPOTENCY_TTL
+        )
+        record = records[0]
+        if record["fingerprint"] != fingerprint:
+            raise HTTPException(status_code=422, detail=f"{IDEMPOTENCY_HEADER} was already used with a different request")
+
+        if next(_reservations) % 1000 == 0:
+            IdempotencyService.prune(driver)
+        return record["id"], record["id"] != eid
+
+    @staticmethod
+    def prune(driver: Driver):
+        query = """
+        MATCH (k:IdempotencyKey) WHERE k.created_at < $cutoff
+        WITH k LIMIT 10000
+        DELETE k
+        """
+        execute_write(driver, query, cutoff=time.time() - IDEMPOTENCY_TTL)
@@ -0,0 +1,189 @@
+from neo4j import Driver
+from app.database import execute_read, execute_write
+from app.schemas import JobCreate
+from fastapi import HTTPException
+from app.core.ids import new_id
+import json
+import time
+
+TERMINAL_STATUSES = ("succeeded", "failed", "cancelled")
+
+def _loads(value):
+    if value is None:
+        return None
+    try: return json.loads(value)
+    except: return None
+
+class JobService:
+    """
+    Jobs are :Job nodes. `params`, `checkpoint` and `result` are stored as JSON strings.
+
+    status: queued -> running -> succeeded | failed | cancelled
+    A running job is leased by one runner (`lease_owner` until `lease_until`). Every
+    checkpoint renews the lease; a job whose lease expired (runner crashed or was stopped)
+    is claimed again and resumes from its last checkpoint.
+    """
+
+    @staticmethod
+    def to_response(j):
+        return {
+            "id": j["id"],
+            "type": j["type"],
+            "status": j["status"],
+            "params": _loads(j.get("params")) or {},
+            "batch_size": j["batch_size"],
+            "processed": j.get("processed") or 0,
+            "total": j.get("total"),
+            "result": _loads(j.get("result")),
+            "error": j.get("error"),
+            "cancel_requested": bool(j.get("cancel_requested")),
+            "created_at": j["created_at"],
+            "started_at": j.get("started_at"),
+            "finished_at": j.get("finished_at"),
+        }
+
+    @staticmethod
+    def submit(driver: Driver, job: JobCreate):
+        from app.jobs.handlers import HANDLERS
+        handler = HANDLERS[job.type]
+        handler.validate(job.params)
+        query = """
+        CREATE (j:Job {
+            id: $id,
+            type: $type,
+            status: 'queued',
+            params: $params,
+            batch_size: $batch_size,
+            processed: 0,
+            cancel_requested: false,
+            created_at: $now
+        })
+        RETURN j
+        """
+        records, _, _ = execute_write(
+            driver, query,
+            id=new_id(),
+            type=job.type,
+            params=json.dumps(job.params),
+            batch_size=job.batch_size,
+            now=time.time()
+        )
+        return JobService.to_response(records[0]["j"])
+
+    @staticmethod
+    def get_job(driver: Driver, job_id: str):
+        records, _, _ = execute_read(driver, "MATCH (j:Job {id: $id}) RETURN j", id=job_id)
+        if not records:
+            return None
+        return JobService.to_response(records[0]["j"])
+
+    @staticmethod
+    def list_jobs(driver: Driver, status: str = None, limit: int = 100):
+        query = """
+        MATCH (j:Job) WHERE $status IS NULL OR j.status = $status
+        RETURN j ORDER BY j.created_at DESC LIMIT $limit
+        """
+        records, _, _ = execute_read(driver, query, status=status, limit=limit)
+        return [JobService.to_response(r["j"]) for r in records]
+
+    @staticmethod
+    def cancel(driver: Driver, job_id: str):
+        # A queued job is cancelled right away, a running one at its next checkpoint.
+        query = """
+        MATCH (j:Job {id: $id})
+        SET j._lock = true
+        REMOVE j._lock
+        WITH j, j.status as previous
+        SET j.cancel_requested = CASE WHEN previous IN $terminal THEN j.cancel_requested ELSE true END,
+            j.status = CASE WHEN previous = 'queued' THEN 'cancelled' ELSE previous END,
+            j.finished_at = CASE WHEN previous = 'queued' THEN $now ELSE j.finished_at END
+        RETURN j, previous
+        """
+        records, _, _ = execute_write(driver, query, id=job_id, terminal=list(TERMINAL_STATUSES), now=time.time())
+        if not records:
+            return None
+        if records[0]["previous"] in TERMINAL_STATUSES:
+            raise HTTPException(status_code=409, detail=f"Job already {records[0]['previous']}")
+        return JobService.to_response(records[0]["j"])
+
+    # ---- runner side ----
+
+    @staticmethod
+    def claim(driver: Driver, owner: str, lease_seconds: float):
+        # Setting a property first takes the node's write lock, so the status is re-read
+        # after any concurrent claim committed: only one runner gets the job.
+        query = """
+        MATCH (j:Job)
+        WHERE j.status = 'queued' OR (j.status = 'running' AND j.lease_until < $now)
+        WITH j ORDER BY j.created_at LIMIT 1
+        SET j._lock = true
+        REMOVE j._lock
+        WITH j WHERE j.status = 'queued' OR (j.status = 'running' AND j.lease_until < $now)
+        SET j.status = 'running',
+            j.lease_owner = $owner,
+            j.lease_until = $now + $lease,
+            j.started_at = coalesce(j.started_at, $now)
+        RETURN j
+        """
+        records, _, _ = execute_write(driver, query, owner=owner, lease=lease_seconds, now=time.time())
+        if not records:
+            return None
+        j = records[0]["j"]
+        return {
+            "id": j["id"],
+            "type": j["type"],
+            "params": _loads(j["params"]) or {},
+            "batch_size": j["batch_size"],
+            "checkpoint": _loads(j.get("checkpoint")),
+            "processed": j.get("processed") or 0,
+            "total": j.get("total"),
+        }
+
+    @staticmethod
+    def save_checkpoint(driver: Driver, job_id: str, owner: str, lease_seconds: float, checkpoint, processed: int, total=None):
+        """Returns (still owned, cancel requested)."""
+        query = """
+        MATCH (j:Job {id: $id})
+        WHERE j.status = 'running' AND j.lease_owner = $owner
+        SET j.checkpoint = $checkpoint,
+            j.processed = $processed,
+            j.total = coalesce($total, j.total),
+            j.lease_until = $now + $lease
+        RETURN j.cancel_requested as cancel_requested
+        """
+        records, _, _ = execute_write(
+            driver, query,
+            id=job_id, owner=owner, lease=lease_seconds, now=time.time(),
+            checkpoint=json.dumps(checkpoint), processed=processed, total=total
+        )
+        if not records:
+            return False, False
+        return True, bool(records[0]["cancel_requested"])
+
+    @staticmethod
+    def finish(driver: Driver, job_id: str, owner: str, status: str, result=None, error: str = None):
+        query = """
+        MATCH (j:Job {id: $id})
+        WHERE j.status = 'running' AND j.lease_owner = $owner
+        SET j.status = $status,
+            j.result = $result,
+            j.error = $error,
+            j.finished_at = $now
+        REMOVE j.lease_owner, j.lease_until
+        """
+        execute_write(
+            driver, query,
+            id=job_id, owner=owner, status=status, error=error, now=time.time(),
+            result=json.dumps(result) if result is not None else None
+        )
+
+    @staticmethod
+    def release(driver: Driver, job_id: str, owner: str):
+        # Runner shutting down: hand the job back so another runner resumes it right away.
+        query = """
+        MATCH (j:Job {id: $id})
+        WHERE j.status = 'running' AND j.lease_owner = $owner
+        SET j.status = 'queued'
+        REMOVE j.lease_owner, j.lease_until
+        """
+        execute_write(driver, query, id=job_id, owner=owner)
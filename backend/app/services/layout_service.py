@@ -0,0 +1,134 @@
+from neo4j import Driver
+from app.core.dag import dag_index
+from app.core.tenancy import tenants
+import threading
+import os
+
+NODE_SPACING = float(os.getenv("LAYOUT_NODE_SPACING", "160"))
+LAYER_SPACING = float(os.getenv("LAYOUT_LAYER_SPACING", "120"))
+# Barycenter sweeps (down + up) for a layout from scratch, and when starting from
+# the ordering of the previous model version.
+FULL_SWEEPS = 4
+INCREMENTAL_SWEEPS = 1
+
+# Guards the per-tenant layout caches (TenantState.layout_cache), dropped with their tenant.
+_cache_lock = threading.Lock()
+
+class LayoutService:
+    """
+    Sugiyama-style layered layout of the relation DAG:
+    1. layers: longest-path levels maintained incrementally by the DAG index,
+    2. long edges are split with dummy nodes, one per crossed layer,
+    3. crossings are reduced with barycenter sweeps,
+    4. nodes are placed on a grid centred per layer; dummies become edge bend points.
+
+    The result is cached per model version. A new version starts from the previous
+    node ordering, so only the neighbourhood of the change moves.
+    """
+
+    @staticmethod
+    def get_layout(driver: Driver):
+        dag_index.sync(driver)
+        snap = dag_index.snapshot()
+        _cache = tenants.state().layout_cache
+        with _cache_lock:
+            if _cache["layout"] is not None and _cache["version"] == snap["version"]:
+                return _cache["layout"]
+            previous_rank = _cache["rank"]
+
+        layout, rank = LayoutService.compute(snap, previous_rank)
+        with _cache_lock:
+            _cache.update(version=snap["version"], layout=layout, rank=rank)
+        return layout
+
+    @staticmethod
+    def compute(snap, previous_rank=None):
+        previous_rank = previous_rank or {}
+        level = snap["level"]
+        order = sorted(level, key=lambda n: (level[n], n))
+        ancestors, descendants = snap["ancestors"], snap["descendants"]
+        depth = max(level.values(), default=-1) + 1
+
+        # Layered graph with dummy nodes for edges spanning more than one layer.
+        up = {n: [] for n in level}
+        down = {n: [] for n in level}
+        layers = [[] for _ in range(depth)]
+        for n in order:
+            layers[level[n]].append(n)
+        chains = {}
+        for rid, (s, t) in sorted(snap["edges"].items()):
+            chain = [s]
+            for lvl in range(level[s] + 1, level[t]):
+                dummy = ("dummy", rid, lvl)
+                up[dummy] = []
+                down[dummy] = []
+                layers[lvl].append(dummy)
+                chain.append(dummy)
+            chain.append(t)
+            for a, b in zip(chain, chain[1:]):
+                down[a].append(b)
+                up[b].append(a)
+            chains[rid] = chain
+
+        # Warm start: keep each node's relative position from the previous layout.
+        incremental = bool(previous_rank)
+        for layer in layers:
+            layer.sort(key=lambda n: (previous_rank.get(n, float("inf")), str(n)))
+
+        pos = {}
+        def renumber(layer):
+            for i, n in enumerate(layer):
+                pos[n] = i
+        for layer in layers:
+            renumber(layer)
+
+        def sweep(layer, neighbours):
+            keys = {}
+            for n in layer:
+                adj = neighbours[n]
+                keys[n] = sum(pos[a] for a in adj) / len(adj) if adj else pos[n]
+            layer.sort(key=lambda n: keys[n])
+            renumber(layer)
+
+        for _ in range(INCREMENTAL_SWEEPS if incremental else FULL_SWEEPS):
+            for i in range(1, depth):
+                sweep(layers[i], up)
+            for i in range(depth - 2, -1, -1):
+                sweep(layers[i], down)
+
+        coords = {}
+        for lvl, layer in enumerate(layers):
+            offset = (len(layer) - 1) / 2.0
+            for i, n in enumerate(layer):
+                coords[n] = (round((i - offset) * NODE_SPACING, 2), lvl * LAYER_SPACING)
+
+        nodes = [
+            {
+                "id": n,
+                "level": level[n],
+                "position": pos[n],
+                "x": coords[n][0],
+                "y": coords[n][1],
+                "ancestor_count": ancestors[n],
+                "descendant_count": descendants[n],
+            }
+            for n in order
+        ]
+        edges = [
+            {
+                "relation_id": rid,
+                "source_id": chain[0],
+                "target_id": chain[-1],
+                "points": [list(coords[n]) for n in chain],
+            }
+            for rid, chain in chains.items()
+        ]
+        layout = {
+            "version": snap["version"],
+            "layers": depth,
+            "incremental": incremental,
+            "order": order,
+            "nodes": nodes,
+            "edges": edges,
+        }
+        return layout, dict(pos)
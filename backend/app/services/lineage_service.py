@@ -0,0 +1,54 @@
+from neo4j import Driver
+from fastapi import HTTPException
+from app.database import execute_read
+from app.core.dag import dag_index, DAG_INDEX_ENABLED
+from app.services.changelog_service import ChangeLogService
+import os
+
+MAX_LINEAGE_DEPTH = 1000
+# Depth the Cypher fallback follows when the request gives no max_depth.
+LINEAGE_CYPHER_MAX_DEPTH = int(os.getenv("LINEAGE_CYPHER_MAX_DEPTH", "20"))
+
+class LineageService:
+    """
+    Upstream/downstream sets over HAS_OUTGOING/TARGETS. With DAG_INDEX_ENABLED they are
+    read off the DAG index's reachability labels; otherwise a depth-bounded traversal
+    runs in Neo4j.
+    """
+
+    @staticmethod
+    def get_lineage(driver: Driver, entity_id: str, direction: str = "down", limit: int = None, max_depth: int = None):
+        if limit is not None and limit < 0:
+            raise HTTPException(status_code=400, detail="limit must not be negative")
+        if max_depth is not None and not 1 <= max_depth <= MAX_LINEAGE_DEPTH:
+            raise HTTPException(status_code=400, detail=f"max_depth must be between 1 and {MAX_LINEAGE_DEPTH}")
+
+        if DAG_INDEX_ENABLED:
+            dag_index.sync(driver)
+            result = dag_index.lineage(entity_id, direction, limit, max_depth)
+            version = dag_index.version
+        else:
+            version = ChangeLogService.head_seq(driver)
+            result = LineageService._traverse(driver, entity_id, direction, limit, max_depth)
+        if result is None:
+            raise HTTPException(status_code=404, detail="Entity not found")
+        return {
+            "entity_id": entity_id,
+            "direction": direction,
+            "version": version,
+            **result
+        }
+
+    @staticmethod
+    def _traverse(driver: Driver, entity_id: str, direction: str, limit: int, max_depth: int):
+        # One entity-to-entity step is two relationships (HAS_OUTGOING, TARGETS).
+        hops = f"*2..{2 * (max_depth or LINEAGE_CYPHER_MAX_DEPTH)}"
+        pattern = f"<-[:HAS_OUTGOING|TARGETS{hops}]-" if direction == "up" else f"-[:HAS_OUTGOING|TARGETS{hops}]->"
+        query = f"""
+        MATCH (e:Entity {{id: $id}})
+        OPTIONAL MATCH (e){pattern}(m:Entity)
+        WITH e, collect(DISTINCT m.id) as ids
+        RETURN size(ids) as count, CASE WHEN $limit IS NULL THEN ids ELSE ids[..$limit] END as ids
+        """
+        records, _, _ = execute_read(driver, query, id=entity_id, limit=limit)
+        return {"count": records[0]["count"], "ids": records[0]["ids"]} if records else None
@@ -0,0 +1,99 @@
+from neo4j import Driver
+from app.database import execute_read
+from app.schemas import FacetQueryRequest, FacetMatch
+from app.services.facet_service import CONFIGURATION_FIELD_PREFIX
+from fastapi import HTTPException
+import re
+
+MAX_QUERY_LIMIT = 1000
+
+# Keys are inlined into the Cypher text (so the planner can use the cfg_* indexes);
+# only plain identifiers are accepted.
+_KEY_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+_OPERATORS = {
+    "eq": "{prop} = {param}",
+    "ne": "{prop} <> {param}",
+    "in": "{prop} IN {param}",
+    "contains": "{prop} CONTAINS {param}",
+    "starts_with": "{prop} STARTS WITH {param}",
+    "gt": "{prop} > {param}",
+    "gte": "{prop} >= {param}",
+    "lt": "{prop} < {param}",
+    "lte": "{prop} <= {param}",
+}
+
+_TARGET_LABELS = {
+    "entity": ":Entity",
+    "relation": ":RelationDefinition",
+    "any": "",
+}
+
+class FacetQueryService:
+    @staticmethod
+    def _conditions(var: str, match: FacetMatch, params: dict):
+        conditions = []
+        if match.type is not None:
+            name = f"{var}_type"
+            params[name] = match.type
+            conditions.append(f"{var}.type = ${name}")
+
+        for i, predicate in enumerate(match.where):
+            if not _KEY_PATTERN.match(predicate.key):
+                raise HTTPException(status_code=400, detail=f"Invalid configuration key: {predicate.key}")
+            prop = f"{var}.`{CONFIGURATION_FIELD_PREFIX}{predicate.key}`"
+            if predicate.op == "exists":
+                conditions.append(f"{prop} IS NULL" if predicate.value is False else f"{prop} IS NOT NULL")
+                continue
+            if predicate.op == "in" and not isinstance(predicate.value, list):
+                raise HTTPException(status_code=400, detail=f"Operator 'in' needs a list value for key: {predicate.key}")
+            name = f"{var}_p{i}"
+            params[name] = predicate.value
+            conditions.append(_OPERATORS[predicate.op].format(prop=prop, param=f"${name}"))
+
+        return " AND ".join(conditions) if conditions else "true"
+
+    @staticmethod
+    def build_query(request: FacetQueryRequest):
+        if not request.match:
+            raise HTTPException(status_code=400, detail="At least one facet match is required")
+        if request.limit < 1 or request.limit > MAX_QUERY_LIMIT:
+            raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_QUERY_LIMIT}")
+
+        params = {"cursor": request.cursor, "limit": request.limit + 1}
+        label = _TARGET_LABELS[request.target]
+
+        where = [FacetQueryService._conditions("f0", request.match[0], params)]
+        if not label:
+            where.append("(n:Entity OR n:RelationDefinition)")
+        where.append("($cursor IS NULL OR n.id > $cursor)")
+        # Every further match must be satisfied by some (possibly other) facet of the same owner.
+        for i, match in enumerate(request.match[1:], start=1):
+            conds = FacetQueryService._conditions(f"f{i}", match, params)
+            where.append(f"EXISTS {{ MATCH (n)-[:HAS_FACET]->(f{i}:Facet) WHERE {conds} }}")
+
+        query = f"""
+        MATCH (n{label})-[:HAS_FACET]->(f0:Facet)
+        WHERE {" AND ".join(where)}
+        WITH DISTINCT n
+        RETURN n.id as id, n:Entity as is_entity
+        ORDER BY id
+        LIMIT $limit
+        """
+        return query, params
+
+    @staticmethod
+    def query_facets(driver: Driver, request: FacetQueryRequest):
+        query, params = FacetQueryService.build_query(request)
+        records, _, _ = execute_read(driver, query, params)
+
+        next_cursor = None
+        if len(records) > request.limit:
+            records = records[:request.limit]
+            next_cursor = records[-1]["id"]
+
+        return {
+            "entity_ids": [r["id"] for r in records if r["is_entity"]],
+            "relation_ids": [r["id"] for r in records if not r["is_entity"]],
+            "next_cursor": next_cursor
+        }
@@ -1,52 +1,67 @@
 from neo4j import Driver
+from app.database import execute_read
 from app.schemas import RelationCreate, RelationUpdate, RelationResponse
+from app.services.changelog_service import ChangeLogService
+from app.core.replica import replica
+from app.services.idempotency_service import IdempotencyService
 from fastapi import HTTPException
-import uuid
 import json
 
 class RelationService:
     @staticmethod
-    def create_relation(driver: Driver, source_id: str, relation: RelationCreate):
+    def create_relation(driver: Driver, source_id: str, relation: RelationCreate, idempotency_key: str = None):
         if source_id == relation.target_entity_id:
             raise HTTPException(status_code=400, detail="Self-loops not allowed")
 
+        rid, replay = IdempotencyService.reserve(driver, f"relation:{source_id}", idempotency_key, relation.model_dump())
+        if replay:
+            existing = RelationService.get_relation(driver, rid)
+            if existing:
+                return existing
+
         # Cycle Check (Path existence)
+        # Runs in the write transaction on the leader, after taking the change log lock, so a
+        # concurrent create cannot close the cycle between the check and the MERGE.
         cycle_query = """
         MATCH (s:Entity {id: $sid}), (t:Entity {id: $tid})
         MATCH p = (t)-[:HAS_OUTGOING|TARGETS*]->(s)
         RETURN p LIMIT 1
         """
-        records, _, _ = driver.execute_query(cycle_query, sid=source_id, tid=relation.target_entity_id, database_="neo4j")
-        if records:
-             raise HTTPException(status_code=400, detail="Creating this relation would cause a cycle")
-
         # Create Reified Relation Node
+        # The node is merged on its own (the unique constraint on id makes that atomic),
+        # then each relationship; a path MERGE would create a second node with the same id.
         query = """
         MATCH (s:Entity {id: $sid}), (t:Entity {id: $tid})
-        CREATE (s)-[:HAS_OUTGOING]->(r:RelationDefinition {
-            id: $rid, 
-            name: $name, 
-            description: $desc
-        })-[:TARGETS]->(t)
+        MERGE (r:RelationDefinition {id: $rid})
+        ON CREATE SET r.name = $name, r.description = $desc
+        MERGE (s)-[:HAS_OUTGOING]->(r)
+        MERGE (r)-[:TARGETS]->(t)
         RETURN r
         """
-        rid = str(uuid.uuid4())
         desc = relation.description if relation.description else ""
         
-        records, _, _ = driver.execute_query(
-            query,
-            sid=source_id,
-            tid=relation.target_entity_id,
-            rid=rid,
-            name=relation.name,
-            desc=desc,
-            database_="neo4j"
-        )
-        
-        if not records:
-             raise HTTPException(status_code=404, detail="Source or Target Entity not found")
-             
-        r = records[0]["r"]
+
+        def work(tx):
+            ChangeLogService.lock(tx)
+            if tx.run(cycle_query, sid=source_id, tid=relation.target_entity_id).single():
+                 raise HTTPException(status_code=400, detail="Creating this relation would cause a cycle")
+            record = tx.run(
+                query,
+                sid=source_id,
+                tid=relation.target_entity_id,
+                rid=rid,
+                name=relation.name,
+                desc=desc
+            ).single()
+            if record is None:
+                 raise HTTPException(status_code=404, detail="Source or Target Entity not found")
+            r = record["r"]
+            return r, [{
+                "op": "upsert", "kind": "Relation", "id": r["id"],
+                "source_id": source_id, "target_id": relation.target_entity_id
+            }]
+
+        r = ChangeLogService.write(driver, work)
         return {
             "id": r["id"],
             "source_entity_id": source_id,
@@ -58,11 +73,14 @@ class RelationService:
 
     @staticmethod
     def get_relation(driver: Driver, relation_id: str):
+        if replica.is_fresh():
+            return replica.get_relation(relation_id)
+
         query = """
         MATCH (s:Entity)-[:HAS_OUTGOING]->(r:RelationDefinition {id: $id})-[:TARGETS]->(t:Entity)
         RETURN r, s.id as sid, t.id as tid, [(r)-[:HAS_FACET]->(f:Facet) | f] as facets
         """
-        records, _, _ = driver.execute_query(query, id=relation_id, database_="neo4j")
+        records, _, _ = execute_read(driver, query, id=relation_id)
         
         if not records:
             return None
@@ -112,11 +130,12 @@ class RelationService:
         RETURN r
         """
         
-        records, _, _ = driver.execute_query(query, parameters_=params, database_="neo4j")
-        
-        if not records:
+        def work(tx):
+            record = tx.run(query, params).single()
+            return record, [{"op": "upsert", "kind": "Relation", "id": relation_id}] if record else []
+
+        if not ChangeLogService.write(driver, work):
              return None
-             
         return RelationService.get_relation(driver, relation_id)
 
     @staticmethod
@@ -124,7 +143,18 @@ class RelationService:
         query = """
         MATCH (r:RelationDefinition {id: $id})
         OPTIONAL MATCH (r)-[:HAS_FACET]->(f:Facet)
-        DETACH DELETE f, r
+        WITH r, collect(f) as facets, [x IN collect(f) | x.id] as facet_ids
+        FOREACH (x IN facets | DETACH DELETE x)
+        DETACH DELETE r
+        RETURN facet_ids
         """
-        driver.execute_query(query, id=relation_id, database_="neo4j")
+        def work(tx):
+            record = tx.run(query, id=relation_id).single()
+            if record is None:
+                return None, []
+            events = [{"op": "delete", "kind": "Facet", "id": fid} for fid in record["facet_ids"]]
+            events.append({"op": "delete", "kind": "Relation", "id": relation_id})
+            return None, events
+
+        ChangeLogService.write(driver, work)
         return {"message": "Relation deleted successfully"}
@@ -0,0 +1,31 @@
+"""
+Brings facets created by older versions up to date:
+- copies top-level scalar configuration values onto cfg_* properties (POST /query/facets),
+- links entity reference facets to their target with a REFERENCES edge (?expand=entity_refs).
+
+    python -m scripts.backfill_facet_fields --batch-size 1000
+
+Safe to re-run; it walks facets in id order and rewrites the extracted fields.
+The same migration runs as a resumable background job:
+    POST /jobs {"type": "migration", "params": {"name": "backfill_facet_fields"}}
+"""
+import argparse
+from app.database import get_driver
+from app.services.facet_service import FacetService
+
+def backfill(driver, batch_size):
+    after = ""
+    total = 0
+    while True:
+        after, count = FacetService.backfill_fields(driver, after, batch_size)
+        if not count:
+            break
+        total += count
+        print(f"Backfilled {total} facets")
+    return total
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    backfill(get_driver(), args.batch_size)
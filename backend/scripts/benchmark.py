@@ -0,0 +1,310 @@
+"""
+Reproducible API benchmark with regression comparison.
+
+Generates a synthetic model, runs scenario drivers against it and writes a JSON
+result that can be compared with a result from another commit:
+
+    python -m scripts.benchmark --entities 500 --out bench/head.json
+    python -m scripts.benchmark --compare bench/base.json bench/head.json
+
+Runs in-process through TestClient unless --base-url is given. Only the objects it
+creates are deleted afterwards; the database is not wiped.
+"""
+import argparse
+import datetime
+import json
+import random
+import subprocess
+import sys
+import time
+from scripts.load_test import percentile
+
+SCENARIOS = ["crud", "graph", "relations", "lineage", "changelog"]
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+
+    def call(self, name, fn, expect=(200,)):
+        start = time.perf_counter()
+        resp = fn()
+        elapsed = time.perf_counter() - start
+        self.samples.setdefault(name, []).append(elapsed)
+        if resp.status_code not in expect:
+            self.errors[name] = self.errors.get(name, 0) + 1
+        return resp
+
+    def summary(self):
+        result = {}
+        for name, values in self.samples.items():
+            values = sorted(values)
+            result[name] = {
+                "count": len(values),
+                "errors": self.errors.get(name, 0),
+                "mean_ms": round(sum(values) / len(values) * 1000, 3),
+                "p50_ms": round(percentile(values, 50) * 1000, 3),
+                "p90_ms": round(percentile(values, 90) * 1000, 3),
+                "p99_ms": round(percentile(values, 99) * 1000, 3),
+            }
+        return result
+
+class SyntheticModel:
+    """
+    Layered DAG: entities are spread over `depth` layers and relations only point
+    to deeper layers, so generation never trips the cycle check.
+    """
+
+    def __init__(self, client, entities, facet_density, fan_out, depth, rng):
+        self.client = client
+        self.n = entities
+        self.facet_density = facet_density
+        self.fan_out = fan_out
+        self.depth = max(1, depth)
+        self.rng = rng
+        self.layers = [[] for _ in range(self.depth)]
+        self.entity_ids = []
+
+    def _facet_count(self):
+        whole = int(self.facet_density)
+        return whole + (1 if self.rng.random() < self.facet_density - whole else 0)
+
+    def build(self, rec):
+        for i in range(self.n):
+            layer = i % self.depth
+            resp = rec.call("setup.create_entity", lambda: self.client.post(
+                "/entities", json={"name": f"bench-{i}", "description": f"layer {layer}"}))
+            eid = resp.json()["id"]
+            self.layers[layer].append(eid)
+            self.entity_ids.append(eid)
+            for k in range(self._facet_count()):
+                rec.call("setup.add_facet", lambda: self.client.post(f"/entities/{eid}/facets", json={
+                    "type": "property",
+                    "configuration": {"name": f"p{k}", "dataType": self.rng.choice(["string", "integer", "float"])}
+                }))
+
+        for layer in range(self.depth - 1):
+            deeper = [e for l in self.layers[layer + 1:] for e in l]
+            for sid in self.layers[layer]:
+                for tid in self.rng.sample(deeper, min(self.fan_out, len(deeper))):
+                    rec.call("setup.create_relation", lambda: self.client.post(
+                        f"/entities/{sid}/relations", json={"target_entity_id": tid, "name": "bench_rel"}))
+
+    def cleanup(self):
+        for eid in self.entity_ids:
+            self.client.delete(f"/entities/{eid}")
+
+def scenario_crud(client, model, rec, ops, rng):
+    # 70% point reads, 10% list, 10% update, 5% create, 5% delete of a created entity
+    created = []
+    for _ in range(ops):
+        roll = rng.random()
+        if roll < 0.70:
+            eid = rng.choice(model.entity_ids)
+            rec.call("crud.get_entity", lambda: client.get(f"/entities/{eid}"))
+        elif roll < 0.80:
+            rec.call("crud.list_entities", lambda: client.get("/entities"))
+        elif roll < 0.90:
+            eid = rng.choice(model.entity_ids)
+            rec.call("crud.update_entity", lambda: client.put(f"/entities/{eid}", json={"description": "updated"}))
+        elif roll < 0.95 or not created:
+            resp = rec.call("crud.create_entity", lambda: client.post("/entities", json={"name": "bench-crud"}))
+            created.append(resp.json()["id"])
+        else:
+            eid = created.pop()
+            rec.call("crud.delete_entity", lambda: client.delete(f"/entities/{eid}"))
+    for eid in created:
+        client.delete(f"/entities/{eid}")
+
+def scenario_graph(client, model, rec, ops, rng):
+    for _ in range(max(1, ops // 20)):
+        rec.call("graph.export", lambda: client.get("/graph"))
+
+def scenario_relations(client, model, rec, ops, rng):
+    # Relation creation from the top layer to the bottom forces the deepest cycle checks;
+    # reversing it must be rejected.
+    if model.depth < 2:
+        return
+    top, bottom = model.layers[0], model.layers[-1]
+    created = []
+    for _ in range(max(1, ops // 10)):
+        sid, tid = rng.choice(top), rng.choice(bottom)
+        resp = rec.call("relations.create", lambda: client.post(
+            f"/entities/{sid}/relations", json={"target_entity_id": tid, "name": "bench_deep"}))
+        if resp.status_code == 200:
+            created.append(resp.json()["id"])
+        rec.call("relations.create_cycle_rejected", lambda: client.post(
+            f"/entities/{tid}/relations", json={"target_entity_id": sid, "name": "bench_cycle"}), expect=(400,))
+    for rid in created:
+        rec.call("relations.delete", lambda: client.delete(f"/relations/{rid}"))
+
+def scenario_lineage(client, model, rec, ops, rng):
+    # Lineage lookups through the API against the equivalent variable-length Cypher.
+    # The Cypher side needs the database, so it only runs in-process.
+    from fastapi.testclient import TestClient
+    from app.database import get_driver, execute_read
+    driver = get_driver() if isinstance(client, TestClient) else None
+    traversal = {
+        "down": "MATCH (n:Entity {id: $id})-[:HAS_OUTGOING|TARGETS*]->(m:Entity) RETURN count(DISTINCT m) as c",
+        "up": "MATCH (n:Entity {id: $id})<-[:HAS_OUTGOING|TARGETS*]-(m:Entity) RETURN count(DISTINCT m) as c",
+    }
+    for _ in range(max(1, ops // 5)):
+        eid = rng.choice(model.entity_ids)
+        direction = rng.choice(["up", "down"])
+        resp = rec.call(f"lineage.api_{direction}", lambda: client.get(
+            f"/entities/{eid}/lineage", params={"direction": direction, "limit": 100}))
+        if driver is None:
+            continue
+        start = time.perf_counter()
+        records, _, _ = execute_read(driver, traversal[direction], id=eid)
+        rec.samples.setdefault(f"lineage.cypher_{direction}", []).append(time.perf_counter() - start)
+        if resp.status_code == 200 and resp.json()["count"] != records[0]["c"]:
+            rec.errors[f"lineage.api_{direction}"] = rec.errors.get(f"lineage.api_{direction}", 0) + 1
+
+def scenario_changelog(client, model, rec, ops, rng):
+    # Cost of the change log on writes: the same update with its event (which takes the
+    # ChangeLogHead lock) and without, by 1 and 8 concurrent writers. The lock serializes
+    # logged writes, so the gap widens with concurrency. Needs the database, so it only
+    # runs in-process.
+    from concurrent.futures import ThreadPoolExecutor
+    from fastapi.testclient import TestClient
+    from app.database import get_driver, write_transaction
+    from app.services.changelog_service import ChangeLogService
+    if not isinstance(client, TestClient):
+        return
+    driver = get_driver()
+    query = "MATCH (e:Entity {id: $id}) SET e.description = $description"
+
+    def logged(eid, i):
+        def work(tx):
+            tx.run(query, id=eid, description=f"bench {i}").consume()
+            return None, [{"op": "upsert", "kind": "Entity", "id": eid}]
+        ChangeLogService.write(driver, work)
+
+    def unlogged(eid, i):
+        write_transaction(driver, lambda tx: tx.run(query, id=eid, description=f"bench {i}").consume())
+
+    def timed_write(name, fn, eid, i):
+        start = time.perf_counter()
+        fn(eid, i)
+        return name, time.perf_counter() - start
+
+    for writers in (1, 8):
+        for label, fn in (("logged", logged), ("unlogged", unlogged)):
+            name = f"changelog.{label}_x{writers}"
+            with ThreadPoolExecutor(max_workers=writers) as pool:
+                futures = [pool.submit(timed_write, name, fn, rng.choice(model.entity_ids), i)
+                           for i in range(max(1, ops // 5))]
+                for future in futures:
+                    try:
+                        rec.samples.setdefault(name, []).append(future.result()[1])
+                    except Exception:
+                        rec.errors[name] = rec.errors.get(name, 0) + 1
+
+SCENARIO_DRIVERS = {
+    "crud": scenario_crud,
+    "graph": scenario_graph,
+    "relations": scenario_relations,
+    "lineage": scenario_lineage,
+    "changelog": scenario_changelog,
+}
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return None
+
+def make_client(base_url):
+    if base_url:
+        import httpx
+        return httpx.Client(base_url=base_url, timeout=120)
+    from fastapi.testclient import TestClient
+    from app.main import app
+    return TestClient(app)
+
+def run(args):
+    rng = random.Random(args.seed)
+    client = make_client(args.base_url)
+    setup = Recorder()
+    model = SyntheticModel(client, args.entities, args.facet_density, args.fan_out, args.depth, rng)
+    results = {}
+    try:
+        model.build(setup)
+        for name in args.scenarios:
+            rec = Recorder()
+            SCENARIO_DRIVERS[name](client, model, rec, args.ops, rng)
+            results[name] = rec.summary()
+    finally:
+        model.cleanup()
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "target": args.base_url or "in-process",
+            "params": {
+                "entities": args.entities,
+                "facet_density": args.facet_density,
+                "fan_out": args.fan_out,
+                "depth": args.depth,
+                "ops": args.ops,
+                "seed": args.seed,
+            },
+        },
+        "setup": setup.summary(),
+        "scenarios": results,
+    }
+
+def compare(base, head, threshold):
+    """Returns a list of (operation, metric, base, head) that regressed by more than `threshold`."""
+    if base["meta"]["params"] != head["meta"]["params"]:
+        print("WARNING: results were produced with different parameters")
+    regressions = []
+    for scenario, ops in head["scenarios"].items():
+        for op, stats in ops.items():
+            old = base["scenarios"].get(scenario, {}).get(op)
+            if not old:
+                continue
+            for metric in ("p50_ms", "p99_ms"):
+                if old[metric] and stats[metric] > old[metric] * (1 + threshold):
+                    regressions.append((op, metric, old[metric], stats[metric]))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default=None, help="Benchmark a running server instead of in-process")
+    parser.add_argument("--entities", type=int, default=200)
+    parser.add_argument("--facet-density", type=float, default=2.0, help="Average facets per entity")
+    parser.add_argument("--fan-out", type=int, default=2, help="Relations per entity")
+    parser.add_argument("--depth", type=int, default=5, help="DAG depth (layers)")
+    parser.add_argument("--ops", type=int, default=500, help="Operations per scenario")
+    parser.add_argument("--scenarios", nargs="+", default=SCENARIOS, choices=SCENARIOS)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default=None, help="Write the JSON result to this file")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "HEAD"), help="Compare two result files")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed relative slowdown")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            base = json.load(f)
+        with open(args.compare[1]) as f:
+            head = json.load(f)
+        regressions = compare(base, head, args.threshold)
+        for op, metric, old, new in regressions:
+            print(f"[REGRESSION] {op} {metric}: {old} -> {new}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions")
+        return
+
+    result = run(args)
+    output = json.dumps(result, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output)
+    print(output)
+
+if __name__ == "__main__":
+    main()
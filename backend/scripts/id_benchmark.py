@@ -0,0 +1,105 @@
+"""
+Compares the id schemes of app/core/ids.py.
+
+For each scheme it reports the generation cost, the id length (bytes per index key and
+per id in API payloads) and the share of ids that sort after every id minted before
+them, i.e. index inserts that append at the right edge of the B-tree instead of
+landing on a random leaf. With --neo4j it also inserts --count nodes per scheme into
+an indexed scratch label and measures insert throughput; the scratch nodes and index
+are dropped afterwards.
+
+    python -m scripts.id_benchmark --count 100000 --out bench/ids.json
+    python -m scripts.id_benchmark --neo4j --count 50000 --batch 1000
+
+Results use the scripts/benchmark.py format, so --compare works on them.
+"""
+import argparse
+import datetime
+import json
+import sys
+import time
+from app.core.ids import SCHEMES
+from scripts.benchmark import Recorder, git_commit
+
+def append_ratio(ids):
+    appends, highest = 0, None
+    for value in ids:
+        if highest is None or value > highest:
+            appends += 1
+            highest = value
+    return appends / len(ids)
+
+def insert_throughput(driver, scheme, ids, batch, rec):
+    from app.database import execute_write
+    label = "IdBench"
+    execute_write(driver, f"CREATE INDEX id_bench_id IF NOT EXISTS FOR (n:{label}) ON (n.id)")
+    try:
+        start = time.perf_counter()
+        for i in range(0, len(ids), batch):
+            t = time.perf_counter()
+            execute_write(driver, f"UNWIND $ids as id CREATE (:{label} {{id: id}})", ids=ids[i:i + batch])
+            rec.samples.setdefault(f"{scheme}.insert_batch", []).append(time.perf_counter() - t)
+        return len(ids) / (time.perf_counter() - start)
+    finally:
+        while True:
+            records, _, _ = execute_write(
+                driver, f"MATCH (n:{label}) WITH n LIMIT 10000 DELETE n RETURN count(*) as deleted"
+            )
+            if records[0]["deleted"] == 0:
+                break
+        execute_write(driver, "DROP INDEX id_bench_id IF EXISTS")
+
+def run(args):
+    rec = Recorder()
+    driver = None
+    if args.neo4j:
+        from app.database import driver_manager
+        driver = driver_manager.get()
+
+    schemes = {}
+    for scheme in args.schemes:
+        mint = SCHEMES[scheme]
+        ids = []
+        for _ in range(0, args.count, args.batch):
+            t = time.perf_counter()
+            ids.extend(mint() for _ in range(args.batch))
+            rec.samples.setdefault(f"{scheme}.generate_batch", []).append(time.perf_counter() - t)
+        ids = ids[:args.count]
+        elapsed = sum(rec.samples[f"{scheme}.generate_batch"])
+        schemes[scheme] = {
+            "length": len(ids[0]),
+            "key_bytes_total": sum(len(i.encode()) for i in ids),
+            "append_ratio": round(append_ratio(ids), 4),
+            "generated_per_second": round(len(ids) / elapsed),
+        }
+        if driver is not None:
+            schemes[scheme]["inserts_per_second"] = round(insert_throughput(driver, scheme, ids, args.batch, rec))
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "target": "neo4j" if driver is not None else "in-process",
+            "params": {"count": args.count, "batch": args.batch, "python": sys.version.split()[0]},
+        },
+        "schemes": schemes,
+        "scenarios": {"ids": rec.summary()},
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=100000, help="Ids per scheme")
+    parser.add_argument("--batch", type=int, default=1000, help="Ids per timed batch (and per insert query)")
+    parser.add_argument("--schemes", nargs="+", default=list(SCHEMES), choices=list(SCHEMES))
+    parser.add_argument("--neo4j", action="store_true", help="Also measure insert throughput (needs Neo4j)")
+    parser.add_argument("--out", default=None, help="Write the JSON result to this file")
+    args = parser.parse_args()
+
+    output = json.dumps(run(args), indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output)
+    print(output)
+
+if __name__ == "__main__":
+    main()
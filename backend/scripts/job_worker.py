@@ -0,0 +1,34 @@
+"""
+Dedicated job worker: runs queued jobs (POST /jobs) outside the API processes.
+
+    uvicorn app.main:app --workers 4    # JOB_WORKERS defaults to 0
+    python -m scripts.job_worker --threads 2
+
+Stops after the current batch on Ctrl+C; an interrupted job goes back to the queue.
+"""
+import argparse
+import signal
+import threading
+from app.database import driver_manager
+from app.jobs.runner import job_runner
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=1)
+    args = parser.parse_args()
+
+    driver = driver_manager.start()
+    job_runner.start(driver, workers=args.threads)
+    print(f"Job worker {job_runner.owner} running with {args.threads} thread(s)")
+
+    stop = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    while not stop.wait(1):
+        pass
+
+    job_runner.stop()
+    driver_manager.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Load generator for sizing workers x connection pool.
+
+Runs a fixed mix of point reads, listings, /graph exports and writes against a
+running server from N client threads, then prints throughput and latency percentiles.
+
+    uvicorn app.main:app --workers 4
+    python -m scripts.load_test --concurrency 64 --duration 30
+
+Only the entities it creates are deleted afterwards; the database is not wiped.
+"""
+import argparse
+import random
+import threading
+import time
+import json
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    k = min(len(sorted_values) - 1, int(round(p / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, weight = part.split("=")
+        mix[name.strip()] = float(weight)
+    return mix
+
+class LoadTest:
+    def __init__(self, base_url, concurrency, duration, mix, seed_entities):
+        self.base_url = base_url
+        self.concurrency = concurrency
+        self.duration = duration
+        self.mix = mix
+        self.seed_entities = seed_entities
+        self.entity_ids = []
+        self.created = []
+        self.latencies = {name: [] for name in mix}
+        self.statuses = {}
+        self.lock = threading.Lock()
+
+    def seed(self, client):
+        for i in range(self.seed_entities):
+            resp = client.post("/entities", json={"name": f"load-{i}", "description": "load test entity"})
+            resp.raise_for_status()
+            self.entity_ids.append(resp.json()["id"])
+        self.created = list(self.entity_ids)
+
+    def cleanup(self, client):
+        for eid in self.created:
+            client.delete(f"/entities/{eid}")
+
+    def op(self, client, name):
+        if name == "read":
+            return client.get(f"/entities/{random.choice(self.entity_ids)}")
+        if name == "list":
+            return client.get("/entities")
+        if name == "graph":
+            return client.get("/graph")
+        if name == "write":
+            resp = client.post("/entities", json={"name": "load-write", "description": None})
+            if resp.status_code == 200:
+                with self.lock:
+                    self.created.append(resp.json()["id"])
+            return resp
+        raise ValueError(f"Unknown operation: {name}")
+
+    def worker(self, deadline):
+        import httpx
+        names = list(self.mix)
+        weights = [self.mix[n] for n in names]
+        with httpx.Client(base_url=self.base_url, timeout=60) as client:
+            while time.monotonic() < deadline:
+                name = random.choices(names, weights)[0]
+                start = time.perf_counter()
+                try:
+                    status = self.op(client, name).status_code
+                except httpx.HTTPError:
+                    status = "error"
+                elapsed = time.perf_counter() - start
+                with self.lock:
+                    self.latencies[name].append(elapsed)
+                    self.statuses[str(status)] = self.statuses.get(str(status), 0) + 1
+
+    def run(self):
+        # Imported here: scripts that only need percentile() don't pay for httpx.
+        import httpx
+        with httpx.Client(base_url=self.base_url, timeout=60) as client:
+            self.seed(client)
+            deadline = time.monotonic() + self.duration
+            threads = [threading.Thread(target=self.worker, args=(deadline,)) for _ in range(self.concurrency)]
+            started = time.monotonic()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            wall = time.monotonic() - started
+            pool = client.get("/health/pool").json()
+            self.cleanup(client)
+
+        total = sum(len(v) for v in self.latencies.values())
+        report = {
+            "concurrency": self.concurrency,
+            "duration_s": round(wall, 2),
+            "requests": total,
+            "throughput_rps": round(total / wall, 1) if wall else None,
+            "statuses": self.statuses,
+            "operations": {},
+            "pool_sample": pool,
+        }
+        for name, values in self.latencies.items():
+            values.sort()
+            report["operations"][name] = {
+                "count": len(values),
+                "p50_ms": round(percentile(values, 50) * 1000, 2) if values else None,
+                "p95_ms": round(percentile(values, 95) * 1000, 2) if values else None,
+                "p99_ms": round(percentile(values, 99) * 1000, 2) if values else None,
+            }
+        return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--mix", default="read=80,list=5,graph=5,write=10")
+    parser.add_argument("--seed-entities", type=int, default=200)
+    args = parser.parse_args()
+
+    test = LoadTest(args.base_url, args.concurrency, args.duration, parse_mix(args.mix), args.seed_entities)
+    print(json.dumps(test.run(), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Sweeps uvicorn worker counts x Neo4j pool sizes with the load generator.
+
+For every pair it starts `uvicorn app.main:app` with that many workers and
+NEO4J_MAX_POOL_SIZE, waits for /health/ready, runs scripts/load_test.py against it
+and stops it. Prints one line per pair and the recommended pair: the highest
+throughput whose p99 stays within --p99-slack of the best p99 seen.
+
+    python -m scripts.pool_sweep --workers 1 2 4 8 --pool 10 20 40 80 --out bench/sweep.json
+
+Needs a running Neo4j (NEO4J_URI etc. are passed through to the server).
+"""
+import argparse
+import datetime
+import json
+import os
+import subprocess
+import sys
+import time
+from scripts.benchmark import git_commit
+from scripts.load_test import LoadTest, parse_mix
+
+def wait_ready(base_url, timeout):
+    import httpx
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/health/ready", timeout=2).status_code == 200:
+                return True
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    return False
+
+def run_pair(args, workers, pool):
+    env = dict(os.environ, NEO4J_MAX_POOL_SIZE=str(pool))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port), "--workers", str(workers)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        if not wait_ready(base_url, args.ready_timeout):
+            return {"workers": workers, "pool": pool, "error": "not ready"}
+        test = LoadTest(base_url, args.concurrency, args.duration, parse_mix(args.mix), args.seed_entities)
+        report = test.run()
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+    p99 = max((op["p99_ms"] for op in report["operations"].values() if op["p99_ms"] is not None), default=None)
+    return {
+        "workers": workers,
+        "pool": pool,
+        "throughput_rps": report["throughput_rps"],
+        "p99_ms": p99,
+        "statuses": report["statuses"],
+        "operations": report["operations"],
+    }
+
+def recommend(results, p99_slack):
+    ok = [r for r in results if r.get("throughput_rps") and r.get("p99_ms") is not None]
+    if not ok:
+        return None
+    best_p99 = min(r["p99_ms"] for r in ok)
+    within = [r for r in ok if r["p99_ms"] <= best_p99 * (1 + p99_slack)]
+    # Ties go to the smaller footprint: fewer processes, then fewer connections.
+    best = max(within, key=lambda r: (r["throughput_rps"], -r["workers"], -r["pool"]))
+    return {"workers": best["workers"], "pool": best["pool"]}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--pool", type=int, nargs="+", default=[10, 20, 40, 80])
+    parser.add_argument("--port", type=int, default=8010)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--mix", default="read=80,list=5,graph=5,write=10")
+    parser.add_argument("--seed-entities", type=int, default=200)
+    parser.add_argument("--ready-timeout", type=float, default=120)
+    parser.add_argument("--p99-slack", type=float, default=0.25, help="Allowed p99 above the best one")
+    parser.add_argument("--out", default=None, help="Write the JSON result to this file")
+    args = parser.parse_args()
+
+    results = []
+    for workers in args.workers:
+        for pool in args.pool:
+            result = run_pair(args, workers, pool)
+            results.append(result)
+            print(f"workers={workers:<3} pool={pool:<4} "
+                  f"rps={result.get('throughput_rps')} p99_ms={result.get('p99_ms')} {result.get('error', '')}")
+
+    output = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "cpus": os.cpu_count(),
+            "params": {k: v for k, v in vars(args).items() if k != "out"},
+        },
+        "results": results,
+        "recommended": recommend(results, args.p99_slack),
+    }
+    print(f"Recommended: {output['recommended']}")
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump(output, f, indent=2)
+
+if __name__ == "__main__":
+    main()
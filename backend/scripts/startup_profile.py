@@ -0,0 +1,114 @@
+"""
+Cold-start profile of the API process.
+
+Imports app.main in fresh interpreters under `python -X importtime` and reports the
+import time of the app and of the heaviest packages and modules. With --ready it also
+starts the app in-process and measures the time until GET /health/ready is green
+(needs Neo4j).
+
+    python -m scripts.startup_profile --runs 5 --out bench/startup-head.json
+    python -m scripts.benchmark --compare bench/startup-base.json bench/startup-head.json
+    python -m scripts.startup_profile --budget-ms 1500     # exit 1 above the budget
+
+Results use the scripts/benchmark.py format, so --compare works on them.
+"""
+import argparse
+import datetime
+import json
+import subprocess
+import sys
+import time
+from scripts.benchmark import Recorder, git_commit
+
+def import_profile():
+    """One fresh interpreter. Returns (wall seconds, {module: (self us, cumulative us)})."""
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        capture_output=True, text=True, check=True
+    )
+    wall = time.perf_counter() - start
+    modules = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(own), int(cumulative))
+    return wall, modules
+
+def time_to_ready(timeout):
+    from fastapi.testclient import TestClient
+    start = time.perf_counter()
+    from app.main import app
+    from app.core.readiness import readiness
+    with TestClient(app) as client:
+        if not readiness.wait(timeout):
+            return None, client.get("/health/ready").json()
+        return time.perf_counter() - start, client.get("/health/ready").json()
+
+def run(args):
+    rec = Recorder()
+    per_package = {}
+    per_module = {}
+    for _ in range(args.runs):
+        wall, modules = import_profile()
+        rec.samples.setdefault("process.wall", []).append(wall)
+        rec.samples.setdefault("import.app.main", []).append(modules["app.main"][1] / 1e6)
+        packages = {}
+        for name, (own, _) in modules.items():
+            top = name.split(".")[0]
+            packages[top] = packages.get(top, 0) + own
+            per_module.setdefault(name, []).append(own)
+        for top, own in packages.items():
+            per_package.setdefault(top, []).append(own / 1e6)
+
+    # Only the heaviest packages become tracked operations; the long tail is noise.
+    heaviest = sorted(per_package, key=lambda p: -sum(per_package[p]))[:args.top]
+    for top in heaviest:
+        rec.samples[f"import.package.{top}"] = per_package[top]
+
+    ready = None
+    if args.ready:
+        seconds, ready = time_to_ready(args.ready_timeout)
+        if seconds is not None:
+            rec.samples["ready"] = [seconds]
+        else:
+            rec.errors["ready"] = 1
+
+    modules = sorted(per_module, key=lambda m: -sum(per_module[m]))[:args.top]
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "target": "startup",
+            "params": {"runs": args.runs, "python": sys.version.split()[0]},
+        },
+        "heaviest_modules_ms": {m: round(sum(per_module[m]) / len(per_module[m]) / 1000, 3) for m in modules},
+        "readiness": ready,
+        "scenarios": {"startup": rec.summary()},
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to profile")
+    parser.add_argument("--top", type=int, default=10, help="Packages and modules to report")
+    parser.add_argument("--ready", action="store_true", help="Also measure time to /health/ready (needs Neo4j)")
+    parser.add_argument("--ready-timeout", type=float, default=60)
+    parser.add_argument("--budget-ms", type=float, default=None, help="Fail when the median app import exceeds this")
+    parser.add_argument("--out", default=None, help="Write the JSON result to this file")
+    args = parser.parse_args()
+
+    result = run(args)
+    output = json.dumps(result, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output)
+    print(output)
+
+    median = result["scenarios"]["startup"]["import.app.main"]["p50_ms"]
+    if args.budget_ms is not None and median > args.budget_ms:
+        print(f"[OVER BUDGET] app.main import p50 {median} ms > {args.budget_ms} ms")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
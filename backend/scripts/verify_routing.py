@@ -0,0 +1,82 @@
+from fastapi.testclient import TestClient
+from neo4j import RoutingControl, READ_ACCESS
+from app.main import app
+from app.database import get_driver
+from app.core.bookmarks import BOOKMARKS_HEADER
+
+class RoutingStub:
+    """
+    Wraps the real driver and records how every query and session was routed and
+    which bookmarks it carried. A single local instance executes everything; the
+    stub only lets us see what a cluster would have been asked to do.
+    """
+
+    def __init__(self, driver):
+        self._driver = driver
+        self.calls = []
+
+    def _record(self, query, routing, manager):
+        self.calls.append({
+            "query": query,
+            "routing": routing,
+            "bookmarks": set(manager.get_bookmarks()) if manager is not None else set(),
+        })
+
+    def execute_query(self, query, *args, **kwargs):
+        self._record(" ".join(str(query).split())[:60],
+                     kwargs.get("routing_", RoutingControl.WRITE), kwargs.get("bookmark_manager_"))
+        return self._driver.execute_query(query, *args, **kwargs)
+
+    def session(self, **kwargs):
+        # Logged writes (ChangeLogService.write) run as managed transactions in a session.
+        routing = RoutingControl.READ if kwargs.get("default_access_mode") == READ_ACCESS else RoutingControl.WRITE
+        self._record("<session>", routing, kwargs.get("bookmark_manager"))
+        return self._driver.session(**kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._driver, name)
+
+stub = RoutingStub(get_driver())
+app.dependency_overrides[get_driver] = lambda: stub
+client = TestClient(app)
+
+def print_step(msg):
+    print(f"\n--- {msg} ---")
+
+def routings():
+    calls = list(stub.calls)
+    stub.calls.clear()
+    return calls
+
+def verify():
+    print_step("Write goes to the leader and returns bookmarks")
+    resp = client.post("/entities", json={"name": "Routed", "description": "routing check"})
+    assert resp.status_code == 200
+    entity_id = resp.json()["id"]
+    calls = routings()
+    assert calls and all(c["routing"] == RoutingControl.WRITE for c in calls), calls
+    bookmarks = resp.headers.get(BOOKMARKS_HEADER)
+    assert bookmarks, "write response carries no bookmarks"
+    print(f"Bookmarks: {bookmarks}")
+
+    print_step("Reads are routed to followers")
+    for path in [f"/entities/{entity_id}", "/entities", "/graph"]:
+        resp = client.get(path)
+        assert resp.status_code == 200
+        calls = routings()
+        assert calls and all(c["routing"] == RoutingControl.READ for c in calls), (path, calls)
+        print(f"{path}: {len(calls)} READ queries")
+
+    print_step("Bookmarks sent by the client are attached to reads")
+    resp = client.get(f"/entities/{entity_id}", headers={BOOKMARKS_HEADER: bookmarks})
+    assert resp.status_code == 200
+    sent = set(bookmarks.split(","))
+    calls = routings()
+    assert all(sent <= c["bookmarks"] for c in calls), calls
+    print("Read carried the write's bookmarks")
+
+    client.delete(f"/entities/{entity_id}")
+    print("\nROUTING CHECKS PASSED")
+
+if __name__ == "__main__":
+    verify()
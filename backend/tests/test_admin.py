@@ -0,0 +1,28 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api.routers import admin
+from app.core import profiling as profiling_module
+
+app = FastAPI()
+app.include_router(admin.router, prefix="/admin")
+client = TestClient(app)
+
+def test_admin_is_hidden_while_profiling_is_disabled(monkeypatch):
+    monkeypatch.setattr(profiling_module, "PROFILING_ENABLED", False)
+    monkeypatch.setattr(profiling_module, "PROFILING_TOKEN", "secret")
+    assert client.get("/admin/profile", headers={"X-Profiling-Token": "secret"}).status_code == 404
+
+def test_admin_is_locked_without_a_configured_token(monkeypatch):
+    monkeypatch.setattr(profiling_module, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(profiling_module, "PROFILING_TOKEN", "")
+    assert client.get("/admin/profile", headers={"X-Profiling-Token": ""}).status_code == 403
+    assert client.post("/admin/profile", params={"route": "/admin/profile"}).status_code == 403
+
+def test_admin_requires_the_token(monkeypatch):
+    monkeypatch.setattr(profiling_module, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(profiling_module, "PROFILING_TOKEN", "secret")
+    assert client.get("/admin/profile").status_code == 401
+    assert client.get("/admin/profile", headers={"X-Profiling-Token": "wrong"}).status_code == 401
+    # Past the check: no capture has run on this worker.
+    resp = client.get("/admin/profile", headers={"X-Profiling-Token": "secret"})
+    assert resp.status_code == 404 and resp.json()["detail"] == "No capture on this worker"
@@ -0,0 +1,153 @@
+import asyncio
+import pytest
+from starlette.requests import Request
+from app.core import admission as admission_module
+from app.core.admission import AdmissionController, CostClass, Shed, TokenBuckets, classify
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(admission_module.time, "monotonic", clock)
+    return clock
+
+def test_bucket_allows_the_burst_then_reports_the_wait(clock):
+    buckets = TokenBuckets(rate=2, burst=5, max_clients=10)
+    assert [buckets.take("a", 1) for _ in range(5)] == [0] * 5
+    assert buckets.take("a", 1) == pytest.approx(0.5)
+    clock.now += 0.5
+    assert buckets.take("a", 1) == 0
+
+def test_bucket_refills_up_to_the_burst_only(clock):
+    buckets = TokenBuckets(rate=10, burst=3, max_clients=10)
+    buckets.take("a", 3)
+    clock.now += 60
+    assert buckets.take("a", 3) == 0
+    assert buckets.take("a", 1) == pytest.approx(0.1)
+
+def test_cost_above_the_burst_is_capped(clock):
+    buckets = TokenBuckets(rate=1, burst=2, max_clients=10)
+    assert buckets.take("a", 10) == 0
+    assert buckets.take("a", 10) == pytest.approx(2)
+
+def test_clients_have_separate_buckets_and_are_lru_bounded(clock):
+    buckets = TokenBuckets(rate=1, burst=1, max_clients=2)
+    assert buckets.take("a", 1) == 0
+    assert buckets.take("b", 1) == 0
+    assert buckets.take("a", 1) > 0
+    buckets.take("c", 1)  # evicts "b", the least recently used
+    assert len(buckets) == 2
+    assert buckets.take("b", 1) == 0
+
+def test_idle_buckets_are_dropped_once_refilled(clock):
+    buckets = TokenBuckets(rate=1, burst=5, max_clients=10)
+    buckets.take("a", 5)
+    clock.now += 3
+    buckets.take("b", 1)
+    assert len(buckets) == 2
+    clock.now += 3  # "a" has been idle for 6 s, longer than the 5 s it takes to refill
+    buckets.take("c", 1)
+    assert len(buckets) == 2
+    assert buckets.take("a", 5) == 0
+
+def request(api_key=None, host="10.0.0.1"):
+    headers = [(b"x-api-key", api_key.encode())] if api_key else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers, "client": (host, 1234)})
+
+def test_only_verified_api_keys_get_their_own_bucket(monkeypatch):
+    monkeypatch.setattr(admission_module, "API_KEYS", "secret-1, secret-2")
+    controller = AdmissionController()
+    verified = controller.client_key(request("secret-1"))
+    assert verified.startswith("key:") and "secret-1" not in verified
+    assert controller.client_key(request("secret-2")) != verified
+    assert controller.client_key(request("made-up")) == "addr:10.0.0.1"
+    assert controller.client_key(request()) == "addr:10.0.0.1"
+
+def test_release_hands_the_slot_to_the_oldest_waiter():
+    async def main():
+        cost_class = CostClass("test", concurrency=1, queue=2, timeout=1, cost=1)
+        await cost_class.acquire()
+        order = []
+
+        async def wait(name):
+            await cost_class.acquire()
+            order.append(name)
+
+        first = asyncio.ensure_future(wait("first"))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(wait("second"))
+        await asyncio.sleep(0)
+        assert cost_class.stats()["waiting"] == 2
+
+        cost_class.release()
+        await first
+        assert cost_class.active == 1
+        cost_class.release()
+        await second
+        cost_class.release()
+        return order, cost_class
+
+    order, cost_class = asyncio.run(main())
+    assert order == ["first", "second"]
+    assert cost_class.active == 0
+    assert cost_class.admitted == 3 and cost_class.queued == 2
+
+def test_full_queue_is_shed():
+    async def main():
+        cost_class = CostClass("test", concurrency=1, queue=1, timeout=1, cost=1)
+        await cost_class.acquire()
+        waiter = asyncio.ensure_future(cost_class.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(Shed) as shed:
+            await cost_class.acquire()
+        cost_class.release()
+        await waiter
+        return shed.value, cost_class
+
+    shed, cost_class = asyncio.run(main())
+    assert shed.status_code == 503
+    assert cost_class.rejected_queue_full == 1
+
+def test_queue_timeout_is_shed_and_frees_the_queue():
+    async def main():
+        cost_class = CostClass("test", concurrency=1, queue=1, timeout=0.01, cost=1)
+        await cost_class.acquire()
+        with pytest.raises(Shed):
+            await cost_class.acquire()
+        cost_class.release()
+        return cost_class
+
+    cost_class = asyncio.run(main())
+    assert cost_class.rejected_timeout == 1
+    assert cost_class.active == 0
+    assert cost_class.stats()["waiting"] == 0
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def main():
+        cost_class = CostClass("test", concurrency=1, queue=1, timeout=1, cost=1)
+        await cost_class.acquire()
+        waiter = asyncio.ensure_future(cost_class.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        cost_class.release()
+        return cost_class
+
+    cost_class = asyncio.run(main())
+    assert cost_class.active == 0
+    assert cost_class.stats()["waiting"] == 0
+
+def test_routes_are_classified_by_cost():
+    assert classify("GET", "/graph") == "export"
+    assert classify("POST", "/entities/x/validate:batch") == "export"
+    assert classify("GET", "/entities") == "list"
+    assert classify("GET", "/entities/x") == "read"
+    assert classify("DELETE", "/entities/x") == "write"
+    assert classify("GET", "/health/ready") is None
@@ -0,0 +1,42 @@
+from app.core import changelog as changelog_module
+from app.core.changelog import ChangeFeed
+
+class Consumer:
+    def __init__(self):
+        self.loads = 0
+        self.applied = []
+
+    def load(self, driver):
+        self.loads += 1
+
+    def apply(self, driver, events):
+        self.applied.extend(events)
+
+def test_feed_without_consumers_does_not_start(monkeypatch):
+    def unexpected(*args, **kwargs):
+        raise AssertionError("the log was read")
+    monkeypatch.setattr(changelog_module.ChangeLogService, "head_seq", unexpected)
+    monkeypatch.setattr(changelog_module.ChangeLogService, "fetch_since", unexpected)
+    feed = ChangeFeed()
+    feed.start(driver=object())
+    assert not feed.running
+    feed.notify()
+
+def test_notify_catches_up_a_running_feed(monkeypatch):
+    log = []
+    monkeypatch.setattr(changelog_module, "CHANGE_FEED_POLL_INTERVAL", 60)
+    monkeypatch.setattr(changelog_module.ChangeLogService, "head_seq", lambda driver: len(log))
+    monkeypatch.setattr(changelog_module.ChangeLogService, "fetch_since",
+                        lambda driver, seq: [e for e in log if e["seq"] > seq])
+    consumer = Consumer()
+    feed = ChangeFeed()
+    feed.subscribe(consumer)
+    feed.start(driver=object())
+    try:
+        assert feed.running and consumer.loads == 1
+        log.append({"seq": 1, "op": "upsert", "kind": "Entity", "id": "a"})
+        feed.notify()
+        assert consumer.applied == log
+        assert feed.seq == 1
+    finally:
+        feed.stop()
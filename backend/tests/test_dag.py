@@ -0,0 +1,122 @@
+import random
+import threading
+from app.core.dag import DagIndex
+
+def build(edges):
+    dag = DagIndex()
+    for sid, tid in edges:
+        dag._add_node(sid)
+        dag._add_node(tid)
+    for i, (sid, tid) in enumerate(edges):
+        dag.add_edge(f"r{i}", sid, tid)
+    return dag
+
+def test_edge_closing_a_cycle_is_skipped_and_marks_the_index_stale():
+    dag = build([("a", "b"), ("b", "c")])
+    worker = threading.Thread(target=dag.add_edge, args=("r-cycle", "c", "a"), daemon=True)
+    worker.start()
+    worker.join(timeout=5)
+    assert not worker.is_alive()
+    assert dag.stale
+    assert "r-cycle" not in dag.edges
+    assert dag.level == {"a": 0, "b": 1, "c": 2}
+
+def test_self_loop_is_skipped():
+    dag = build([("a", "b")])
+    dag.add_edge("r-self", "a", "a")
+    assert dag.stale
+    assert "r-self" not in dag.edges
+
+def test_levels_follow_the_longest_path():
+    dag = build([("a", "b"), ("b", "c"), ("a", "c")])
+    assert dag.level == {"a": 0, "b": 1, "c": 2}
+    dag._add_node("d")
+    dag.add_edge("r-d", "d", "a")
+    assert dag.level == {"d": 0, "a": 1, "b": 2, "c": 3}
+    assert dag.topological_order() == ["d", "a", "b", "c"]
+
+def test_removing_an_edge_lowers_the_levels_behind_it():
+    dag = build([("a", "b"), ("b", "c"), ("a", "c")])
+    dag.remove_edge("r0")
+    assert dag.level == {"a": 0, "b": 0, "c": 1}
+    dag.remove_edge("r1")
+    assert dag.level == {"a": 0, "b": 0, "c": 1}
+    dag.remove_edge("r2")
+    assert dag.level == {"a": 0, "b": 0, "c": 0}
+
+def test_parallel_relations_count_until_the_last_is_removed():
+    dag = build([("a", "b"), ("a", "b")])
+    dag.remove_edge("r0")
+    assert dag.succ["a"] == {"b": 1}
+    assert dag.level["b"] == 1
+    dag.remove_edge("r1")
+    assert dag.succ["a"] == {}
+    assert dag.level["b"] == 0
+
+def test_remove_node_drops_its_relations_and_relevels():
+    dag = build([("a", "b"), ("b", "c"), ("x", "c")])
+    dag.remove_node("b")
+    assert "b" not in dag.level
+    assert set(dag.edges) == {"r2"}
+    assert "b" not in dag.succ["a"] and "b" not in dag.pred["c"]
+    assert dag.level == {"a": 0, "c": 1, "x": 0}
+
+def test_reaches_and_lineage():
+    dag = build([("a", "b"), ("b", "c"), ("a", "d")])
+    assert dag.reaches("a", "c")
+    assert not dag.reaches("c", "a")
+    assert not dag.reaches("d", "c")
+    assert sorted(dag.lineage("a", "down")["ids"]) == ["b", "c", "d"]
+    assert dag.lineage("c", "up") == {"count": 2, "ids": ["b", "a"]}
+    assert dag.lineage("a", "down", max_depth=1)["count"] == 2
+    assert dag.lineage("a", "down", limit=1)["count"] == 3
+    assert dag.lineage("missing") is None
+
+def test_lineage_follows_relation_changes():
+    dag = build([("a", "b")])
+    assert dag.lineage("a", "down")["ids"] == ["b"]
+    dag._add_node("c")
+    dag.add_edge("r-c", "b", "c")
+    assert sorted(dag.lineage("a", "down")["ids"]) == ["b", "c"]
+    assert dag.reaches("a", "c")
+    dag.remove_edge("r-c")
+    assert dag.lineage("a", "down")["ids"] == ["b"]
+    assert not dag.reaches("a", "c")
+
+def test_snapshot_counts_match_the_lineage():
+    dag = build([("a", "b"), ("b", "c"), ("a", "d"), ("d", "c"), ("e", "d")])
+    snap = dag.snapshot()
+    for n in dag.level:
+        assert snap["descendants"][n] == dag.lineage(n, "down")["count"]
+        assert snap["ancestors"][n] == dag.lineage(n, "up")["count"]
+
+def walk(dag, n, neighbours):
+    return set(dag._walk(n, neighbours, None))
+
+def test_labels_match_a_walk_through_random_changes():
+    rng = random.Random(7)
+    dag = DagIndex()
+    nodes = [f"n{i}" for i in range(40)]
+    for n in nodes[:20]:
+        dag._add_node(n)
+    for step in range(400):
+        live = list(dag.succ)
+        op = rng.random()
+        if op < 0.55 and len(live) > 1:
+            # Only forward edges in the creation order, as the write path rejects cycles.
+            a, b = sorted(rng.sample(live, 2), key=nodes.index)
+            dag.add_edge(f"r{step}", a, b)
+        elif op < 0.75 and dag.edges:
+            dag.remove_edge(rng.choice(sorted(dag.edges)))
+        elif op < 0.85 and len(live) > 2:
+            dag.remove_node(rng.choice(live))
+        else:
+            dag._add_node(rng.choice(nodes))
+        assert not dag.stale
+        for n in dag.succ:
+            assert set(dag.lineage(n, "down")["ids"]) == walk(dag, n, dag.succ)
+            assert set(dag.lineage(n, "up")["ids"]) == walk(dag, n, dag.pred)
+            assert dag.lineage(n, "down")["count"] == len(walk(dag, n, dag.succ))
+    dag._label()
+    for n in dag.succ:
+        assert set(dag.lineage(n, "down")["ids"]) == walk(dag, n, dag.succ)
@@ -0,0 +1,147 @@
+import asyncio
+import threading
+import time
+import pytest
+from app.core.singleflight import SingleFlight
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight(enabled=True)
+    release = threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        release.wait(5)
+        return "result"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("key", work))) for _ in range(5)]
+    threads[0].start()
+    wait_until(lambda: flight._calls)
+    for t in threads[1:]:
+        t.start()
+    wait_until(lambda: flight.coalesced == 4)
+    release.set()
+    for t in threads:
+        t.join(5)
+
+    assert results == ["result"] * 5
+    assert len(calls) == 1
+    assert flight.stats() == {"enabled": True, "executed": 1, "coalesced": 4, "in_flight": 0}
+
+def test_waiters_get_the_leaders_exception():
+    flight = SingleFlight(enabled=True)
+    release = threading.Event()
+
+    def work():
+        release.wait(5)
+        raise ValueError("boom")
+
+    errors = []
+    def call():
+        try:
+            flight.do("key", work)
+        except ValueError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    threads[0].start()
+    wait_until(lambda: flight._calls)
+    for t in threads[1:]:
+        t.start()
+    wait_until(lambda: flight.coalesced == 2)
+    release.set()
+    for t in threads:
+        t.join(5)
+
+    assert len(errors) == 3
+    assert flight.stats()["in_flight"] == 0
+
+def test_nothing_is_cached_after_the_call_returns():
+    flight = SingleFlight(enabled=True)
+    assert flight.do("key", lambda: 1) == 1
+    assert flight.do("key", lambda: 2) == 2
+    assert flight.executed == 2
+
+def test_different_keys_do_not_coalesce():
+    flight = SingleFlight(enabled=True)
+
+    async def main():
+        async def work(value):
+            await asyncio.sleep(0.01)
+            return value
+        return await asyncio.gather(flight.do_async("a", lambda: work(1)), flight.do_async("b", lambda: work(2)))
+
+    assert asyncio.run(main()) == [1, 2]
+    assert flight.executed == 2 and flight.coalesced == 0
+
+def test_async_calls_share_one_execution():
+    flight = SingleFlight(enabled=True)
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def main():
+        return await asyncio.gather(*(flight.do_async("key", work) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["result"] * 5
+    assert len(calls) == 1
+    assert flight.coalesced == 4
+    assert flight.stats()["in_flight"] == 0
+
+def test_cancelled_async_waiter_does_not_cancel_the_shared_call():
+    flight = SingleFlight(enabled=True)
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def main():
+        leader = asyncio.ensure_future(flight.do_async("key", work))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(flight.do_async("key", work))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return await leader
+
+    assert asyncio.run(main()) == "result"
+
+def test_cancelled_async_leader_hands_over_to_a_waiter():
+    flight = SingleFlight(enabled=True)
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def main():
+        leader = asyncio.ensure_future(flight.do_async("key", work))
+        await asyncio.sleep(0)
+        waiters = [asyncio.ensure_future(flight.do_async("key", work)) for _ in range(2)]
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await asyncio.gather(*waiters)
+
+    assert asyncio.run(main()) == ["result", "result"]
+    assert len(calls) == 2
+    assert flight.executed == 2
+    assert flight.stats()["in_flight"] == 0
+
+def test_disabled_runs_every_call():
+    flight = SingleFlight(enabled=False)
+    assert flight.do("key", lambda: 1) == 1
+    assert flight.stats()["executed"] == 0
@@ -0,0 +1,91 @@
+import asyncio
+import json
+from app.facets import validators as validators_module
+from app.facets.validators import ValidatorCache, compile_validator, validate_ndjson
+
+def prop(name, data_type="string", depth=0, **extra):
+    return {"configuration": {"name": name, "dataType": data_type, **extra}, "depth": depth}
+
+def run_ndjson(validator, chunks):
+    async def body():
+        for chunk in chunks:
+            yield chunk
+
+    async def collect():
+        return [json.loads(line) async for line in validate_ndjson(validator, body())]
+
+    return asyncio.run(collect())
+
+def test_compiled_validator_checks_types_and_required_fields():
+    validator = compile_validator("e-1", "v1", [
+        prop("name", required=True),
+        prop("size", "integer"),
+    ], allow_extra=False)
+    assert validator.validate_json(b'{"name": "a", "size": 3}') is None
+    errors = validator.validate_json(b'{"size": "many"}')
+    assert {tuple(e["loc"]) for e in errors} == {("name",), ("size",)}
+    assert validator.validate_json(b'{"name": "a", "other": 1}')[0]["type"] == "extra_forbidden"
+    assert compile_validator("e-1", "v1", [prop("name")], allow_extra=True).validate_json(b'{"other": 1}') is None
+
+def test_nearer_property_wins_over_an_inherited_one():
+    validator = compile_validator("e-1", "v1", [
+        prop("size", "string", depth=1),
+        prop("size", "integer", depth=0),
+    ], allow_extra=False)
+    assert validator.fields == [{"name": "size", "dataType": "integer", "required": False, "inherited": False}]
+    assert validator.validate_json(b'{"size": "x"}')
+
+def test_enum_skips_values_that_cannot_be_literals():
+    validator = compile_validator("e-1", "v1", [
+        prop("color", "enum", values=["red", {"rgb": [0, 0, 255]}, ["green"], 7, None]),
+    ], allow_extra=False)
+    assert validator.validate_json(b'{"color": "red"}') is None
+    assert validator.validate_json(b'{"color": 7}') is None
+    assert validator.validate_json(b'{"color": "blue"}')
+
+def test_enum_of_only_objects_accepts_anything():
+    validator = compile_validator("e-1", "v1", [prop("shape", "enum", values=[{"a": 1}, [2]])], allow_extra=False)
+    assert validator.validate_json(b'{"shape": {"anything": true}}') is None
+
+def test_cache_recompiles_when_the_facet_fingerprint_changes(monkeypatch):
+    facets = [{"id": "f-1", "configuration": json.dumps({"name": "size", "dataType": "integer"}), "depth": 0}]
+    cache = ValidatorCache(size=2)
+    monkeypatch.setattr(cache, "_fetch_facets", lambda driver, entity_id, inherit: list(facets))
+
+    first = cache.get(None, "e-1")
+    assert cache.get(None, "e-1") is first
+    assert cache.compiles == 1
+
+    facets[0] = {**facets[0], "configuration": json.dumps({"name": "size", "dataType": "string"})}
+    second = cache.get(None, "e-1")
+    assert second is not first and second.version != first.version
+    assert cache.compiles == 2
+    assert second.validate_json(b'{"size": "x"}') is None
+
+def test_cache_returns_none_for_an_unknown_entity(monkeypatch):
+    cache = ValidatorCache()
+    monkeypatch.setattr(cache, "_fetch_facets", lambda driver, entity_id, inherit: None)
+    assert cache.get(None, "missing") is None
+
+def test_ndjson_reports_invalid_rows_across_chunks():
+    validator = compile_validator("e-1", "v1", [prop("size", "integer")], allow_extra=False)
+    output = run_ndjson(validator, [b'{"size": 1}\n{"si', b'ze": "x"}\n\n{"size"', b': 3}'])
+    assert [line["row"] for line in output[:-1]] == [2]
+    assert output[-1]["summary"] == {
+        "entity_id": "e-1", "schema_version": "v1", "rows": 3, "valid": 2, "invalid": 1,
+    }
+
+def test_ndjson_rows_over_the_byte_cap_are_reported_and_skipped(monkeypatch):
+    monkeypatch.setattr(validators_module, "VALIDATE_MAX_ROW_BYTES", 32)
+    validator = compile_validator("e-1", "v1", [prop("name")], allow_extra=False)
+    long_row = b'{"name": "' + b"x" * 100 + b'"}'
+    output = run_ndjson(validator, [
+        long_row[:40], long_row[40:80], long_row[80:] + b'\n{"name": "ok"}\n',
+        long_row + b"\n",
+        long_row,
+    ])
+    too_large = [line["row"] for line in output if "row" in line]
+    assert too_large == [1, 3, 4]
+    assert all(line["errors"][0]["type"] == "row_too_large" for line in output if "row" in line)
+    assert output[-1]["summary"]["rows"] == 4
+    assert output[-1]["summary"]["invalid"] == 3